@@ -3,13 +3,90 @@ from .imu import IMU
 from .controller import Controller
 from .pid import PID
 from .timeout import Timeout
+from .motion_profile import MotionProfile, TrapezoidalProfile, SCurveProfile
+from .odometry import Odometry
 import time
 import math
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+def _length(x: float, y: float) -> float:
+    # The length of the vector (x, y). MicroPython's math module has no hypot().
+    return math.sqrt(x*x + y*y)
+
+class Motion:
+
+    def __init__(self, drivetrain, step, time_out: Timeout):
+        """
+        A straight or turn in progress on a drivetrain, returned by DifferentialDrive.start_straight() and start_turn(). Nothing moves it on by
+        itself: call update() about every 10 ms, or await wait(), which does so in a uasyncio task and leaves the other tasks running in between.
+
+        :param drivetrain: The drivetrain the motion drives
+        :type drivetrain: DifferentialDrive
+        :param step: Runs one control tick and returns True once the motion should end
+        :param time_out: The motion's timeout
+        :type time_out: Timeout
+        """
+        self.drivetrain = drivetrain
+        self._step = step
+        self.time_out = time_out
+        # True if the motion reached its target before the timeout and without being halted or cancelled, or None while it is running
+        self.result = None
+
+    def update(self) -> bool:
+        """
+        Runs one control tick of the motion: reads the encoders and IMU, and sets the motor efforts
+
+        :return: if the motion has ended, and the motors have been stopped
+        :rtype: bool
+        """
+        if self.result is None and self._step():
+            self._end(not self.time_out.is_done() and not self.drivetrain.halted)
+        return self.result is not None
+
+    def is_done(self) -> bool:
+        """
+        :return: if the motion has ended
+        :rtype: bool
+        """
+        return self.result is not None
+
+    def cancel(self) -> None:
+        """
+        Ends the motion now and stops the motors. Its result is False.
+        """
+        if self.result is None:
+            self._end(False)
+
+    async def wait(self) -> bool:
+        """
+        Runs the motion's control loop every 10 ms until it ends, letting other tasks run between ticks. Only one task should wait on a motion, since
+        each waiting task runs the control loop; others can poll is_done().
+
+        :return: if the target was reached before the timeout, and without being halted or cancelled
+        :rtype: bool
+        """
+        while not self.update():
+            await asyncio.sleep(0.01)
+        return self.result
+
+    def _end(self, result: bool) -> None:
+        self.drivetrain.stop()
+        self.result = result
+        if self.drivetrain.motion is self:
+            self.drivetrain.motion = None
 
 class DifferentialDrive:
 
     _DEFAULT_DIFFERENTIAL_DRIVE_INSTANCE =None
 
+    # Seconds a move with a motion profile may take past the end of the profile to come within tolerance, and how far ahead of the time of a
+    # control tick the feed-forward follows the profile: half of the 10 ms the effort it sets lasts
+    _PROFILE_SETTLE = 0.5
+    _FEED_FORWARD_LEAD = 0.005
+
     @classmethod
     def get_default_differential_drive(cls):
 
@@ -49,6 +126,19 @@ class DifferentialDrive:
         self.wheel_diam = wheel_diam
         self.track_width = wheel_track
 
+        # Set by halt() to end straight() or turn() at their next control tick
+        self.halted = False
+        # The Motion in progress, if any
+        self.motion = None
+        # The Odometry follow_path() uses by default, made the first time it is needed
+        self.odometry = None
+
+        # Feed-forward for moves with a motion profile: the effort that just gets a wheel turning, and the effort per cm/s and per cm/s^2 of wheel
+        # speed. Set them for your robot from the speeds it settles at with a few fixed efforts, and how quickly it gets there.
+        self.ks = 0.1
+        self.kv = 0.015
+        self.ka = 0.0012
+
     def set_effort(self, left_effort: float, right_effort: float) -> None:
         """
         Set the raw effort of both motors individually
@@ -62,7 +152,7 @@ class DifferentialDrive:
         self.left_motor.set_effort(left_effort)
         self.right_motor.set_effort(right_effort)
 
-    def set_speed(self, left_speed: float, right_speed: float) -> None:
+    def set_speed(self, left_speed: float, right_speed: float, feed_forward: bool = False) -> None:
         """
         Set the speed of both motors individually
 
@@ -70,11 +160,17 @@ class DifferentialDrive:
         :type leftSpeed: float
         :param rightSpeed: The speed (In Centimeters per Second) to set the right motor to.
         :type rightSpeed: float
+        :param feed_forward: If True, each motor's speed control starts from the effort ks and kv give for its speed, so it gets there sooner
+        :type feed_forward: bool
         """
         # Convert from cm/s to RPM
         cmpsToRPM = 60 / (math.pi * self.wheel_diam)
-        self.left_motor.set_speed(left_speed*cmpsToRPM)
-        self.right_motor.set_speed(right_speed*cmpsToRPM)
+        if feed_forward:
+            self.left_motor.set_speed(left_speed*cmpsToRPM, self._feed_forward(left_speed, 0))
+            self.right_motor.set_speed(right_speed*cmpsToRPM, self._feed_forward(right_speed, 0))
+        else:
+            self.left_motor.set_speed(left_speed*cmpsToRPM)
+            self.right_motor.set_speed(right_speed*cmpsToRPM)
 
     def stop(self) -> None:
         """
@@ -84,6 +180,19 @@ class DifferentialDrive:
         self.right_motor.set_speed()
         self.set_effort(0,0)
 
+    def halt(self) -> None:
+        """
+        Stops any straight() or turn() in progress at its next control tick, and makes any started after this return at once, until resume() is
+        called. The same goes for their async versions and motion handles. Only sets a flag, so it is safe to call from an interrupt handler.
+        """
+        self.halted = True
+
+    def resume(self) -> None:
+        """
+        Lets straight() and turn() move the robot again after halt()
+        """
+        self.halted = False
+
     def arcade(self, straight:float, turn:float):
         """
         Sets the raw effort of both motors based on the arcade drive scheme
@@ -124,9 +233,10 @@ class DifferentialDrive:
         return self.right_motor.get_position()*math.pi*self.wheel_diam
 
 
-    def straight(self, distance: float, max_effort: float = 0.5, timeout: float = None, main_controller: Controller = None, secondary_controller: Controller = None) -> bool:
+    def straight(self, distance: float, max_effort: float = 0.5, timeout: float = None, main_controller: Controller = None, secondary_controller: Controller = None, max_velocity: float = None, max_acceleration: float = None, max_jerk: float = None) -> bool:
         """
         Go forward the specified distance in centimeters, and exit function when distance has been reached.
+        Blocks until then; straight_async() and start_straight() do the same without blocking.
         Max_effort is bounded from -1 (reverse at full speed) to 1 (forward at full speed)
 
         :param distance: The distance for the robot to travel (In Centimeters)
@@ -139,9 +249,41 @@ class DifferentialDrive:
         :type main_controller: Controller
         :param secondary_controller: The secondary controller, for correcting heading error that may result during the drive.
         :type secondary_controller: Controller
-        :return: if the distance was reached before the timeout
+        :param max_velocity: If given, the drive follows a motion profile with this top speed (In Centimeters per Second) instead of driving on the
+            distance error alone, using feed-forward from ks, kv and ka plus main_controller as a small correction. It should be a speed max_effort
+            can reach.
+        :type max_velocity: float
+        :param max_acceleration: Top acceleration of the motion profile (In Centimeters per Second squared). Defaults to 4 times max_velocity.
+        :type max_acceleration: float
+        :param max_jerk: If given, the motion profile is an S-curve with this top jerk (In Centimeters per Second cubed); otherwise it is trapezoidal.
+        :type max_jerk: float
+        :return: if the distance was reached before the timeout, and without being halted
+        :rtype: bool
+        """
+        motion = self.start_straight(distance, max_effort, timeout, main_controller, secondary_controller, max_velocity, max_acceleration, max_jerk)
+        while not motion.update():
+            time.sleep(0.01)
+        return motion.result
+
+    async def straight_async(self, distance: float, max_effort: float = 0.5, timeout: float = None, main_controller: Controller = None, secondary_controller: Controller = None, max_velocity: float = None, max_acceleration: float = None, max_jerk: float = None) -> bool:
+        """
+        straight() as a coroutine, which lets other uasyncio tasks run between control ticks. Takes the same parameters.
+
+        :return: if the distance was reached before the timeout, and without being halted or cancelled
         :rtype: bool
         """
+        return await self.start_straight(distance, max_effort, timeout, main_controller, secondary_controller, max_velocity, max_acceleration, max_jerk).wait()
+
+    def start_straight(self, distance: float, max_effort: float = 0.5, timeout: float = None, main_controller: Controller = None, secondary_controller: Controller = None, max_velocity: float = None, max_acceleration: float = None, max_jerk: float = None) -> Motion:
+        """
+        Starts going forward the specified distance in centimeters, as straight() does, and returns at once. Cancels any motion in progress.
+        Takes the same parameters as straight().
+
+        :return: The motion, to update(), poll, cancel() or await wait() on
+        :rtype: Motion
+        """
+        if self.motion is not None:
+            self.motion.cancel()
         # ensure effort is always positive while distance could be either positive or negative
         if max_effort < 0:
             max_effort *= -1
@@ -150,9 +292,19 @@ class DifferentialDrive:
         time_out = Timeout(timeout)
         starting_left = self.get_left_encoder_position()
         starting_right = self.get_right_encoder_position()
+        profile = self._profile(distance, max_velocity, max_acceleration, max_jerk)
+        start_time = time.ticks_ms()
 
-
-        if main_controller is None:
+        if main_controller is None and profile is not None:
+            # Only corrects the robot running behind or ahead of the profile, on top of the feed-forward
+            main_controller = PID(
+                kp = 0.1,
+                ki = 0.2,
+                max_output = max_effort,
+                max_integral = 1,
+                tolerance = 0.25,
+            )
+        elif main_controller is None:
             main_controller = PID(
                 kp = 0.1,
                 ki = 0.04,
@@ -176,19 +328,29 @@ class DifferentialDrive:
         else:
             initial_heading = 0
 
-        while True:
+        def step():
 
             # calculate the distance traveled
             left_delta = self.get_left_encoder_position() - starting_left
             right_delta = self.get_right_encoder_position() - starting_right
             dist_traveled = (left_delta + right_delta) / 2
 
-            # PID for distance
-            distance_error = distance - dist_traveled
-            effort = main_controller.update(distance_error)
+            if profile is None:
+                # PID for distance
+                distance_error = distance - dist_traveled
+                effort = main_controller.update(distance_error)
+                done = main_controller.is_done()
+            else:
+                # Feed-forward for where the profile is now, and PID for how far the robot is from it
+                elapsed = time.ticks_diff(time.ticks_ms(), start_time) / 1000
+                position = profile.sample(elapsed)[0]
+                _, velocity, acceleration = profile.sample(elapsed + self._FEED_FORWARD_LEAD)
+                effort = main_controller.update(position - dist_traveled) + self._feed_forward(velocity, acceleration)
+                effort = max(-max_effort, min(max_effort, effort))
+                done = (profile.is_done(elapsed) and main_controller.is_done()) or elapsed > profile.duration + self._PROFILE_SETTLE
             
-            if main_controller.is_done() or time_out.is_done():
-                break
+            if done or time_out.is_done() or self.halted:
+                return True
 
             # calculate heading correction
             if self.imu is not None:
@@ -200,19 +362,18 @@ class DifferentialDrive:
             headingCorrection = secondary_controller.update(initial_heading - current_heading)
             
             self.set_effort(effort - headingCorrection, effort + headingCorrection)
+            return False
 
-            time.sleep(0.01)
-
-        self.stop()
-
-        return not time_out.is_done()
+        self.motion = Motion(self, step, time_out)
+        return self.motion
 
 
-    def turn(self, turn_degrees: float, max_effort: float = 0.5, timeout: float = None, main_controller: Controller = None, secondary_controller: Controller = None, use_imu:bool = True) -> bool:
+    def turn(self, turn_degrees: float, max_effort: float = 0.5, timeout: float = None, main_controller: Controller = None, secondary_controller: Controller = None, use_imu:bool = True, max_velocity: float = None, max_acceleration: float = None, max_jerk: float = None) -> bool:
         """
         Turn the robot some relative heading given in turnDegrees, and exit function when the robot has reached that heading.
         effort is bounded from -1 (turn counterclockwise the relative heading at full speed) to 1 (turn clockwise the relative heading at full speed)
         Uses the IMU to determine the heading of the robot and P control for the motor controller.
+        Blocks until then; turn_async() and start_turn() do the same without blocking.
 
         :param turnDegrees: The number of angle for the robot to turn (In Degrees)
         :type turnDegrees: float
@@ -226,10 +387,41 @@ class DifferentialDrive:
         :type secondary_controller: Controller
         :param use_imu: A boolean flag that changes if the main controller bases its movement off of the imu (True) or the encoders (False)
         :type use_imu: bool
-        :return: if the distance was reached before the timeout
+        :param max_velocity: If given, the turn follows a motion profile with this top speed (In Degrees per Second) instead of turning on the
+            heading error alone, using feed-forward from ks, kv and ka plus main_controller as a small correction
+        :type max_velocity: float
+        :param max_acceleration: Top acceleration of the motion profile (In Degrees per Second squared). Defaults to 4 times max_velocity.
+        :type max_acceleration: float
+        :param max_jerk: If given, the motion profile is an S-curve with this top jerk (In Degrees per Second cubed); otherwise it is trapezoidal.
+        :type max_jerk: float
+        :return: if the distance was reached before the timeout, and without being halted
         :rtype: bool
         """
 
+        motion = self.start_turn(turn_degrees, max_effort, timeout, main_controller, secondary_controller, use_imu, max_velocity, max_acceleration, max_jerk)
+        while not motion.update():
+            time.sleep(0.01)
+        return motion.result
+
+    async def turn_async(self, turn_degrees: float, max_effort: float = 0.5, timeout: float = None, main_controller: Controller = None, secondary_controller: Controller = None, use_imu:bool = True, max_velocity: float = None, max_acceleration: float = None, max_jerk: float = None) -> bool:
+        """
+        turn() as a coroutine, which lets other uasyncio tasks run between control ticks. Takes the same parameters.
+
+        :return: if the heading was reached before the timeout, and without being halted or cancelled
+        :rtype: bool
+        """
+        return await self.start_turn(turn_degrees, max_effort, timeout, main_controller, secondary_controller, use_imu, max_velocity, max_acceleration, max_jerk).wait()
+
+    def start_turn(self, turn_degrees: float, max_effort: float = 0.5, timeout: float = None, main_controller: Controller = None, secondary_controller: Controller = None, use_imu:bool = True, max_velocity: float = None, max_acceleration: float = None, max_jerk: float = None) -> Motion:
+        """
+        Starts turning the robot some relative heading given in turnDegrees, as turn() does, and returns at once. Cancels any motion in progress.
+        Takes the same parameters as turn().
+
+        :return: The motion, to update(), poll, cancel() or await wait() on
+        :rtype: Motion
+        """
+        if self.motion is not None:
+            self.motion.cancel()
         if max_effort < 0:
             max_effort = -max_effort
             turn_degrees = -turn_degrees
@@ -237,8 +429,22 @@ class DifferentialDrive:
         time_out = Timeout(timeout)
         starting_left = self.get_left_encoder_position()
         starting_right = self.get_right_encoder_position()
-
-        if main_controller is None:
+        profile = self._profile(turn_degrees, max_velocity, max_acceleration, max_jerk)
+        start_time = time.ticks_ms()
+        relative_degrees = turn_degrees
+        # Wheel travel (In Centimeters) per degree the robot turns
+        wheel_per_degree = math.pi*self.track_width/360
+
+        if main_controller is None and profile is not None:
+            # Only corrects the robot running behind or ahead of the profile, on top of the feed-forward
+            main_controller = PID(
+                kp = 0.01,
+                ki = 0.02,
+                max_output = max_effort,
+                max_integral = 5,
+                tolerance = 1,
+            )
+        elif main_controller is None:
             main_controller = PID(
                 kp = 0.02,
                 ki = 0.001,
@@ -259,7 +465,7 @@ class DifferentialDrive:
         if use_imu and (self.imu is not None):
             turn_degrees += self.imu.get_yaw()
 
-        while True:
+        def step():
             
             # calculate encoder correction to minimize drift
             left_delta = self.get_left_encoder_position() - starting_left
@@ -273,17 +479,334 @@ class DifferentialDrive:
                 # calculate turn error (in degrees) from the encoder counts
                 turn_error = turn_degrees - ((right_delta-left_delta)/2)*360/(self.track_width*math.pi)
 
-            # Pass the turn error to the main controller to get a turn speed
-            turn_speed = main_controller.update(turn_error)
+            if profile is None:
+                # Pass the turn error to the main controller to get a turn speed
+                turn_speed = main_controller.update(turn_error)
+                done = main_controller.is_done()
+            else:
+                # Feed-forward for where the profile is now, and the main controller for how far the heading is from it
+                elapsed = time.ticks_diff(time.ticks_ms(), start_time) / 1000
+                position = profile.sample(elapsed)[0]
+                _, velocity, acceleration = profile.sample(elapsed + self._FEED_FORWARD_LEAD)
+                turn_speed = main_controller.update(turn_error - (relative_degrees - position))
+                turn_speed += self._feed_forward(velocity*wheel_per_degree, acceleration*wheel_per_degree)
+                turn_speed = max(-max_effort, min(max_effort, turn_speed))
+                done = (profile.is_done(elapsed) and main_controller.is_done()) or elapsed > profile.duration + self._PROFILE_SETTLE
             
-            # exit if timeout or tolerance reached
-            if main_controller.is_done() or time_out.is_done():
-                break
+            # exit if timeout or tolerance reached, or halted
+            if done or time_out.is_done() or self.halted:
+                return True
 
             self.set_effort(-turn_speed - encoder_correction, turn_speed - encoder_correction)
+            return False
+
+        self.motion = Motion(self, step, time_out)
+        return self.motion
+
+    def arc_to(self, dx: float, dy: float, max_effort: float = 0.5, timeout: float = None, main_controller: Controller = None, secondary_controller: Controller = None, max_velocity: float = None, max_acceleration: float = None, max_jerk: float = None, max_bearing: float = 15) -> bool:
+        """
+        Drive to a point in one smooth curve: the arc of a circle that leaves along the robot's heading and passes through the point, with the
+        wheel speeds in the ratio that arc needs for the track width. The robot ends up turned by twice the bearing of the point, facing along
+        the arc. A point further off to the side than max_bearing degrees first gets a turn in place, by as much as brings it to max_bearing, since
+        an arc makes the outer wheel go further than turning to face the point and driving straight to it does; what the arc saves is the stop
+        between the two, and max_effort limits how fast that outer wheel can go.
+        The robot follows a motion profile along the arc, as straight() does with max_velocity, with feed-forward for each wheel's share of it. By
+        default the profile's top speed puts the outer wheel at max_effort, as fast as straight() drives at the same max_effort.
+        Blocks until then; arc_to_async() and start_arc_to() do the same without blocking.
+
+        :param dx: How far ahead of the robot the point is, in centimeters
+        :type dx: float
+        :param dy: How far to the left of the robot the point is, in centimeters
+        :type dy: float
+        :param max_effort: The maximum effort for each wheel, from more than ks to 1
+        :type max_effort: float
+        :param timeout: The amount of time before the robot stops trying to reach the point and continues to the next step in the code
+        :type timeout: float
+        :param main_controller: The main controller, for correcting how far along the arc the robot is against the motion profile
+        :type main_controller: Controller
+        :param secondary_controller: The secondary controller, for keeping the heading where the arc has it
+        :type secondary_controller: Controller
+        :param max_velocity: Top speed along the arc (In Centimeters per Second). Defaults to the speed that puts the outer wheel at max_effort.
+        :type max_velocity: float
+        :param max_acceleration: Top acceleration of the motion profile (In Centimeters per Second squared). Defaults to the acceleration that puts the outer wheel at max_effort from rest, or 8 times max_velocity if ka is 0.
+        :type max_acceleration: float
+        :param max_jerk: If given, the motion profile is an S-curve with this top jerk (In Centimeters per Second cubed); otherwise it is trapezoidal.
+        :type max_jerk: float
+        :param max_bearing: How far to the side (In Degrees) a point can be and still be driven to in one arc
+        :type max_bearing: float
+        :return: if the point was reached before the timeout, and without being halted
+        :rtype: bool
+        :raises ValueError: If max_effort is no more than ks, the effort that just gets a wheel turning
+        """
+        motion = self.start_arc_to(dx, dy, max_effort, timeout, main_controller, secondary_controller, max_velocity, max_acceleration, max_jerk, max_bearing)
+        while not motion.update():
+            time.sleep(0.01)
+        return motion.result
+
+    async def arc_to_async(self, dx: float, dy: float, max_effort: float = 0.5, timeout: float = None, main_controller: Controller = None, secondary_controller: Controller = None, max_velocity: float = None, max_acceleration: float = None, max_jerk: float = None, max_bearing: float = 15) -> bool:
+        """
+        arc_to() as a coroutine, which lets other uasyncio tasks run between control ticks. Takes the same parameters.
+
+        :return: if the point was reached before the timeout, and without being halted or cancelled
+        :rtype: bool
+        """
+        return await self.start_arc_to(dx, dy, max_effort, timeout, main_controller, secondary_controller, max_velocity, max_acceleration, max_jerk, max_bearing).wait()
+
+    def start_arc_to(self, dx: float, dy: float, max_effort: float = 0.5, timeout: float = None, main_controller: Controller = None, secondary_controller: Controller = None, max_velocity: float = None, max_acceleration: float = None, max_jerk: float = None, max_bearing: float = 15) -> Motion:
+        """
+        Starts driving to a point in one curve, as arc_to() does, and returns at once. Cancels any motion in progress.
+        Takes the same parameters as arc_to().
+
+        :return: The motion, to update(), poll, cancel() or await wait() on
+        :rtype: Motion
+        """
+        max_effort = abs(max_effort)
+        if max_effort <= self.ks:
+            # The wheels would never turn, and the default top speed would be 0 or less
+            raise ValueError("max_effort must be more than ks, %g" % self.ks)
+        if self.motion is not None:
+            self.motion.cancel()
+        time_out = Timeout(timeout)
+
+        # Heading in degrees, from the IMU or, without one, from the encoders
+        def heading():
+            if self.imu is not None:
+                return self.imu.get_yaw()
+            return math.degrees((self.get_right_encoder_position() - self.get_left_encoder_position())/self.track_width)
+
+        bearing = math.degrees(math.atan2(dy, dx))
+        turning = None
+        if abs(bearing) > max_bearing:
+            # Turns in place first, so the point is at max_bearing
+            turning = self.start_turn(bearing - math.copysign(max_bearing, bearing), max_effort, timeout)
+        initial_heading = heading()
 
+        if main_controller is None:
+            # Only corrects the robot running behind or ahead of the profile, on top of the feed-forward
+            main_controller = PID(
+                kp = 0.1,
+                ki = 0.2,
+                max_output = max_effort,
+                max_integral = 1,
+                tolerance = 0.25,
+            )
+        if secondary_controller is None:
+            secondary_controller = PID(
+                kp = 0.075, kd=0.001,
+            )
+
+        # When the arc starts, once any turn first has ended: the encoder positions, heading and time, then its curvature, each wheel's speed for
+        # a speed of 1 along it, and the motion profile along it
+        arc = []
+
+        def plan():
+            # The point as seen from where the turn first really left the robot, rather than where it was asked to
+            radians = math.radians(heading() - initial_heading)
+            x = dx*math.cos(radians) + dy*math.sin(radians)
+            y = dy*math.cos(radians) - dx*math.sin(radians)
+            # The arc turns the robot by twice the bearing of the point, and is longer than the straight line to it by the ratio of that angle to
+            # its sine
+            angle = 2*math.atan2(y, x)
+            chord = _length(x, y)
+            length = chord*(angle/2)/math.sin(angle/2) if angle != 0 else chord
+            curvature = angle/length if length > 0 else 0
+            left_share = 1 - curvature*self.track_width/2
+            right_share = 1 + curvature*self.track_width/2
+            # The effort past ks the outer wheel has, all of it for speed at the top of the profile and for acceleration at the start
+            headroom = (max_effort - self.ks)/max(abs(left_share), abs(right_share))
+            velocity = max_velocity
+            if velocity is None:
+                velocity = headroom/self.kv
+            acceleration = max_acceleration
+            if acceleration is None:
+                acceleration = headroom/self.ka if self.ka > 0 else 8*velocity
+            arc.extend((self.get_left_encoder_position(), self.get_right_encoder_position(), heading(), time.ticks_ms(),
+                        curvature, left_share, right_share, self._profile(length, velocity, acceleration, max_jerk)))
+
+        def step():
+            if turning is not None and not turning.update():
+                return False
+            if turning is not None and not turning.result:
+                return True
+            if not arc:
+                plan()
+            curvature, left_share, right_share, profile = arc[4:]
+
+            left_delta = self.get_left_encoder_position() - arc[0]
+            right_delta = self.get_right_encoder_position() - arc[1]
+            dist_traveled = (left_delta + right_delta) / 2
+
+            # Feed-forward for where the profile is now, and PID for how far the robot is from it
+            elapsed = time.ticks_diff(time.ticks_ms(), arc[3]) / 1000
+            position = profile.sample(elapsed)[0]
+            _, velocity, acceleration = profile.sample(elapsed + self._FEED_FORWARD_LEAD)
+            effort = main_controller.update(position - dist_traveled)
+            done = (profile.is_done(elapsed) and main_controller.is_done()) or elapsed > profile.duration + self._PROFILE_SETTLE
+
+            if done or time_out.is_done() or self.halted:
+                return True
+
+            # Keeps the heading where the arc has it for the distance travelled
+            heading_correction = secondary_controller.update(math.degrees(curvature*dist_traveled) - (heading() - arc[2]))
+
+            left_effort = effort + self._feed_forward(velocity*left_share, acceleration*left_share) - heading_correction
+            right_effort = effort + self._feed_forward(velocity*right_share, acceleration*right_share) + heading_correction
+            # Scales both wheels down together past max_effort, so the robot falls behind the profile rather than off the arc
+            scale = max_effort/max(max_effort, abs(left_effort), abs(right_effort))
+            self.set_effort(left_effort*scale, right_effort*scale)
+            return False
+
+        self.motion = Motion(self, step, time_out)
+        return self.motion
+
+    def follow_path(self, waypoints: list, max_speed: float = 25, lookahead: float = 15, timeout: float = None, max_acceleration: float = None, tolerance: float = 1, odometry: Odometry = None) -> bool:
+        """
+        Drive through a list of waypoints without stopping at them, following the straight lines between them with pure pursuit: every control
+        tick, the robot steers along the arc through the point on the path lookahead centimeters ahead of it, by setting its wheel speeds with
+        set_speed(), with feed-forward from ks and kv. It slows down for tight arcs, so the outer wheel stays under max_speed, and to stop at the
+        last waypoint. Corners are cut by up to about a third of the lookahead.
+        Blocks until then; follow_path_async() and start_follow_path() do the same without blocking.
+
+        :param waypoints: (x, y) points to drive through in centimeters, relative to where the robot is when it starts: x ahead of it and y to its left
+        :type waypoints: list
+        :param max_speed: The top speed (In Centimeters per Second) of the robot, and of its outer wheel on arcs
+        :type max_speed: float
+        :param lookahead: How far ahead along the path (In Centimeters) to steer for. Shorter follows the path more closely, longer more smoothly.
+        :type lookahead: float
+        :param timeout: The amount of time before the robot stops trying to reach the last waypoint and continues to the next step in the code
+        :type timeout: float
+        :param max_acceleration: How quickly the robot speeds up and slows down (In Centimeters per Second squared). Defaults to 2 times max_speed.
+        :type max_acceleration: float
+        :param tolerance: How close to the last waypoint (In Centimeters) counts as reaching it
+        :type tolerance: float
+        :param odometry: Where the pose of the robot comes from. Defaults to an Odometry over the drivetrain's motors and IMU, made on first use.
+        :type odometry: Odometry
+        :return: if the last waypoint was reached before the timeout, and without being halted
+        :rtype: bool
+        """
+        motion = self.start_follow_path(waypoints, max_speed, lookahead, timeout, max_acceleration, tolerance, odometry)
+        while not motion.update():
             time.sleep(0.01)
+        return motion.result
 
-        self.stop()
+    async def follow_path_async(self, waypoints: list, max_speed: float = 25, lookahead: float = 15, timeout: float = None, max_acceleration: float = None, tolerance: float = 1, odometry: Odometry = None) -> bool:
+        """
+        follow_path() as a coroutine, which lets other uasyncio tasks run between control ticks. Takes the same parameters.
 
-        return not time_out.is_done()
+        :return: if the last waypoint was reached before the timeout, and without being halted or cancelled
+        :rtype: bool
+        """
+        return await self.start_follow_path(waypoints, max_speed, lookahead, timeout, max_acceleration, tolerance, odometry).wait()
+
+    def start_follow_path(self, waypoints: list, max_speed: float = 25, lookahead: float = 15, timeout: float = None, max_acceleration: float = None, tolerance: float = 1, odometry: Odometry = None) -> Motion:
+        """
+        Starts driving through a list of waypoints, as follow_path() does, and returns at once. Cancels any motion in progress.
+        Takes the same parameters as follow_path().
+
+        :return: The motion, to update(), poll, cancel() or await wait() on
+        :rtype: Motion
+        """
+        if self.motion is not None:
+            self.motion.cancel()
+        if max_acceleration is None:
+            max_acceleration = 2*max_speed
+        if odometry is None:
+            odometry = self._odometry()
+
+        time_out = Timeout(timeout)
+        # The path in the odometry's frame: where the robot is now, then each waypoint moved and turned with the robot
+        x, y, heading = odometry.get_pose()
+        cos = math.cos(math.radians(heading))
+        sin = math.sin(math.radians(heading))
+        path = [(x, y)] + [(x + px*cos - py*sin, y + px*sin + py*cos) for px, py in waypoints]
+        # Length of each segment of the path, and of the path after it
+        lengths = [_length(path[i + 1][0] - path[i][0], path[i + 1][1] - path[i][1]) for i in range(len(path) - 1)]
+        after = [0.0]*len(lengths)
+        for i in range(len(lengths) - 2, -1, -1):
+            after[i] = after[i + 1] + lengths[i + 1]
+        # The segment the robot is along, its speed at the last tick, and the time of the last tick
+        state = [0, 0.0, time.ticks_ms()]
+
+        def along(i, x, y):
+            # How far along segment i the point nearest (x, y) is, from 0 at its start to 1 at its end, and how far away it is
+            (x0, y0), (x1, y1) = path[i], path[i + 1]
+            if lengths[i] == 0:
+                return 1.0, _length(x - x0, y - y0)
+            t = max(0.0, min(1.0, ((x - x0)*(x1 - x0) + (y - y0)*(y1 - y0))/(lengths[i]*lengths[i])))
+            return t, _length(x - x0 - t*(x1 - x0), y - y0 - t*(y1 - y0))
+
+        def step():
+            if time_out.is_done() or self.halted or not lengths:
+                return True
+            x, y, heading = odometry.get_pose()
+
+            # Move on to the next segment once the robot is past the end of this one, or nearer the next
+            i = state[0]
+            t, off = along(i, x, y)
+            while i + 1 < len(lengths):
+                t_next, off_next = along(i + 1, x, y)
+                if t < 1 and off_next > off:
+                    break
+                i, t, off = i + 1, t_next, off_next
+            state[0] = i
+            remaining = lengths[i]*(1 - t) + after[i]
+            if i + 1 == len(lengths) and (t >= 1 or _length(path[-1][0] - x, path[-1][1] - y) < tolerance):
+                return True
+
+            # The point lookahead further along the path than the nearest, or the last waypoint
+            ahead = lookahead
+            j = i
+            target = path[-1]
+            while j < len(lengths):
+                left_on = lengths[j]*(1 - t) if j == i else lengths[j]
+                if ahead <= left_on:
+                    share = 1 - (left_on - ahead)/lengths[j]
+                    (x0, y0), (x1, y1) = path[j], path[j + 1]
+                    target = (x0 + share*(x1 - x0), y0 + share*(y1 - y0))
+                    break
+                ahead -= left_on
+                j += 1
+
+            # Curvature of the arc from the robot through the target, from the target's offset to its left
+            dx = target[0] - x
+            dy = target[1] - y
+            radians = math.radians(heading)
+            sideways = -dx*math.sin(radians) + dy*math.cos(radians)
+            squared = dx*dx + dy*dy
+            curvature = 2*sideways/squared if squared > 0 else 0
+
+            now = time.ticks_ms()
+            dt = time.ticks_diff(now, state[2])/1000
+            state[2] = now
+            # The outer wheel goes faster than the robot by half the track width times the curvature, so the robot goes slower on tight arcs
+            top = max_speed/(1 + abs(curvature)*self.track_width/2)
+            speed = min(top, math.sqrt(2*max_acceleration*remaining), state[1] + max_acceleration*dt)
+            state[1] = speed
+            self.set_speed(speed*(1 - curvature*self.track_width/2), speed*(1 + curvature*self.track_width/2), True)
+            return False
+
+        self.motion = Motion(self, step, time_out)
+        return self.motion
+
+    def _odometry(self) -> Odometry:
+        # The drivetrain's own odometry, made the first time it is needed
+        if self.odometry is None:
+            self.odometry = Odometry(self.left_motor, self.right_motor, self.imu, self.wheel_diam, self.track_width)
+        return self.odometry
+
+    def _profile(self, distance: float, max_velocity: float, max_acceleration: float, max_jerk: float) -> MotionProfile:
+        # The motion profile for a move, or None if it has no top speed and drives on its error alone
+        if max_velocity is None:
+            return None
+        if max_acceleration is None:
+            max_acceleration = 4*max_velocity
+        if max_jerk is None:
+            return TrapezoidalProfile(distance, max_velocity, max_acceleration)
+        return SCurveProfile(distance, max_velocity, max_acceleration, max_jerk)
+
+    def _feed_forward(self, velocity: float, acceleration: float) -> float:
+        # The effort for a wheel to follow a speed (In Centimeters per Second) and acceleration (In Centimeters per Second squared)
+        direction = velocity if velocity != 0 else acceleration
+        if direction == 0:
+            return 0
+        return math.copysign(self.ks, direction) + self.kv*velocity + self.ka*acceleration
@@ -64,6 +64,7 @@ class EncodedMotor:
             kd=0,
         )
         self.speedController = self.DEFAULT_SPEED_CONTROLLER
+        self.feed_forward = 0
         self.prev_position = 0
         self.speed = 0
         # Use a virtual timer so we can leave the hardware timers up for the user
@@ -114,22 +115,27 @@ class EncodedMotor:
         # Convert from counts per 20ms to rpm (60 sec/min, 50 Hz)
         return self.speed*(60*50)/self._encoder.resolution
 
-    def set_speed(self, speed_rpm: float = None):
+    def set_speed(self, speed_rpm: float = None, feed_forward: float = 0):
         """
         Sets target speed (in rpm) to be maintained passively
         Call with no parameters or 0 to turn off speed control
+        Changing the speed while speed control is on keeps the controller's history, so it can be called every control tick.
 
         :param target_speed_rpm: The target speed for the motor in rpm, or None
         :type target_speed_rpm: float, or None
+        :param feed_forward: Effort added to the speed controller's, about what the motor needs to hold the speed, so it gets there sooner
+        :type feed_forward: float
         """
         if speed_rpm is None or speed_rpm == 0:
             self.target_speed = None
             self.set_effort(0)
             return
+        if self.target_speed is None:
+            self.speedController.clear_history()
+            self.prev_position = self.get_position_counts()
         # Convert from rev per min to counts per 20ms (60 sec/min, 50 Hz)
         self.target_speed = speed_rpm*self._encoder.resolution/(60*50)
-        self.speedController.clear_history()
-        self.prev_position = self.get_position_counts()
+        self.feed_forward = feed_forward
 
     def set_speed_controller(self, new_controller: Controller):
         """
@@ -149,6 +155,6 @@ class EncodedMotor:
         self.speed = current_position - self.prev_position
         if self.target_speed is not None:
             error = self.target_speed - self.speed
-            effort = self.speedController.update(error)
+            effort = self.speedController.update(error) + self.feed_forward
             self._motor.set_effort(effort)
         self.prev_position = current_position
\ No newline at end of file
@@ -0,0 +1,138 @@
+import math
+
+"""
+Motion profiles: how far along a move should be at each moment, so that it speeds up and slows down smoothly
+"""
+
+class MotionProfile:
+
+    def __init__(self, distance: float):
+        """
+        A move of some distance, starting and ending at rest. Subclasses work out the segments of the move once, when it is made; each segment has
+        a constant jerk, so sampling it is a few multiplications.
+
+        :param distance: How far to move, in any unit; negative to move backwards
+        :type distance: float
+        """
+        self.distance = distance
+        # (start time, position, velocity, acceleration, jerk) at the start of each segment, for a move forwards
+        self.segments = []
+        self.duration = 0.0
+        self._segment = 0
+
+    def _add(self, duration: float, jerk: float, acceleration: float = None) -> None:
+        # Appends a segment to the move, starting where the last one ended, with the acceleration set to acceleration if given
+        if duration <= 0:
+            return
+        if self.segments:
+            t, p, v, a, j = self.segments[-1]
+            dt = self.duration - t
+            p, v, a = p + v*dt + a*dt*dt/2 + j*dt*dt*dt/6, v + a*dt + j*dt*dt/2, a + j*dt
+        else:
+            p = v = a = 0.0
+        if acceleration is not None:
+            a = acceleration
+        self.segments.append((self.duration, p, v, a, jerk))
+        self.duration += duration
+
+    def sample(self, t: float):
+        """
+        Where the move should be at time t after it started
+
+        :param t: Seconds since the start of the move
+        :type t: float
+        :return: (position, velocity, acceleration), in the unit of the distance per second and per second squared
+        :rtype: tuple
+        """
+        if not self.segments or t >= self.duration:
+            return self.distance, 0.0, 0.0
+        if t < 0:
+            t = 0.0
+        # Moves are sampled in order, so the segment is usually the one from last time or the next
+        i = self._segment
+        if self.segments[i][0] > t:
+            i = 0
+        while i + 1 < len(self.segments) and self.segments[i + 1][0] <= t:
+            i += 1
+        self._segment = i
+        start, p, v, a, j = self.segments[i]
+        dt = t - start
+        p, v, a = p + v*dt + a*dt*dt/2 + j*dt*dt*dt/6, v + a*dt + j*dt*dt/2, a + j*dt
+        if self.distance < 0:
+            return -p, -v, -a
+        return p, v, a
+
+    def is_done(self, t: float) -> bool:
+        """
+        :return: if the move should have ended by time t after it started
+        :rtype: bool
+        """
+        return t >= self.duration
+
+class TrapezoidalProfile(MotionProfile):
+
+    def __init__(self, distance: float, max_velocity: float, max_acceleration: float):
+        """
+        Speeds up at max_acceleration to max_velocity, holds it, and slows down at max_acceleration to stop at distance. A short move stops
+        speeding up halfway, before reaching max_velocity.
+
+        :param distance: How far to move, in any unit; negative to move backwards
+        :type distance: float
+        :param max_velocity: Top speed, in the unit of the distance per second
+        :type max_velocity: float
+        :param max_acceleration: Top acceleration, in the unit of the distance per second squared
+        :type max_acceleration: float
+        """
+        super().__init__(distance)
+        d = abs(distance)
+        v = min(max_velocity, math.sqrt(d*max_acceleration))
+        ramp = v/max_acceleration
+        self._add(ramp, 0.0, max_acceleration)
+        self._add((d - v*ramp)/v if v > 0 else 0.0, 0.0, 0.0)
+        self._add(ramp, 0.0, -max_acceleration)
+
+class SCurveProfile(MotionProfile):
+
+    def __init__(self, distance: float, max_velocity: float, max_acceleration: float, max_jerk: float):
+        """
+        A jerk limited move: the acceleration itself ramps up and down at max_jerk, so the move starts and ends without a jolt. Seven segments:
+        jerk up, hold acceleration, jerk down to top speed, cruise, and the same in reverse. Segments a short move has no room for are left out,
+        and its top speed and acceleration are lowered to fit.
+
+        :param distance: How far to move, in any unit; negative to move backwards
+        :type distance: float
+        :param max_velocity: Top speed, in the unit of the distance per second
+        :type max_velocity: float
+        :param max_acceleration: Top acceleration, in the unit of the distance per second squared
+        :type max_acceleration: float
+        :param max_jerk: Top jerk, in the unit of the distance per second cubed
+        :type max_jerk: float
+        """
+        super().__init__(distance)
+        d = abs(distance)
+        v = max_velocity
+        if 2*self._ramp_distance(v, max_acceleration, max_jerk) > d:
+            # No room to reach max_velocity, so the top speed is the one whose speeding up and slowing down cover the distance exactly
+            v = (d*math.sqrt(max_jerk)/2)**(2/3)
+            if v*max_jerk > max_acceleration*max_acceleration:
+                # Fast enough to reach max_acceleration on the way
+                k = max_acceleration/max_jerk
+                v = max_acceleration/2*(-k + math.sqrt(k*k + 4*d/max_acceleration))
+        if v*max_jerk < max_acceleration*max_acceleration:
+            # Reaches top speed before top acceleration
+            jerk_time = math.sqrt(v/max_jerk)
+            hold_time = 0.0
+        else:
+            jerk_time = max_acceleration/max_jerk
+            hold_time = v/max_acceleration - jerk_time
+        cruise = (d - 2*self._ramp_distance(v, max_acceleration, max_jerk))/v if v > 0 else 0.0
+        for duration, jerk in ((jerk_time, max_jerk), (hold_time, 0.0), (jerk_time, -max_jerk), (cruise, 0.0),
+                               (jerk_time, -max_jerk), (hold_time, 0.0), (jerk_time, max_jerk)):
+            self._add(duration, jerk)
+
+    @staticmethod
+    def _ramp_distance(v: float, max_acceleration: float, max_jerk: float) -> float:
+        # Distance covered speeding up from rest to v, which is symmetric, so at v/2 on average
+        if v*max_jerk < max_acceleration*max_acceleration:
+            return v*math.sqrt(v/max_jerk)
+        return v*(max_acceleration/max_jerk + v/max_acceleration)/2
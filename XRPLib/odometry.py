@@ -0,0 +1,212 @@
+from .encoded_motor import EncodedMotor
+from .encoder import Encoder
+from .imu import IMU
+from machine import Timer
+from array import array
+import time
+import math
+
+"""
+Odometry: keeps track of where the robot is from its encoders and IMU, in the background
+"""
+
+class Odometry:
+
+    _DEFAULT_ODOMETRY_INSTANCE = None
+
+    # Ticks work in integers, since on the XRP every float a calculation makes is a new object on the heap. Headings are in 65536ths of a turn,
+    # positions in 1024ths of an encoder count, and sines come from a table of 1024 steps around the turn, scaled by 16384.
+    _TURN = 65536
+    _COUNT = 1024
+    _SINES = array('h', [round(16384*math.sin(2*math.pi*i/1024)) for i in range(1025)])
+
+    @classmethod
+    def get_default_odometry(cls):
+        """
+        Get the default XRP v2 odometry instance, following the default motors and IMU. This is a singleton, so only one instance of it will ever
+        exist, and it starts running when first requested.
+        """
+        if cls._DEFAULT_ODOMETRY_INSTANCE is None:
+            cls._DEFAULT_ODOMETRY_INSTANCE = cls(
+                EncodedMotor.get_default_encoded_motor(index=1),
+                EncodedMotor.get_default_encoded_motor(index=2),
+                IMU.get_default_imu()
+            )
+        return cls._DEFAULT_ODOMETRY_INSTANCE
+
+    def __init__(self, left_motor: EncodedMotor, right_motor: EncodedMotor, imu: IMU = None, wheel_diam: float = 6.0, wheel_track: float = 15.5, freq: int = 100, history: int = 200):
+        """
+        Tracks the pose of the robot, (x, y, heading), on a timer: each tick adds how far the wheels turned since the last tick, along the heading
+        from the IMU, or from the wheels if there is no IMU. x is ahead of where the robot was when the odometry started and y to its left, in
+        centimeters, and heading is counterclockwise in degrees, unbounded like IMU.get_yaw(). The poses of the last history ticks are kept, so
+        get_pose_at() can say where the robot was when something happened, such as a sensor reading.
+        Ticks keep their poses in arrays made here and do their sums in small integers, so they put nothing on the heap, apart from scaling the
+        IMU's yaw. Do not reset the encoders while it runs.
+
+        :param left_motor: The left motor of the drivetrain
+        :type left_motor: EncodedMotor
+        :param right_motor: The right motor of the drivetrain
+        :type right_motor: EncodedMotor
+        :param imu: The IMU of the robot. If None, the heading comes from the encoders alone.
+        :type imu: IMU
+        :param wheel_diam: The diameter of the wheels in centimeters. Defaults to 6 cm.
+        :type wheel_diam: float
+        :param wheel_track: The distance between the wheels in centimeters. Defaults to 15.5 cm.
+        :type wheel_track: float
+        :param freq: Ticks per second. Defaults to 100.
+        :type freq: int
+        :param history: How many ticks of poses to keep, at least 2. Defaults to 200, 2 seconds at 100 Hz.
+        :type history: int
+        """
+        self.left_motor = left_motor
+        self.right_motor = right_motor
+        self.imu = imu
+        self.cm_per_count = math.pi*wheel_diam/Encoder.resolution
+        self.turn_per_degree = self._TURN/360
+        # Heading in 256ths of a _TURN unit per count the right wheel is ahead of the left, for turning without an IMU
+        self.turn_per_count = round(256*self._TURN*self.cm_per_count/(2*math.pi*wheel_track))
+        self.period_us = 1000000//freq
+        self.freq = freq
+
+        # Ring buffer of poses: time of each tick in time.ticks_us(), x and y in _COUNT units, and heading in _TURN units. index is the newest,
+        # and count how many are filled.
+        self.history = max(2, history)
+        self.times = array('l', [0]*self.history)
+        self.xs = array('l', [0]*self.history)
+        self.ys = array('l', [0]*self.history)
+        self.headings = array('l', [0]*self.history)
+        self.index = 0
+        self.count = 0
+        # Encoder counts at the last tick. The heading is the IMU's yaw plus heading_offset or, without an IMU, heading_offset plus the count
+        # the right wheel is ahead of the left times turn_per_count, in 256ths.
+        self.last_left = 0
+        self.last_right = 0
+        self.heading_offset = 0
+
+        # Bound once, since binding the method for every tick would make a new object each time
+        self._tick = self.update
+        self.update_timer = Timer(-1)
+        self.running = False
+        self.reset_pose()
+        self.start()
+
+    def start(self) -> None:
+        """
+        Starts the ticks, if they are not running. Odometry starts running when it is made.
+        """
+        if not self.running:
+            self.running = True
+            self.update_timer.init(freq=self.freq, callback=self._tick)
+
+    def stop(self) -> None:
+        """
+        Stops the ticks. The pose stays where it was; moves made while stopped are missed.
+        """
+        self.update_timer.deinit()
+        self.running = False
+
+    def reset_pose(self, x: float = 0, y: float = 0, heading: float = 0) -> None:
+        """
+        Sets where the robot is now, and forgets the poses before.
+
+        :param x: centimeters ahead of the origin
+        :type x: float
+        :param y: centimeters to the left of the origin
+        :type y: float
+        :param heading: degrees counterclockwise from x
+        :type heading: float
+        """
+        self.last_left = self.left_motor.get_position_counts()
+        self.last_right = self.right_motor.get_position_counts()
+        turn = round(heading*self.turn_per_degree)
+        if self.imu is not None:
+            self.heading_offset = turn - int(self.imu.get_yaw()*self.turn_per_degree)
+        else:
+            self.heading_offset = 256*turn - (self.last_right - self.last_left)*self.turn_per_count
+        self.index = 0
+        self.times[0] = time.ticks_us()
+        self.xs[0] = round(x/self.cm_per_count*self._COUNT)
+        self.ys[0] = round(y/self.cm_per_count*self._COUNT)
+        self.headings[0] = turn
+        self.count = 1
+
+    def update(self, timer=None) -> None:
+        """
+        Non-api method; one tick, run by the timer: reads the encoders and IMU and adds the new pose to the history
+        """
+        left = self.left_motor.get_position_counts()
+        right = self.right_motor.get_position_counts()
+        # Twice the distance forward, in counts
+        forward = left - self.last_left + right - self.last_right
+        self.last_left = left
+        self.last_right = right
+
+        i = self.index
+        if self.imu is not None:
+            heading = int(self.imu.get_yaw()*self.turn_per_degree) + self.heading_offset
+        else:
+            heading = (self.heading_offset + (right - left)*self.turn_per_count) >> 8
+        # Along the heading halfway through the tick, which is exact for a robot turning steadily
+        middle = ((self.headings[i] + heading) >> 1) & 0xFFFF
+        step = middle >> 6
+        part = middle & 63
+        sines = self._SINES
+        sine = sines[step] + (((sines[step + 1] - sines[step])*part) >> 6)
+        step = ((middle + 0x4000) & 0xFFFF) >> 6
+        cosine = sines[step] + (((sines[step + 1] - sines[step])*part) >> 6)
+
+        # Written into the next slot before it becomes the newest, so a reader never sees a pose half written. forward*sine is in 32768ths of a
+        # count, and rounded to _COUNT units.
+        j = i + 1 if i + 1 < self.history else 0
+        self.times[j] = time.ticks_us()
+        self.xs[j] = self.xs[i] + ((forward*cosine + 16) >> 5)
+        self.ys[j] = self.ys[i] + ((forward*sine + 16) >> 5)
+        self.headings[j] = heading
+        self.index = j
+        if self.count < self.history:
+            self.count += 1
+
+    def get_pose(self) -> tuple:
+        """
+        :return: The pose of the robot at the last tick, as (x, y, heading) in centimeters and degrees
+        :rtype: tuple
+        """
+        i = self.index
+        return self._pose(i, i, 0)
+
+    def get_pose_at(self, ticks_us: int) -> tuple:
+        """
+        Where the robot was at a moment, between the ticks either side of it
+
+        :param ticks_us: The moment, as time.ticks_us() read then
+        :type ticks_us: int
+        :return: The pose of the robot then, as (x, y, heading) in centimeters and degrees; the pose at the last tick if the moment is after it, or
+            None if it is before the oldest pose kept
+        :rtype: tuple
+        """
+        i = self.index
+        count = self.count
+        times = self.times
+        back = time.ticks_diff(times[i], ticks_us)
+        if back <= 0:
+            return self._pose(i, i, 0)
+        # Ticks are about period_us apart, so the tick just before the moment is about this many back; only timer jitter needs a step or two more
+        steps = min(count - 1, (back + self.period_us - 1)//self.period_us)
+        before = (i - steps) % self.history
+        while steps < count - 1 and time.ticks_diff(times[before], ticks_us) > 0:
+            steps += 1
+            before = (before - 1) % self.history
+        while steps > 1 and time.ticks_diff(times[(before + 1) % self.history], ticks_us) <= 0:
+            steps -= 1
+            before = (before + 1) % self.history
+        if time.ticks_diff(times[before], ticks_us) > 0:
+            return None
+        after = (before + 1) % self.history
+        return self._pose(before, after, time.ticks_diff(ticks_us, times[before])/time.ticks_diff(times[after], times[before]))
+
+    def _pose(self, before: int, after: int, share: float) -> tuple:
+        # The pose share of the way from the one in slot before to the one in slot after, in centimeters and degrees
+        cm = self.cm_per_count/self._COUNT
+        return ((self.xs[before] + (self.xs[after] - self.xs[before])*share)*cm,
+                (self.ys[before] + (self.ys[after] - self.ys[before])*share)*cm,
+                (self.headings[before] + (self.headings[after] - self.headings[before])*share)/self.turn_per_degree)
@@ -1,5 +1,19 @@
 const xrpId = '51ff9301-d04e-4a0d-91c9-975fca9cdf95' //uuid of main xrp service
 
+//Frame and notification types, matching swarm.py
+const FRAME_SEQUENCED = 0x02;
+const FRAME_ARC = 0x0B;
+const SEQ_LATEST_WINS = 0x01;
+const SEQ_RESTART = 0x04;
+const NOTIFY_DROPPED = 0x02;
+const NOTIFY_DONE = 0x03;
+const NOTIFY_COMPLETED = 0x05;
+const NOTIFY_COMPLETED_MAP = 0x06;
+const NOTIFY_DONE_LIST = 0x07;
+const NOTIFY_TELEMETRY = 0x08;
+const TELEMETRY_VALUES = 5;
+const TELEMETRY_KEY = 0x80;
+
 const button = document.getElementById('KavinBorderPatrol');
 button.onclick = connect;
 
@@ -7,6 +21,9 @@ var device
 var server;
 var service;
 var XRPcommands = [];
+//Latest telemetry from each XRP, by number: the record number and [left mm, right mm, yaw in tenths of a degree, battery, state bits],
+//or null values while waiting for a key record after a missed one
+var telemetry = {};
 
 async function connect(){
     device = await navigator.bluetooth.requestDevice({ filters: [{ services: [xrpId] }] });
@@ -15,19 +32,74 @@ async function connect(){
     const characteristic = await service.getCharacteristic('ed59696a-b609-4cea-a09a-5885cce3c5ca');
     XRPcommands.push(characteristic); //command characteristic
     characteristic.addEventListener('characteristicvaluechanged', handleNotif);
+    await characteristic.startNotifications();
 }
 
 async function send(data){
-    for (var c in XRPcommands){
-        c.writeValueWithoutResponse(data);
+    for (const c of XRPcommands){
+        await c.writeValueWithoutResponse(data);
+    }
+}
+
+function handleNotif(e){
+    const value = e.target.value;
+    const data = new Uint8Array(value.buffer, value.byteOffset, value.byteLength);
+    if (data.length == 1){
+        //An XRP finished a command sent without a sequence number
+        acked(data[0], null);
+    }
+    else if (data.length == 3 && (data[0] == NOTIFY_DONE || data[0] == NOTIFY_DROPPED)){
+        //An XRP finished or dropped the command with sequence number data[2]
+        acked(data[1], data[2]);
+    }
+    else if (data[0] == NOTIFY_COMPLETED){
+        //Several XRPs finished commands sent without a sequence number
+        for (let i = 1; i < data.length; i++) acked(data[i], null);
+    }
+    else if (data[0] == NOTIFY_COMPLETED_MAP){
+        //The same, as a bitmap starting at XRP data[1]
+        for (let i = 2; i < data.length; i++){
+            for (let bit = 0; bit < 8; bit++){
+                if (data[i] >> bit & 1) acked(data[1] + 8 * (i - 2) + bit, null);
+            }
+        }
+    }
+    else if (data[0] == NOTIFY_DONE_LIST){
+        //Pairs of an XRP and the sequence number of the command it finished
+        for (let i = 1; i + 1 < data.length; i += 2) acked(data[i], data[i + 1]);
+    }
+    else if (data[0] == NOTIFY_TELEMETRY){
+        readTelemetry(data);
+    }
+}
+
+//Applies telemetry records, the same way as read_telemetry() in swarm.py
+function readTelemetry(data){
+    let i = 1;
+    while (i + 3 <= data.length){
+        const number = data[i], seq = data[i + 1], mask = data[i + 2];
+        const key = (mask & TELEMETRY_KEY) != 0;
+        const known = telemetry[number];
+        const follows = known && known.values && seq == ((known.seq + 1) & 0xFF);
+        const values = key ? new Array(TELEMETRY_VALUES).fill(0) : (follows ? known.values.slice() : null);
+        i += 3;
+        for (let bit = 0; bit < TELEMETRY_VALUES; bit++){
+            if (!(mask >> bit & 1)) continue;
+            let value = 0, scale = 1, byte;
+            do {
+                byte = data[i++];
+                value += (byte & 0x7F) * scale;
+                scale *= 128;
+            } while (byte & 0x80 && i < data.length);
+            value = value % 2 ? -(value + 1) / 2 : value / 2;
+            if (values) values[bit] = key ? value : values[bit] + value;
+        }
+        telemetry[number] = {seq: seq, values: values};
     }
 }
 
-function handeNotif(e){
-    let data = e.target.value.getUint8();
-    const id = data[0];
-    for (var x in XRPs){
-        if (x.id == id) x.locked = false;
+function acked(id, seq){
+    for (const x of XRPs){
+        if (x.id == id) x.acked(seq);
     }
-    
 }
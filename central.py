@@ -0,0 +1,783 @@
+#A central device for the swarm that runs on a computer instead of in the browser. It holds connections to any number of root XRPs at once, each
+#through a Transport, sends commands as sequenced frames and keeps track of which commands every XRP still has in flight from the notifications that
+#come back. With several roots, it tells each root how many more XRPs its tree holds than the smallest, so new XRPs mostly join the smallest tree.
+#stop() is an emergency stop for one XRP or the whole swarm. A mission sends an XRP a whole route at once, which it follows without waiting on the radio between steps.
+#Named groups map onto the group numbers XRPs join, so one group frame moves every XRP in the group.
+#Its SwarmRegistry keeps a model of every XRP from the notifications and telemetry that come back, and hands consumers such as a UI the changes.
+#BleakTransport talks to real XRPs through the bleak library; LoopbackTransport stands in for a root and its subtree in memory.
+#Usage:
+#    central = SwarmCentral()
+#    await central.add_root(BleakTransport("28:CD:C1:00:00:01"))
+#    await central.send(3, 90, 50)
+#    await central.send_arc(3, 40, 30)
+#    await central.join(3, "squad")
+#    await central.send_group("squad", 0, 50)
+import asyncio
+import math
+import time
+
+#UUIDs of the swarm service and its one characteristic, matching swarm.py
+SERVICE_UUID = "51ff9301-d04e-4a0d-91c9-975fca9cdf95"
+COMMAND_UUID = "ed59696a-b609-4cea-a09a-5885cce3c5ca"
+
+#Frame and notification types, matching swarm.py
+_FRAME_SEQUENCED = 0x02
+_FRAME_DEPTH = 0x03
+_FRAME_GROUP = 0x04
+_FRAME_MEMBERSHIP = 0x05
+_FRAME_MISSION = 0x09
+_FRAME_STOP = 0x0A
+_FRAME_ARC = 0x0B
+_STOP_ALL = 0x01
+_SEQ_LATEST_WINS = 0x01
+_SEQ_RESTART = 0x04
+_MISSION_ABORT = 0x02
+_GROUP_ID = 0
+_NOTIFY_JOIN = 0x01
+_NOTIFY_DROPPED = 0x02
+_NOTIFY_DONE = 0x03
+_NOTIFY_COMPLETED = 0x05
+_NOTIFY_COMPLETED_MAP = 0x06
+_NOTIFY_DONE_LIST = 0x07
+_NOTIFY_TELEMETRY = 0x08
+_NOTIFY_PROGRESS = 0x0B
+_NOTIFY_STOPPED = 0x0C
+#Values in a telemetry record, the bit of its mask marking a key record, and the state bit of an XRP following a command, matching swarm.py
+_TELEMETRY_VALUES = 5
+_TELEMETRY_KEY = 0x80
+_STATE_MOVING = 0x01
+#Least effort byte of an arc frame an XRP follows, in hundredths: arc_to() needs more than the drivetrain's ks of 0.1
+_ARC_MIN_EFFORT = 11
+#Header bytes of a mission frame and bytes per step, and the most steps an XRP holds in one mission
+_MISSION_HEADER = 7
+_STEP_SIZE = 4
+MAX_STEPS = 128
+#Every XRP queues up to 8 commands behind the one it is following, so more than 9 in flight would only be dropped
+MAX_IN_FLIGHT = 9
+#An XRP ignores a sequence number matching one of the last 16 it accepted
+_SEQ_WINDOW = 16
+#A root is told its tree's excess again once it is off by this many XRPs, or the tree is back to the smallest, since every XRP in the tree hears of it
+BALANCE_STEP = 4
+
+
+def encode_move(turn: float, distance: float) -> bytes:
+    #The direction, degrees, meters and centimeters bytes of a command
+    degrees = round(abs(turn))
+    centimeters = round(distance)
+    if degrees > 255 or not 0 <= centimeters < 256 * 100:
+        raise ValueError("turn or distance out of range")
+    return bytes((0 if turn >= 0 else 1, degrees, centimeters // 100, centimeters % 100))
+
+
+def encode_point(dx: float, dy: float) -> bytes:
+    #The point of an arc frame, as signed 16 bit little endian centimeters
+    x = round(dx)
+    y = round(dy)
+    if not -32768 <= x < 32768 or not -32768 <= y < 32768:
+        raise ValueError("point out of range")
+    return x.to_bytes(2, "little", signed=True) + y.to_bytes(2, "little", signed=True)
+
+
+class CommandDropped(Exception):
+    #The XRP threw the command away, because its motion queue was full or a latest wins command replaced it, or the mission was aborted, or the XRP
+    #was stopped
+    pass
+
+
+class Transport:
+    """
+    A connection to one root XRP. Subclasses carry frames to the root's command characteristic and hand every notification from it to the
+    central.
+    """
+
+    async def connect(self, on_notify) -> None:
+        """
+        Connects to the root, and calls on_notify with the bytes of every notification from then on.
+        """
+        raise NotImplementedError
+
+    async def write(self, frame: bytes) -> None:
+        """
+        Writes a frame to the root, without waiting for a response.
+        """
+        raise NotImplementedError
+
+    def payload(self) -> int:
+        """
+        Largest frame the connection carries in one write.
+        """
+        return 20
+
+    async def close(self) -> None:
+        pass
+
+
+class BleakTransport(Transport):
+    def __init__(self, address: str):
+        """
+        A root XRP reached through the bleak library, which needs to be installed for this transport.
+
+        :param address: Bluetooth address of the root XRP, or on macOS the UUID the system gives it
+        :type address: str
+        """
+        self.address = address
+        self.client = None
+
+    async def connect(self, on_notify) -> None:
+        try:
+            from bleak import BleakClient
+        except ImportError:
+            raise ImportError("BleakTransport needs bleak, install it with: pip install bleak")
+        self.client = BleakClient(self.address)
+        await self.client.connect()
+        await self.client.start_notify(COMMAND_UUID, lambda _, data: on_notify(bytes(data)))
+
+    async def write(self, frame: bytes) -> None:
+        await self.client.write_gatt_char(COMMAND_UUID, frame, response=False)
+
+    def payload(self) -> int:
+        return self.client.mtu_size - 3
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.disconnect()
+
+
+class LoopbackTransport(Transport):
+    def __init__(self, robots, delay: float = 0.0):
+        """
+        A root XRP and the XRPs below it, in memory. It announces its XRPs when connected, as a root does, and acknowledges every sequenced, arc or 5
+        byte command or mission for one of them after delay seconds, and confirms stops. Commands for any other XRP are ignored. Every frame written is kept in frames.
+
+        :param robots: Numbers of the XRPs in the subtree, the root included
+        :param delay: Seconds between a command being written and its acknowledgement
+        :type delay: float
+        """
+        self.robots = set(robots)
+        self.delay = delay
+        self.frames = []
+        self.on_notify = None
+
+    async def connect(self, on_notify) -> None:
+        self.on_notify = on_notify
+        on_notify(bytes([_NOTIFY_JOIN] + sorted(self.robots)))
+
+    async def write(self, frame: bytes) -> None:
+        self.frames.append(bytes(frame))
+        if (len(frame) == 8 or (len(frame) == 9 and frame[0] == _FRAME_ARC)) and frame[0] in (_FRAME_SEQUENCED, _FRAME_ARC) and frame[3] in self.robots:
+            self._later(bytes((_NOTIFY_DONE, frame[3], frame[1])))
+        elif len(frame) > _MISSION_HEADER and frame[0] == _FRAME_MISSION and frame[3] in self.robots:
+            if frame[5] + (len(frame) - _MISSION_HEADER) // _STEP_SIZE >= frame[6]:
+                self._later(bytes((_NOTIFY_DONE, frame[3], frame[1])))
+        elif len(frame) == 3 and frame[0] == _FRAME_STOP:
+            for number in sorted(self.robots) if frame[2] & _STOP_ALL else [frame[1]] if frame[1] in self.robots else []:
+                self._later(bytes((_NOTIFY_STOPPED, number)))
+        elif len(frame) == 5 and frame[0] in self.robots:
+            self._later(bytes((frame[0],)))
+
+    def payload(self) -> int:
+        return 244
+
+    def _later(self, notification: bytes) -> None:
+        loop = asyncio.get_running_loop()
+        if self.delay > 0:
+            loop.call_later(self.delay, self.on_notify, notification)
+        else:
+            loop.call_soon(self.on_notify, notification)
+
+
+class Robot:
+    #What the central knows about one XRP: the root it is reached through, if known, and its commands in flight
+    def __init__(self, number: int, max_in_flight: int):
+        self.number = number
+        self.root = None
+        self.next_seq = 0
+        #Whether no command to the XRP has been acknowledged yet in this session, see _SEQ_RESTART
+        self.restart = True
+        #Sequence number -> future of every command in flight, resolved by its acknowledgement
+        self.in_flight = {}
+        #Sequence number -> progress callback of every mission in flight that has one, and the sequence number of the last mission sent, while in flight
+        self.progress = {}
+        self.mission = None
+        #Sequence numbers in flight when the last stop was sent, which the stop throws away unless they finish first, and the future its confirmation
+        #resolves
+        self.stopping = ()
+        self.stopped = None
+        self.slots = asyncio.Semaphore(max_in_flight)
+        self.done = 0
+        self.dropped = 0
+
+    def take_seq(self) -> int:
+        #The next sequence number not in flight. Numbers are used in order, so none comes round again within the XRP's duplicate window.
+        while self.next_seq in self.in_flight:
+            self.next_seq = (self.next_seq + 1) & 0xFF
+        seq = self.next_seq
+        self.next_seq = (seq + 1) & 0xFF
+        return seq
+
+
+#Fields SwarmRegistry keeps for every XRP, and their values before anything is known:
+#root: Transport of the root the XRP is reached through
+#above: Number of the XRP whose join notification listed this one among its subtree, so is above it in the tree, or None if it joined by itself
+#pose: (x, y, heading) in centimeters and degrees from the XRP's telemetry, dead reckoned from where it was at its first key record, with x ahead
+#of it then and y to its left, and the heading counting up to the left
+#battery: Battery voltage from its telemetry, as the top 8 bits of the on switch ADC reading
+#moving: Whether it is following a command, from its telemetry
+#acked: Sequence number of the last command it acknowledged
+#in_flight: Sequence numbers of its commands sent and not yet finished, oldest first
+#heard: Registry clock time of the last notification from it
+#missed: Telemetry records lost on the way from it
+#dropped: Commands it threw away
+#timeouts: Commands that got no acknowledgement within the central's timeout
+FIELDS = {"root": None, "above": None, "pose": None, "battery": None, "moving": False, "acked": None, "in_flight": (), "heard": None, "missed": 0,
+          "dropped": 0, "timeouts": 0}
+
+
+class Subscription:
+    #Changes from a SwarmRegistry for one consumer, limited to some fields. With on_diff set, it is called with (number, {field: value}) as each
+    #change happens. Otherwise changes are held, merged per XRP so only the latest value of each field is kept, until take() collects them.
+    def __init__(self, registry, on_diff, fields):
+        self.registry = registry
+        self.on_diff = on_diff
+        self.fields = fields
+        self.pending = {}
+
+    def take(self) -> dict:
+        """
+        Every change held since the last call.
+
+        :return: Number -> {field: value} of every XRP that changed
+        """
+        pending = self.pending
+        self.pending = {}
+        return pending
+
+    def close(self) -> None:
+        self.registry.subscriptions.remove(self)
+
+
+class SwarmRegistry:
+    def __init__(self, clock=time.monotonic):
+        """
+        A model of the swarm on the central, kept up to date from the notifications and telemetry that come back and the commands sent. See FIELDS
+        for what it holds on each XRP. Consumers subscribe to changes instead of reading the whole swarm over and over.
+
+        :param clock: Returns the time in seconds, for the heard field
+        """
+        self.clock = clock
+        #Number -> {field: value}, for every XRP heard of or sent to
+        self.robots = {}
+        self.subscriptions = []
+        #Number -> [record number, values, ..., whether they are current] of each XRP's last telemetry record and the last values applied
+        self.telemetry = {}
+
+    def subscribe(self, on_diff=None, fields=None) -> Subscription:
+        """
+        Starts handing changes to a consumer. Start from snapshot(), since only changes after this are handed on.
+
+        :param on_diff: Called with (number, {field: value}) for every change as it happens. Without it, changes are held until take().
+        :param fields: Names of the fields to hand on changes of, defaulting to all of them
+        """
+        if fields is not None:
+            fields = frozenset(fields)
+            if not fields <= FIELDS.keys():
+                raise ValueError("unknown fields: %s" % ", ".join(sorted(fields - FIELDS.keys())))
+        subscription = Subscription(self, on_diff, fields)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def snapshot(self) -> dict:
+        """
+        Number -> {field: value} of every XRP, copied.
+        """
+        return {number: dict(robot) for number, robot in self.robots.items()}
+
+    def update(self, number: int, **changes) -> None:
+        """
+        Sets fields of an XRP, and hands on those whose value changed to every subscription that wants them.
+        """
+        robot = self.robots.get(number)
+        if robot is None:
+            robot = self.robots[number] = dict(FIELDS)
+        diff = {}
+        for field, value in changes.items():
+            if robot[field] != value:
+                robot[field] = value
+                diff[field] = value
+        if not diff:
+            return
+        for subscription in self.subscriptions:
+            changed = diff
+            if subscription.fields is not None:
+                changed = {field: value for field, value in diff.items() if field in subscription.fields}
+                if not changed:
+                    continue
+            if subscription.on_diff is not None:
+                subscription.on_diff(number, changed)
+            else:
+                pending = subscription.pending.get(number)
+                if pending is None:
+                    subscription.pending[number] = dict(changed)
+                else:
+                    pending.update(changed)
+
+    def count(self, number: int, field: str, by: int = 1) -> None:
+        #Adds to one of the counting fields
+        robot = self.robots.get(number)
+        self.update(number, **{field: (FIELDS[field] if robot is None else robot[field]) + by})
+
+    def notified(self, root, data: bytes) -> None:
+        #Applies a notification from a root. Every XRP named in one is reached through that root.
+        if not data:
+            return
+        now = self.clock()
+        kind = data[0]
+        if len(data) == 1:
+            self.update(data[0], root=root, heard=now)
+        elif kind == _NOTIFY_JOIN:
+            self.update(data[1], root=root, above=None, heard=now)
+            for number in data[2:]:
+                self.update(number, root=root, above=data[1])
+        elif kind == _NOTIFY_DONE and len(data) == 3:
+            self.update(data[1], root=root, acked=data[2], heard=now)
+        elif kind == _NOTIFY_DONE_LIST:
+            for i in range(1, len(data) - 1, 2):
+                self.update(data[i], root=root, acked=data[i + 1], heard=now)
+        elif kind == _NOTIFY_DROPPED and len(data) >= 2:
+            self.update(data[1], root=root, heard=now)
+            self.count(data[1], "dropped")
+        elif kind == _NOTIFY_TELEMETRY:
+            self.read_telemetry(root, data, now)
+        elif (kind == _NOTIFY_PROGRESS and len(data) == 4) or (kind == _NOTIFY_STOPPED and len(data) == 2):
+            self.update(data[1], root=root, heard=now)
+        elif kind == _NOTIFY_COMPLETED:
+            for number in data[1:]:
+                self.update(number, root=root, heard=now)
+        elif kind == _NOTIFY_COMPLETED_MAP:
+            for i in range(2, len(data)):
+                for bit in range(8):
+                    if data[i] >> bit & 1:
+                        self.update(data[1] + 8 * (i - 2) + bit, root=root, heard=now)
+
+    def read_telemetry(self, root, data: bytes, now: float) -> None:
+        #Applies every record in a telemetry notification, as swarm.read_telemetry() does, and moves each XRP's pose on by how far its wheels went
+        #since the last record applied, along the heading halfway between the two records' yaws. Over missed records, that is as if it drove straight.
+        i = 1
+        length = len(data)
+        while i + 3 <= length:
+            number, seq, mask = data[i], data[i + 1], data[i + 2]
+            i += 3
+            values = [0] * _TELEMETRY_VALUES
+            for bit in range(_TELEMETRY_VALUES):
+                if mask >> bit & 1:
+                    value = shift = 0
+                    while i < length and data[i] & 0x80:
+                        value |= (data[i] & 0x7F) << shift
+                        shift += 7
+                        i += 1
+                    if i >= length:
+                        return
+                    value |= data[i] << shift
+                    i += 1
+                    values[bit] = value >> 1 if value & 1 == 0 else -((value + 1) >> 1)
+            known = self.telemetry.get(number)
+            lost = 0 if known is None else (seq - known[0] - 1) & 0xFF
+            if lost:
+                self.count(number, "missed", lost)
+            if not mask & _TELEMETRY_KEY:
+                if known is None or not known[-1] or lost:
+                    #Missed a record, so the values wait for the next key record
+                    if known is not None:
+                        known[0] = seq
+                        known[-1] = False
+                    self.update(number, root=root, heard=now)
+                    continue
+                for k in range(_TELEMETRY_VALUES):
+                    values[k] += known[k + 1]
+            left, right, yaw = values[0], values[1], values[2]
+            robot = self.robots.get(number)
+            pose = None if robot is None else robot["pose"]
+            if pose is None or known is None:
+                pose = (0.0, 0.0, yaw / 10)
+            else:
+                distance = (left - known[1] + right - known[2]) / 20
+                heading = math.radians((known[3] + yaw) / 20)
+                pose = (pose[0] + distance * math.cos(heading), pose[1] + distance * math.sin(heading), yaw / 10)
+            #Record number, the values, and whether the next record can apply on top of them
+            self.telemetry[number] = [seq] + values + [True]
+            self.update(number, root=root, heard=now, pose=pose, battery=values[3], moving=bool(values[4] & _STATE_MOVING))
+
+
+class SwarmCentral:
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT, timeout: float = 30.0, balance: bool = True, registry: SwarmRegistry = None):
+        """
+        Sends commands to XRPs through any number of root XRPs, keeping up to max_in_flight commands in flight to each XRP.
+
+        :param max_in_flight: Most commands sent to one XRP and not yet acknowledged; send() waits for one to finish past it
+        :type max_in_flight: int
+        :param timeout: Seconds send() waits for an acknowledgement before giving up
+        :type timeout: float
+        :param balance: Tells each root how many more XRPs its tree holds than the smallest, which makes XRPs in bigger trees slower to take new ones
+        :type balance: bool
+        :param registry: Registry to keep up to date, defaulting to a new one
+        :type registry: SwarmRegistry
+        """
+        if max_in_flight > 256 - _SEQ_WINDOW:
+            raise ValueError("max_in_flight must leave room for the XRP's duplicate window")
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.roots = []
+        #Number -> Robot, for every XRP heard of or sent to
+        self.robots = {}
+        #Called with (root transport, notification bytes) for every notification, if set
+        self.on_notify = None
+        self.registry = SwarmRegistry() if registry is None else registry
+        self.balance = balance
+        #Root transport -> excess it was last told, and the writes telling them still going
+        self.excess = {}
+        self._writes = set()
+        #Group name -> group number, and the XRPs the central has put in each named group
+        self.groups = {}
+        self.members = {}
+
+    def robot(self, number: int) -> Robot:
+        robot = self.robots.get(number)
+        if robot is None:
+            robot = self.robots[number] = Robot(number, self.max_in_flight)
+        return robot
+
+    async def add_root(self, transport: Transport) -> Transport:
+        """
+        Connects to a root XRP. XRPs are matched to their root from the notifications that come through it, starting with the join notification the
+        root sends for its subtree.
+        """
+        await transport.connect(lambda data: self.notified(transport, data))
+        self.roots.append(transport)
+        self.rebalance()
+        return transport
+
+    async def close(self) -> None:
+        await asyncio.gather(*(root.close() for root in self.roots))
+        self.roots = []
+
+    async def send(self, robot: int, turn: float, distance: float, latest_wins: bool = False) -> None:
+        """
+        Sends an XRP a command and waits until it has finished following it.
+
+        :param robot: Number of the XRP
+        :type robot: int
+        :param turn: Degrees to turn first, positive to the left, at most 255 either way
+        :type turn: float
+        :param distance: Centimeters to drive forward after turning, up to 255 m
+        :type distance: float
+        :param latest_wins: Throws away every command still waiting in the XRP's queue, so this one is followed as soon as the current one ends
+        :type latest_wins: bool
+        :raises CommandDropped: If the XRP threw the command away
+        :raises asyncio.TimeoutError: If no acknowledgement came within the timeout
+        """
+        await self._send_sequenced(robot, _FRAME_SEQUENCED, encode_move(turn, distance), latest_wins)
+
+    async def send_arc(self, robot: int, dx: float, dy: float, latest_wins: bool = False, effort: float = None) -> None:
+        """
+        Sends an XRP a command to drive to a point in one curve, with drivetrain.arc_to(), instead of turning to face it and then driving straight to
+        it, and waits until it has finished. It is sequenced and acknowledged as send() is. The XRP ends up facing along the curve, not toward
+        the point. At the same effort the arc is a little quicker than send()'s turn then straight, and ends closer to the point. arc_to()'s default
+        effort of 0.5 is what send() moves at.
+
+        :param robot: Number of the XRP
+        :type robot: int
+        :param dx: Centimeters ahead of the XRP the point is
+        :type dx: float
+        :param dy: Centimeters to the left of the XRP the point is
+        :type dy: float
+        :param latest_wins: Throws away every command still waiting in the XRP's queue, so this one is followed as soon as the current one ends
+        :type latest_wins: bool
+        :param effort: Most effort for each wheel, from 0.11 to 1, or None for arc_to()'s default
+        :type effort: float
+        :raises ValueError: If effort is out of range
+        :raises CommandDropped: If the XRP threw the command away
+        :raises asyncio.TimeoutError: If no acknowledgement came within the timeout
+        """
+        body = encode_point(dx, dy)
+        if effort is not None:
+            hundredths = round(100 * effort)
+            if not _ARC_MIN_EFFORT <= hundredths <= 100:
+                raise ValueError("effort must be from %.2f to 1" % (_ARC_MIN_EFFORT / 100))
+            body += bytes((hundredths,))
+        await self._send_sequenced(robot, _FRAME_ARC, body, latest_wins)
+
+    async def _send_sequenced(self, robot: int, kind: int, body: bytes, latest_wins: bool) -> None:
+        #Sends a sequenced or arc frame with the next sequence number for the XRP, and waits for its acknowledgement
+        state = self.robot(robot)
+        async with state.slots:
+            seq = state.take_seq()
+            done = asyncio.get_running_loop().create_future()
+            state.in_flight[seq] = done
+            self.registry.update(robot, in_flight=tuple(state.in_flight))
+            options = (_SEQ_LATEST_WINS if latest_wins else 0) | (_SEQ_RESTART if state.restart else 0)
+            frame = bytes((kind, seq, options, robot)) + body
+            try:
+                await self._write(state, (frame,))
+                await asyncio.wait_for(done, self.timeout)
+            except asyncio.TimeoutError:
+                self.registry.count(robot, "timeouts")
+                raise
+            finally:
+                state.in_flight.pop(seq, None)
+                self.registry.update(robot, in_flight=tuple(state.in_flight))
+
+    async def send_mission(self, robot: int, steps, every: int = 0, on_progress=None, timeout: float = None) -> None:
+        """
+        Sends an XRP a mission, a route of steps it follows back to back without waiting on the radio, and waits until it has finished the last
+        step. The mission takes one place in the XRP's queue, behind any commands already sent to it.
+
+        :param robot: Number of the XRP
+        :type robot: int
+        :param steps: (turn, distance) for each step, as for send(), at most MAX_STEPS of them
+        :param every: Steps between progress notifications, or 0 for none
+        :type every: int
+        :param on_progress: Called with the number of steps finished for every progress notification, if set
+        :param timeout: Seconds to wait for the mission to finish, defaulting to the central's timeout for every step
+        :type timeout: float
+        :raises CommandDropped: If the XRP threw the mission away, because it already held one or its queue was full, or it was aborted
+        :raises asyncio.TimeoutError: If the mission did not finish within the timeout
+        """
+        if not 0 < len(steps) <= MAX_STEPS or not 0 <= every < 256:
+            raise ValueError("a mission needs 1 to %d steps" % MAX_STEPS)
+        moves = [encode_move(turn, distance) for turn, distance in steps]
+        state = self.robot(robot)
+        async with state.slots:
+            seq = state.take_seq()
+            done = asyncio.get_running_loop().create_future()
+            state.in_flight[seq] = done
+            if on_progress is not None:
+                state.progress[seq] = on_progress
+            state.mission = seq
+            self.registry.update(robot, in_flight=tuple(state.in_flight))
+            payload = min(root.payload() for root in ([state.root] if state.root is not None else self.roots))
+            per_frame = (payload - _MISSION_HEADER) // _STEP_SIZE
+            frames = [bytes((_FRAME_MISSION, seq, _SEQ_RESTART if state.restart else 0, robot, every, first, len(moves))) + b"".join(moves[first:first + per_frame])
+                      for first in range(0, len(moves), per_frame)]
+            try:
+                await self._write(state, frames)
+                await asyncio.wait_for(done, self.timeout * len(moves) if timeout is None else timeout)
+            except asyncio.TimeoutError:
+                self.registry.count(robot, "timeouts")
+                raise
+            finally:
+                state.in_flight.pop(seq, None)
+                self.registry.update(robot, in_flight=tuple(state.in_flight))
+                state.progress.pop(seq, None)
+                if state.mission == seq:
+                    state.mission = None
+
+    async def abort_mission(self, robot: int) -> None:
+        """
+        Stops the XRP's mission after the step it is following, or throws the mission away if the XRP has not started it, and send_mission() raises
+        CommandDropped. Does nothing if no mission is in flight.
+
+        :param robot: Number of the XRP
+        :type robot: int
+        """
+        state = self.robot(robot)
+        if state.mission is not None:
+            await self._write(state, (bytes((_FRAME_MISSION, state.mission, _MISSION_ABORT, robot, 0, 0, 0)),))
+
+    async def stop(self, robot: int = None, wait: bool = True) -> None:
+        """
+        Emergency stop. Each XRP stopped cuts short the move it is making and throws away every command waiting in its queue, and every command in
+        flight to it that has not finished raises CommandDropped once it confirms the stop. Commands sent after this are followed as usual.
+
+        :param robot: Number of the XRP to stop, or None to stop every XRP
+        :type robot: int
+        :param wait: Waits until every XRP stopped has confirmed it. With robot None, that is every XRP the central has heard of.
+        :type wait: bool
+        :raises asyncio.TimeoutError: If a confirmation did not come within the timeout
+        """
+        targets = list(self.robots.values()) if robot is None else [self.robot(robot)]
+        loop = asyncio.get_running_loop()
+        for state in targets:
+            state.stopping = tuple(state.in_flight)
+            state.stopped = loop.create_future()
+        if robot is None:
+            frame = bytes((_FRAME_STOP, 0, _STOP_ALL))
+            await asyncio.gather(*(root.write(frame) for root in self.roots))
+        else:
+            await self._write(targets[0], (bytes((_FRAME_STOP, robot, 0)),))
+        if wait:
+            await asyncio.wait_for(asyncio.gather(*(state.stopped for state in targets)), self.timeout)
+
+    async def _write(self, state: Robot, frames) -> None:
+        for frame in frames:
+            if state.root is not None:
+                await state.root.write(frame)
+            else:
+                #Not heard from yet, so every root passes it on until the XRP answers
+                await asyncio.gather(*(root.write(frame) for root in self.roots))
+
+    async def send_all(self, commands) -> list:
+        """
+        Sends many commands at once, each through its own root, and waits for them all to finish.
+
+        :param commands: (robot, turn, distance) for each command
+        :return: None for every command that was followed, or the exception send() raised for it
+        """
+        return await asyncio.gather(*(self.send(*command) for command in commands), return_exceptions=True)
+
+    def tree_sizes(self) -> dict:
+        """
+        Number of XRPs known to be reached through each root.
+        """
+        sizes = {root: 0 for root in self.roots}
+        for robot in self.robots.values():
+            if robot.root in sizes:
+                sizes[robot.root] += 1
+        return sizes
+
+    def rebalance(self) -> None:
+        #Tells every root whose tree has grown or shrunk against the smallest one by BALANCE_STEP XRPs, or come back to it, its new excess
+        if not self.balance or not self.roots:
+            return
+        sizes = self.tree_sizes()
+        smallest = min(sizes.values())
+        for root, size in sizes.items():
+            excess = min(255, size - smallest)
+            told = self.excess.get(root, 0)
+            if abs(excess - told) >= BALANCE_STEP or (excess == 0 and told != 0):
+                self.excess[root] = excess
+                write = asyncio.ensure_future(root.write(bytes((_FRAME_DEPTH, 0, excess))))
+                self._writes.add(write)
+                write.add_done_callback(self._writes.discard)
+
+    def group(self, name: str) -> int:
+        """
+        Group number of a named group, taking the lowest number no other name has the first time the name is used.
+
+        :param name: Name of the group
+        :type name: str
+        :raises ValueError: If all 256 group numbers are taken
+        """
+        number = self.groups.get(name)
+        if number is None:
+            taken = set(self.groups.values())
+            number = next((n for n in range(256) if n not in taken), None)
+            if number is None:
+                raise ValueError("every group number is taken")
+            self.groups[name] = number
+            self.members[name] = set()
+        return number
+
+    async def join(self, robot: int, name: str) -> None:
+        """
+        Puts an XRP in a named group, so send_group() moves it. The XRP is told with a membership frame, sent the way commands to it are.
+
+        :param robot: Number of the XRP
+        :type robot: int
+        :param name: Name of the group
+        :type name: str
+        """
+        number = self.group(name)
+        self.members[name].add(robot)
+        await self._write(self.robot(robot), (bytes((_FRAME_MEMBERSHIP, robot, number, 1)),))
+
+    async def leave(self, robot: int, name: str) -> None:
+        """
+        Takes an XRP out of a named group.
+
+        :param robot: Number of the XRP
+        :type robot: int
+        :param name: Name of the group
+        :type name: str
+        """
+        if name not in self.groups:
+            return
+        self.members[name].discard(robot)
+        await self._write(self.robot(robot), (bytes((_FRAME_MEMBERSHIP, robot, self.groups[name], 0)),))
+
+    async def send_group(self, name: str, turn: float, distance: float) -> None:
+        """
+        Sends one command that every XRP in a named group follows, as a single group frame written to each root with members below it. Group
+        commands are not sequenced, so this returns once the frame is written, and each XRP notifies a 1 byte completion when it has finished.
+
+        :param name: Name of the group
+        :type name: str
+        :param turn: Degrees to turn first, positive to the left, at most 255 either way
+        :type turn: float
+        :param distance: Centimeters to drive forward after turning, up to 255 m
+        :type distance: float
+        """
+        frame = bytes((_FRAME_GROUP, _GROUP_ID, self.group(name), 0)) + encode_move(turn, distance)
+        roots = {self.robot(robot).root for robot in self.members[name]}
+        if None in roots:
+            #A member not heard from yet could be below any root
+            roots = self.roots
+        await asyncio.gather(*(root.write(frame) for root in roots))
+
+    def in_flight(self) -> int:
+        """
+        Commands sent and not yet acknowledged, over every XRP.
+        """
+        return sum(len(robot.in_flight) for robot in self.robots.values())
+
+    def notified(self, root: Transport, data: bytes) -> None:
+        #Handles a notification from a root. Every XRP named in one is reached through that root.
+        if not data:
+            return
+        if self.on_notify is not None:
+            self.on_notify(root, data)
+        self.registry.notified(root, data)
+        kind = data[0]
+        if len(data) == 1:
+            self.robot(data[0]).root = root
+        elif kind == _NOTIFY_JOIN:
+            for number in data[1:]:
+                self.robot(number).root = root
+            self.rebalance()
+        elif kind == _NOTIFY_DONE and len(data) == 3:
+            self.finished(root, data[1], data[2])
+        elif kind == _NOTIFY_DONE_LIST:
+            for i in range(1, len(data) - 1, 2):
+                self.finished(root, data[i], data[i + 1])
+        elif kind == _NOTIFY_DROPPED and len(data) >= 2:
+            robot = self.robot(data[1])
+            robot.root = root
+            robot.dropped += 1
+            if len(data) == 3:
+                robot.restart = False
+                done = robot.in_flight.get(data[2])
+                if done is not None and not done.done():
+                    done.set_exception(CommandDropped(data[1], data[2]))
+        elif kind == _NOTIFY_PROGRESS and len(data) == 4:
+            robot = self.robot(data[1])
+            robot.root = root
+            on_progress = robot.progress.get(data[2])
+            if on_progress is not None:
+                on_progress(data[3])
+        elif kind == _NOTIFY_STOPPED and len(data) == 2:
+            robot = self.robot(data[1])
+            robot.root = root
+            for seq in robot.stopping:
+                done = robot.in_flight.get(seq)
+                if done is not None and not done.done():
+                    robot.dropped += 1
+                    done.set_exception(CommandDropped(data[1], seq))
+            robot.stopping = ()
+            if robot.stopped is not None and not robot.stopped.done():
+                robot.stopped.set_result(None)
+        elif kind == _NOTIFY_COMPLETED:
+            for number in data[1:]:
+                self.robot(number).root = root
+        elif kind == _NOTIFY_COMPLETED_MAP:
+            for i in range(2, len(data)):
+                for bit in range(8):
+                    if data[i] >> bit & 1:
+                        self.robot(data[1] + 8 * (i - 2) + bit).root = root
+
+    def finished(self, root: Transport, number: int, seq: int) -> None:
+        robot = self.robot(number)
+        robot.root = root
+        robot.restart = False
+        done = robot.in_flight.get(seq)
+        if done is not None and not done.done():
+            robot.done += 1
+            done.set_result(None)
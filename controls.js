@@ -26,9 +26,15 @@ var config = {
 
 var game = new Phaser.Game(config);
 
+//How many commands can be sent to one XRP before it has acknowledged the first
+const PIPELINE_DEPTH = 3;
+//The max_effort arcs are sent with, in hundredths: half effort, what turn and straight commands move at, and a little quicker than them as an arc
+const ARC_EFFORT = 50;
+//How far to the side, in degrees, arc_to() drives to a point in one arc rather than turning in place first
+const ARC_MAX_BEARING = 15;
+
 class XRP {
     constructor(id, dir) {
-        this.locked = false;
         this.id = id;
         this.dir = dir;
         this.command = {
@@ -38,6 +44,42 @@ class XRP {
             'ticks': 0,
             'rticks': 0
         };
+        //Commands sent but not yet animated, oldest first
+        this.plan = [];
+        //Where the XRP will be once every planned command has been animated. Set, along with command.end, when its sprite is created.
+        this.end = null;
+        //Sequence numbers of commands sent but not yet acknowledged
+        this.nextSeq = 0;
+        this.inFlight = new Set();
+        //Whether no command has been acknowledged since the page loaded, so the XRP is told the sequence numbers start again
+        this.restart = true;
+    }
+
+    get locked() {
+        return this.inFlight.size >= PIPELINE_DEPTH;
+    }
+
+    sequence() {
+        const seq = this.nextSeq;
+        this.nextSeq = (this.nextSeq + 1) % 256;
+        this.inFlight.add(seq);
+        return seq;
+    }
+
+    acked(seq) {
+        //Commands without a sequence number can only be sent one at a time, so the acknowledgement frees everything.
+        //An acknowledgement for a sequence number that is not in flight is a duplicate and ignored.
+        if (seq === null) this.inFlight.clear();
+        else {
+            this.inFlight.delete(seq);
+            this.restart = false;
+        }
+    }
+
+    dropPlan() {
+        //Forgets the commands that have not started, as the XRP does for a latest wins command
+        this.plan = [];
+        this.end = this.command.end;
     }
 }
 
@@ -80,6 +122,7 @@ function create() {
     for (var n = 1; n < 4; n++){
         sprites.push(this.add.sprite(100*n, 100, 'rick').setInteractive());
         XRPs.push(new XRP(n, 0));
+        XRPs[n - 1].end = XRPs[n - 1].command.end = {'x': 100*n, 'y': 100, 'dir': 0};
     }
 
     for (let i = 0; i < sprites.length; i++){
@@ -88,32 +131,64 @@ function create() {
         });
     }
 
-    this.grass.on('pointerdown', () => {
+    //Clicking the grass sends the selected XRP to that spot, starting from wherever its already planned commands leave it.
+    //Shift-clicking sends a latest wins command, which replaces the commands the XRP has not started yet.
+    //Alt-clicking sends an arc, which drives there in one curve rather than turning and then driving straight.
+    this.grass.on('pointerdown', (pointer) => {
         if (selected != -1) {
-            const dx = game.input.mousePointer.x - sprites[selected].x;
-            const dy = game.input.mousePointer.y - sprites[selected].y;
+            const xrp = XRPs[selected];
+            const latestWins = pointer.event.shiftKey;
+            if (latestWins) xrp.dropPlan();
+            const dx = game.input.mousePointer.x - xrp.end.x;
+            const dy = game.input.mousePointer.y - xrp.end.y;
             const h = Math.sqrt(dx ** 2 + dy ** 2);
-            const sprite = sprites[selected];
-            var angle = -(getAngle(sprite.x, sprite.y, game.input.mousePointer.x, game.input.mousePointer.y, XRPs[selected].dir));
-            sendCommand(XRPs[selected].id, -angle, h);
-            XRPs[selected].locked = true;
-            XRPs[selected].command.rticks = Math.floor((angle) / 0.8);
-            XRPs[selected].command.vr = 0.8;
-            if (XRPs[selected].command.rticks < 0){
-                XRPs[selected].command.rticks *= -1;
-                XRPs[selected].command.vr *= -1;
+            var angle = -(getAngle(xrp.end.x, xrp.end.y, game.input.mousePointer.x, game.input.mousePointer.y, xrp.end.dir));
+            if (pointer.event.altKey) {
+                //The point ahead of the XRP and to its left, which is the way a positive angle turns
+                const radians = angle * Math.PI / 180;
+                sendArc(xrp.id, Math.round(h * Math.cos(radians)), Math.round(h * Math.sin(radians)), xrp.sequence(), latestWins, xrp.restart);
+                //Animated as a turn to face the point and a straight drive to it, then the turn the XRP ends the arc with: as far again as the
+                //bearing it drove the arc at, after turning in place down to ARC_MAX_BEARING
+                plan(xrp, angle, dx, dy, h);
+                plan(xrp, Math.sign(angle) * Math.min(Math.abs(angle), ARC_MAX_BEARING), 0, 0, 0);
+            }
+            else {
+                sendCommand(xrp.id, -angle, h, xrp.sequence(), latestWins, xrp.restart);
+                plan(xrp, angle, dx, dy, h);
             }
-            XRPs[selected].command.vx = 2 * dx / h;
-            XRPs[selected].command.vy = 2 * dy / h;
-            XRPs[selected].command.ticks = Math.floor(h / 2);
             selected = -1;
         }
     })
 }
 
+//Adds a command to the XRP's animation: turning by angle, then driving h pixels along (dx, dy)
+function plan(xrp, angle, dx, dy, h) {
+    const command = {
+        'rticks': Math.floor((angle) / 0.8),
+        'vr': 0.8,
+        'vx': h ? 2 * dx / h : 0,
+        'vy': h ? 2 * dy / h : 0,
+        'ticks': Math.floor(h / 2)
+    };
+    if (command.rticks < 0){
+        command.rticks *= -1;
+        command.vr *= -1;
+    }
+    command.end = {
+        'x': xrp.end.x + command.vx * command.ticks,
+        'y': xrp.end.y + command.vy * command.ticks,
+        'dir': xrp.end.dir - command.vr * command.rticks
+    };
+    xrp.plan.push(command);
+    xrp.end = command.end;
+}
+
 
 function update() {
     for (var i = 0; i < XRPs.length; i++) {
+        if (XRPs[i].command.rticks <= 0 && XRPs[i].command.ticks <= 0 && XRPs[i].plan.length > 0) {
+            XRPs[i].command = XRPs[i].plan.shift();
+        }
         if (XRPs[i].command.rticks > 0) {
             XRPs[i].command.rticks--;
             sprites[i].angle += XRPs[i].command.vr;
@@ -129,12 +204,30 @@ function update() {
     }
 }
 
-function sendCommand(id, turn, drive){
-    const data = new Uint8Array(5);
-    data[0] = id;
-    data[1] = turn > 0 ? 1 : 0;
-    data[2] = Math.abs(turn);
-    data[3] = Math.floor(drive/100);
-    data[4] = drive%100;
+function sendCommand(id, turn, drive, seq, latestWins, restart){
+    const data = new Uint8Array(8);
+    data[0] = FRAME_SEQUENCED;
+    data[1] = seq;
+    data[2] = (latestWins ? SEQ_LATEST_WINS : 0) | (restart ? SEQ_RESTART : 0);
+    data[3] = id;
+    data[4] = turn > 0 ? 1 : 0;
+    data[5] = Math.abs(turn);
+    data[6] = Math.floor(drive/100);
+    data[7] = drive%100;
+    send(data);
+}
+
+//dx and dy are how far ahead of the XRP and to its left the point is, in centimeters
+function sendArc(id, dx, dy, seq, latestWins, restart){
+    const data = new Uint8Array(9);
+    data[0] = FRAME_ARC;
+    data[1] = seq;
+    data[2] = (latestWins ? SEQ_LATEST_WINS : 0) | (restart ? SEQ_RESTART : 0);
+    data[3] = id;
+    data[4] = dx & 0xFF;
+    data[5] = (dx >> 8) & 0xFF;
+    data[6] = dy & 0xFF;
+    data[7] = (dy >> 8) & 0xFF;
+    data[8] = ARC_EFFORT;
     send(data);
 }
\ No newline at end of file
@@ -1,4 +1,7 @@
 from swarm import SwarmAgent
 print("Initializing Agent")
 #Initializes Agent as agent with ID 0, and one that can have children
-agent = SwarmAgent(0, True)
\ No newline at end of file
+agent = SwarmAgent(0, True)
+
+#Follows commands for this XRP forever. Bluetooth keeps being handled in the background.
+agent.run()
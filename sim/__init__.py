@@ -0,0 +1,2 @@
+#Host-side stand-ins for the MicroPython modules swarm.py depends on, so SwarmAgent can be run and benchmarked on a normal computer.
+#Run the benchmarks from the root of the repository, e.g. "python -m sim.bench_routing".
@@ -0,0 +1,90 @@
+#Moves every XRP in a 200 XRP swarm with one group frame, so they all finish at about the same time, and counts the notifications it takes to tell the
+#central, with relays sending completions on straight away and with ack windows of 10, 20 and 50 ms. Ack latency is from an XRP finishing its move
+#to the central hearing about it.
+#Then queues a longer move behind the first, stops every XRP once the last has started it, and counts the XRPs whose stop notification reached the
+#central ahead of the completion of the move they finished before it.
+#Usage: python -m sim.bench_acks
+import functools
+
+from sim.radio import Air, install, xrp_motion_time
+from sim.swarmsim import Swarm, percentile
+
+AGENTS = 200
+MOVE = (0, 90, 0, 50)
+LONG_MOVE = (0, 0, 5, 0)
+#Simulated seconds between checks for every XRP having started the long move, and from the last starting it to the stop
+STEP = 0.005
+
+
+def run(window: int):
+    install(Air())
+    import swarm
+
+    sim = Swarm(AGENTS, seed=1, agent_class=functools.partial(swarm.SwarmAgent, p_ack_window=window), motion_time=xrp_motion_time)
+    sim.form()
+    notifies = sim.air.notifies
+    start = sim.air.now
+    sim.central.notifications.clear()
+    sim.central.write(swarm.group_frame(MOVE))
+    sim.run(start + 30.0)
+    assert not sim.air.errors, sim.air.errors[:5]
+
+    finished = {}
+    for agent in sim.agents:
+        turn, straight = [move for move in agent._ble.moves if move[0] >= start]
+        finished[agent.number] = straight[0] + xrp_motion_time("straight", straight[2])
+    latencies = []
+    for when, data in sim.central.notifications:
+        for number, _ in swarm.completions(data):
+            latencies.append(when - finished.pop(number))
+    assert not finished, sorted(finished)
+    return len(sim.central.notifications), sim.air.notifies - notifies, latencies
+
+
+def overtaken(window: int):
+    install(Air())
+    import swarm
+
+    sim = Swarm(AGENTS, seed=1, agent_class=functools.partial(swarm.SwarmAgent, p_ack_window=window), motion_time=xrp_motion_time)
+    sim.form()
+    start = sim.air.now
+    sim.central.notifications.clear()
+    sim.central.write(swarm.group_frame(MOVE))
+    sim.central.write(swarm.group_frame(LONG_MOVE))
+    #Moves are timed on each XRP's own clock, which runs ahead while its main program is blocked in one, so the stop waits for the simulated clock to
+    #pass the start of the last XRP's long move: the turn after the first move's turn and straight
+    while any(len([move for move in agent._ble.moves if move[0] >= start]) < 3 for agent in sim.agents):
+        sim.run(sim.air.now + STEP)
+    sim.run(max([move for move in agent._ble.moves if move[0] >= start][2][0] for agent in sim.agents) + STEP)
+    sim.central.write(swarm.stop_frame())
+    sim.run(sim.air.now + 5.0)
+    assert not sim.air.errors, sim.air.errors[:5]
+
+    completed = set()
+    stopped = set()
+    ahead = 0
+    for when, data in sim.central.notifications:
+        for number, _ in swarm.completions(data):
+            completed.add(number)
+        if len(data) == 2 and data[0] == swarm._NOTIFY_STOPPED:
+            stopped.add(data[1])
+            if data[1] not in completed:
+                ahead += 1
+    assert len(completed) == len(stopped) == AGENTS, (len(completed), len(stopped))
+    return ahead
+
+
+def main():
+    print("ack window  notifies to central  notifies in tree  ack latency p50/p99/max (ms)")
+    for window in (0, 10, 20, 50):
+        root, total, latencies = run(window)
+        print("%7d ms  %19d  %16d  %8.0f %6.0f %6.0f" % (
+            window, root, total, 1000 * percentile(latencies, 0.5), 1000 * percentile(latencies, 0.99), 1000 * max(latencies)))
+    print()
+    print("ack window  stops ahead of the completion before them")
+    for window in (0, 10, 20, 50):
+        print("%7d ms  %42d" % (window, overtaken(window)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+#Measures how much heap a relay allocates for each command and completion it handles, by calling SwarmAgent.event() the way the bluetooth stack
+#would, for a relay with 3 children. Runs on MicroPython, where it counts bytes with gc.mem_alloc() and also checks whether each path runs
+#LOCKED_CALLS times with the heap locked, and on CPython, where it reports the peak bytes tracemalloc sees allocated during each call instead.
+#The CPython figures include its own frames and iterators, which MicroPython keeps on the stack, so only the MicroPython ones say what a
+#path allocates on the XRP.
+#The bytes object gatts_read() returns is made by the stack, so it is not counted here.
+#Usage: micropython -m sim.bench_alloc [directory holding swarm.py], or python -m sim.bench_alloc [directory holding swarm.py]
+import sys
+
+MICROPYTHON = sys.implementation.name == "micropython"
+CALLS = 1000
+#Enough calls that paths which allocate only now and then, like the end of an ack window, are caught with the heap locked
+LOCKED_CALLS = 16
+
+_IRQ_CENTRAL_CONNECT = 1
+_IRQ_GATTS_WRITE = 3
+_IRQ_PERIPHERAL_CONNECT = 7
+_IRQ_GATTC_NOTIFY = 18
+_IRQ_MTU_EXCHANGED = 21
+#Matching swarm.py, where MicroPython folds the constant into the code rather than keeping it as an attribute of the module
+_NOTIFY_JOIN = 0x01
+
+
+class BLE:
+    #Bluetooth stand in whose calls allocate nothing
+    def __init__(self):
+        self.value = b""
+        self.writes = 0
+        self.notifies = 0
+        self.handler = None
+
+    def active(self, *args):
+        return True
+
+    def irq(self, handler):
+        #Kept so the bench calls the agent through the bound method it registered, as the stack does, rather than making a new one each call
+        self.handler = handler
+
+    def config(self, *args, **kwargs):
+        pass
+
+    def gatts_register_services(self, services):
+        return ((1,),)
+
+    def gatts_set_buffer(self, *args):
+        pass
+
+    def gatts_read(self, value_handle):
+        return self.value
+
+    def gattc_write(self, conn_handle, value_handle, data, mode=0):
+        self.writes += 1
+
+    def gatts_notify(self, conn_handle, value_handle, data=None):
+        self.notifies += 1
+
+    def gattc_exchange_mtu(self, conn_handle):
+        pass
+
+    def gap_advertise(self, *args, **kwargs):
+        pass
+
+    def gap_scan(self, *args):
+        pass
+
+
+def UUID(value):
+    #Only the length matters here, for the advertising payload
+    return bytes(16)
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def init(self, **kwargs):
+        pass
+
+    def deinit(self):
+        pass
+
+
+class Stub:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class Fakes:
+    #Stands in for the bluetooth, machine and XRPLib.defaults modules
+    pass
+
+
+def install(directory=None):
+    fakes = Fakes()
+    fakes.BLE = BLE
+    fakes.UUID = UUID
+    fakes.Timer = Timer
+    sys.modules["bluetooth"] = fakes
+    sys.modules["machine"] = fakes
+    #swarm.py does "from XRPLib.defaults import *", which needs a real module, so the fake motors are put in this one
+    this = sys.modules[__name__]
+    this.drivetrain = Stub()
+    this.imu = Stub()
+    sys.modules["XRPLib.defaults"] = this
+    try:
+        import random
+    except (ImportError, OSError):
+        #Some MicroPython builds, such as the WASI one, leave random out. swarm.py only uses getrandbits(), for spreading out timers.
+        import time
+        random = Fakes()
+        random.getrandbits = lambda bits: time.ticks_us() & ((1 << bits) - 1)
+        sys.modules["random"] = random
+    if not MICROPYTHON:
+        import builtins
+        builtins.const = lambda value: value
+        micropython = Fakes()
+        micropython.const = builtins.const
+        micropython.schedule = lambda callback, arg: callback(arg)
+        sys.modules["micropython"] = micropython
+    if directory:
+        sys.path.insert(0, directory)
+    import swarm
+    if not MICROPYTHON:
+        #swarm.py uses the MicroPython time functions
+        import time
+        clock = Fakes()
+        clock.ticks_ms = lambda: int(1000 * time.monotonic())
+        clock.ticks_diff = lambda a, b: a - b
+        clock.ticks_us = lambda: int(1000000 * time.monotonic())
+        clock.ticks_add = lambda a, b: a + b
+        clock.sleep_ms = lambda ms: time.sleep(ms / 1000)
+        swarm.time = clock
+    return swarm
+
+
+def relay(swarm, ack_window):
+    #Agent 10 with a parent on handle 0 and children on handles 1-3, the XRPs below child h being 10*h+1 to 10*h+5
+    agent = swarm.SwarmAgent(10, True, p_ack_window=ack_window)
+    ble = agent._ble
+    agent.event(_IRQ_CENTRAL_CONNECT, (0, 0, b"\0" * 6))
+    for handle in (1, 2, 3):
+        agent.event(_IRQ_PERIPHERAL_CONNECT, (handle, 0, bytes((0, 0, 0, 0, 0, handle))))
+        agent.event(_IRQ_MTU_EXCHANGED, (handle, 247))
+        agent.event(_IRQ_GATTC_NOTIFY, (handle, 1, bytes([_NOTIFY_JOIN] + [10 * handle + i for i in range(1, 6)])))
+    agent.event(_IRQ_MTU_EXCHANGED, (0, 247))
+    return agent, ble
+
+
+def measure(call):
+    #Bytes allocated per call, and whether LOCKED_CALLS calls succeed with the heap locked (None when that cannot be checked)
+    import gc
+    call()
+    if MICROPYTHON:
+        #No gc.collect() first: with the collector disabled the count is exact without one, and the WASI build frees objects still in use when
+        #it collects
+        import micropython
+        gc.disable()
+        before = gc.mem_alloc()
+        for _ in range(CALLS):
+            call()
+        allocated = gc.mem_alloc() - before
+        gc.enable()
+        micropython.heap_lock()
+        try:
+            for _ in range(LOCKED_CALLS):
+                call()
+            locked = True
+        except MemoryError:
+            locked = False
+        micropython.heap_unlock()
+        return allocated / CALLS, locked
+    import tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    total = 0
+    for _ in range(CALLS):
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        call()
+        total += tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+    return total / CALLS, None
+
+
+def main():
+    swarm = install(sys.argv[1] if len(sys.argv) > 1 else None)
+    agent, ble = relay(swarm, 0)
+    window, window_ble = relay(swarm, 20)
+    write = (0, 1)
+    sequenced = swarm.sequenced_frame((21, 0, 90, 0, 50), 7)
+    single = bytes((32, 0, 90, 0, 50))
+    batch = swarm.batch_frames([bytes((10 * (1 + i % 3) + 1 + i // 3, 0, 90, 0, 50)) for i in range(8)], 244)[0]
+    own = [swarm.sequenced_frame((10, 0, 0, 0, 10), seq) for seq in range(256)]
+    group = bytes((4, 1, 0, 0, 0, 90, 0, 50))
+    completion = (1, 1, bytes((11,)))
+    state = {"seq": 0, "flush": 0}
+
+    def relay_write(frame):
+        def call():
+            ble.value = frame
+            ble.handler(_IRQ_GATTS_WRITE, write)
+        return call
+
+    def own_command():
+        ble.value = own[state["seq"]]
+        state["seq"] = (state["seq"] + 1) & 0xFF
+        ble.handler(_IRQ_GATTS_WRITE, write)
+        #The main program would have taken the command off the queue
+        agent.queue_out = agent.queue_in
+
+    def relayed_completion():
+        ble.handler(_IRQ_GATTC_NOTIFY, completion)
+
+    def windowed_completion():
+        window_ble.handler(_IRQ_GATTC_NOTIFY, completion)
+        #Every eighth completion ends an ack window, so the cost of sending the aggregated notification is shared between them
+        state["flush"] += 1
+        if state["flush"] == 8:
+            state["flush"] = 0
+            window.flush_acks()
+
+    def unknown_event():
+        ble.handler(99, write)
+
+    paths = (
+        ("event nothing handles", unknown_event, 1),
+        ("sequenced command, relayed", relay_write(sequenced), 1),
+        ("5 byte command, relayed", relay_write(single), 1),
+        ("batch of 8 for 3 children", relay_write(batch), 8),
+        ("group frame for everyone", relay_write(group), 1),
+        ("sequenced command, queued", own_command, 1),
+        ("completion, passed on", relayed_completion, 1),
+        ("completion, ack window", windowed_completion, 1),
+    )
+    print("%s, %s" % (sys.implementation.name, "bytes allocated" if MICROPYTHON else "peak bytes allocated during the call (tracemalloc)"))
+    print("path                          per command  heap locked")
+    for name, call, commands in paths:
+        allocated, locked = measure(call)
+        print("%-28s  %11.1f  %11s" % (name, allocated / commands, "-" if locked is None else ("runs" if locked else "fails")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#Compares the two ways the swarm can follow a click in the UI on sim.plant's simulated XRP: a command frame, which turns to face the point with turn()
+#and drives to it with straight(), and an arc frame, which drives there with DifferentialDrive.arc_to(). Clicks are random points around the XRP, as
+#controls.js sends them, one centimeter per pixel of its 800 by 800 field: nearby ones, 20 to 150 cm away, and ones anywhere across the field, and
+#each is driven from rest at the origin at max_effort 0.5, what swarm.py uses for command frames and controls.js sends arcs at, and 1.0. arc_to() is
+#run with its default max_bearing of 15 degrees and with 60, which drives most clicks in one wide arc.
+#Reports the mean time per click and how far from the point the XRP came to rest, mean and max.
+#Usage: python -m sim.bench_arc
+import math
+import random
+
+from sim.plant import Plant, install
+
+CLICKS = 24
+#(name, nearest and furthest click in cm)
+SETS = (("nearby", 20, 150), ("across the field", 20, 800))
+EFFORTS = (0.5, 1.0)
+#Seconds to let the XRP come to rest after the call returns
+REST = 0.5
+
+
+def clicks(low: float, high: float):
+    pick = random.Random(1)
+    out = []
+    for _ in range(CLICKS):
+        bearing = pick.uniform(-180, 180)
+        distance = pick.uniform(low, high)
+        out.append((bearing, distance))
+    return out
+
+
+def run(bearing: float, distance: float, effort: float, max_bearing: float = None):
+    plant = Plant()
+    install(plant)
+    drivetrain = plant.drivetrain()
+    dx = distance * math.cos(math.radians(bearing))
+    dy = distance * math.sin(math.radians(bearing))
+    if max_bearing is None:
+        assert drivetrain.turn(bearing, effort) and drivetrain.straight(distance, effort)
+    else:
+        assert drivetrain.arc_to(dx, dy, effort, max_bearing=max_bearing)
+    took = plant.now
+    plant.sleep(REST)
+    return took, math.hypot(plant.x - dx, plant.y - dy)
+
+
+def main():
+    print("clicks            max_effort  driven with              time per click (s)  at rest off by mean/max (cm)")
+    for name, low, high in SETS:
+        points = clicks(low, high)
+        for effort in EFFORTS:
+            for label, max_bearing in (("turn() then straight()", None), ("arc_to()", 15), ("arc_to(), max_bearing 60", 60)):
+                results = [run(bearing, distance, effort, max_bearing) for bearing, distance in points]
+                offs = [off for _, off in results]
+                print("%-16s  %10.1f  %-24s  %18.2f  %14.2f %6.2f" % (
+                    name, effort, label, sum(took for took, _ in results) / len(results), sum(offs) / len(offs), max(offs)))
+
+
+if __name__ == "__main__":
+    main()
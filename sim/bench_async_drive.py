@@ -0,0 +1,143 @@
+#Drives a simulated XRP 60 cm and turns it 90 degrees while a second task runs at 50 Hz, as a program servicing the radio, polling sensors or
+#serving a web page would, and reports how well that task keeps its cadence. First with the blocking straight() and turn(), called from a uasyncio
+#task, then with straight_async() and turn_async(), then with three more 50 Hz tasks alongside, and then with motion handles from start_straight()
+#and start_turn() updated by a plain loop that runs the 50 Hz work every other tick. The XRPLib drivetrain runs unchanged against sim.plant's
+#simulated motors. A control tick takes 1 ms and the 50 Hz work 2 ms, which holds up everything else on the XRP. Also reports how far each drive
+#went and how long it took, which should not change with the API, and cancels a drive halfway.
+#Usage: python -m sim.bench_async_drive
+import asyncio
+import math
+
+from sim.plant import Plant, VirtualLoop, install
+from sim.swarmsim import percentile
+
+DISTANCE = 60
+TURN = 90
+PERIOD = 0.02
+#Seconds of processor time a control tick and a tick of the 50 Hz work take
+TICK_COST = 0.001
+WORK_COST = 0.002
+
+
+def setup():
+    plant = Plant()
+    install(plant)
+    from XRPLib.differential_drive import Motion
+    update = Motion.update
+
+    def costly(self):
+        plant.sleep(TICK_COST)
+        return update(self)
+
+    Motion.update = costly
+    return plant, plant.drivetrain(), lambda: setattr(Motion, "update", update)
+
+
+def run(mode: str):
+    plant, drivetrain, restore = setup()
+    ticks = {}
+    moves = []
+    running = [True]
+
+    async def work(name):
+        stamps = ticks.setdefault(name, [])
+        while True:
+            stamps.append(plant.now)
+            if not running[0]:
+                return
+            plant.sleep(WORK_COST)
+            await asyncio.sleep(PERIOD - WORK_COST)
+
+    async def drive():
+        await asyncio.sleep(0.1)
+        for kind, amount in (("straight", DISTANCE), ("turn", TURN)):
+            start = plant.now
+            x, heading = plant.x, plant.heading
+            if mode == "blocking":
+                result = getattr(drivetrain, kind)(amount)
+            else:
+                result = await getattr(drivetrain, kind + "_async")(amount)
+            moves.append((kind, result, plant.now - start, plant.x - x, plant.heading - heading))
+        running[0] = False
+
+    async def main():
+        tasks = [asyncio.ensure_future(work(0))]
+        if mode == "async, 4 tasks":
+            tasks += [asyncio.ensure_future(work(n)) for n in range(1, 4)]
+        await drive()
+        await asyncio.gather(*tasks)
+
+    try:
+        if mode == "handles":
+            handles(plant, drivetrain, ticks, moves)
+        else:
+            loop = VirtualLoop()
+            loop.run_until_complete(main())
+            loop.close()
+    finally:
+        restore()
+    intervals = [b - a for stamps in ticks.values() for a, b in zip(stamps, stamps[1:])]
+    return intervals, moves
+
+
+def handles(plant, drivetrain, ticks, moves):
+    #A main loop at 100 Hz with no uasyncio: updates the motion every tick, and runs the 50 Hz work every other tick
+    stamps = ticks.setdefault(0, [])
+    tick = 0
+    plant.sleep(0.1)
+    for kind, amount in (("straight", DISTANCE), ("turn", TURN)):
+        start = plant.now
+        x, heading = plant.x, plant.heading
+        motion = getattr(drivetrain, "start_" + kind)(amount)
+        while True:
+            ended = motion.update()
+            if tick % 2 == 0:
+                stamps.append(plant.now)
+                plant.sleep(WORK_COST)
+            tick += 1
+            if ended:
+                break
+            plant.sleep(0.01 - TICK_COST - (WORK_COST if tick % 2 else 0))
+        moves.append((kind, motion.result, plant.now - start, plant.x - x, plant.heading - heading))
+
+
+def cancelled():
+    #Starts a 100 cm drive, cancels it after 1 s, and returns its result, how far it went and the wheel speeds 0.5 s later
+    plant, drivetrain, restore = setup()
+
+    async def main():
+        motion = drivetrain.start_straight(100)
+        waiting = asyncio.ensure_future(motion.wait())
+        await asyncio.sleep(1.0)
+        motion.cancel()
+        result = await waiting
+        await asyncio.sleep(0.5)
+        return result
+
+    try:
+        loop = VirtualLoop()
+        result = loop.run_until_complete(main())
+        loop.close()
+    finally:
+        restore()
+    return result, plant.x, plant.speed
+
+
+def main():
+    print("50 Hz task while the XRP drives %d cm and turns %d degrees, %.0f ms control ticks and %.0f ms of 50 Hz work" % (
+        DISTANCE, TURN, 1000 * TICK_COST, 1000 * WORK_COST))
+    print("API                50 Hz interval p50/p99/max (ms)  missed ticks  straight: s, cm  turn: s, degrees")
+    for mode in ("blocking", "async", "async, 4 tasks", "handles"):
+        intervals, moves = run(mode)
+        (_, ok1, took1, went, _), (_, ok2, took2, _, turned) = moves
+        assert ok1 and ok2
+        print("%-17s  %15.1f %5.1f %7.0f  %12d  %8.2f %6.1f  %7.2f %8.1f" % (
+            mode, 1000 * percentile(intervals, 0.5), 1000 * percentile(intervals, 0.99), 1000 * max(intervals),
+            sum(max(0, round(interval / PERIOD) - 1) for interval in intervals), took1, went, took2, math.degrees(turned)))
+    result, went, speeds = cancelled()
+    print()
+    print("100 cm drive cancelled after 1 s: result %s, stopped after %.1f cm, wheel speeds %.1f and %.1f cm/s" % (result, went, *speeds))
+
+
+if __name__ == "__main__":
+    main()
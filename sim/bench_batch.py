@@ -0,0 +1,72 @@
+#Measures how many commands per second make it through a relay when the central packs 1, 8 or 32 commands into each frame.
+#The central talks to a root relay with 4 children, each of which relays to 8 XRPs, and every command is for one of those 32 XRPs.
+#Connections are modelled with a connection interval and a limited number of link layer packets per connection event.
+#Usage: python -m sim.bench_batch
+import contextlib
+import io
+
+from sim.radio import Air, Central, install
+
+RELAYS = 4
+LEAVES_PER_RELAY = 8
+COMMANDS = 960
+#Seconds the tree gets to exchange MTUs and routes once linked, and the commands get to be delivered. The XRPs keep syncing their clocks for as long
+#as they are connected, so the air never goes quiet on its own.
+SETTLE = 2.0
+LIMIT = 10.0
+
+
+def build(air):
+    import swarm
+
+    central = Central(air)
+    root = swarm.SwarmAgent(0, True)
+    air.run_main(root._ble, root.process_motion)
+    central.connect(root)
+    leaves = []
+    number = 1
+    relays = []
+    for _ in range(RELAYS):
+        relay = swarm.SwarmAgent(number, True)
+        air.run_main(relay._ble, relay.process_motion)
+        number += 1
+        air.link(root._ble, relay._ble)
+        relays.append(relay)
+    for relay in relays:
+        for _ in range(LEAVES_PER_RELAY):
+            leaf = swarm.SwarmAgent(number)
+            air.run_main(leaf._ble, leaf.process_motion)
+            number += 1
+            air.link(relay._ble, leaf._ble)
+            leaves.append(leaf)
+    air.run(air.now + SETTLE)
+    return central, leaves
+
+
+def commands_per_second(batch_size: int) -> float:
+    air = Air(conn_interval=0.0075, packets_per_event=4, ll_payload=27)
+    install(air)
+    import swarm
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        central, leaves = build(air)
+        commands = [bytes((leaves[i % len(leaves)].number, 0, 90, 0, 50)) for i in range(COMMANDS)]
+        start = air.now
+        for i in range(0, COMMANDS, batch_size):
+            for frame in swarm.batch_frames(commands[i:i+batch_size], central.payload()):
+                central.write(frame)
+        air.run(start + LIMIT)
+    assert not air.errors, air.errors
+    done = [move[0] for leaf in leaves for move in leaf._ble.moves if move[1] == "straight"]
+    assert len(done) == COMMANDS, len(done)
+    return COMMANDS / (max(done) - start)
+
+
+def main():
+    print("batch size  commands/s")
+    for batch_size in (1, 8, 32):
+        print("%10d  %10.0f" % (batch_size, commands_per_second(batch_size)))
+
+
+if __name__ == "__main__":
+    main()
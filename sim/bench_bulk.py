@@ -0,0 +1,55 @@
+#Measures how fast a 4 KB bulk payload goes between a parent and a child, down and up, over an L2CAP channel and by GATT pieces, each acknowledged
+#before the next, as when L2CAP is not there. Runs with 27 byte link layer packets and with the 251 byte packets of data length extension, at a
+#30 ms connection interval and 4 packets per connection event each way. Also runs with only the child lacking L2CAP, where the parent's channel is
+#refused and the payload falls back to GATT. Time is from send_bulk() to the whole payload reaching received_bulk(). The writes and indications
+#counted include the clock sync running alongside.
+#Usage: python -m sim.bench_bulk
+import contextlib
+import io
+
+from sim.radio import Air, install
+
+PAYLOAD = bytes(i * 7 & 0xFF for i in range(4096))
+
+
+def run(ll_payload: int, parent_l2cap: bool, child_l2cap: bool, down: bool):
+    air = Air(conn_interval=0.03, ll_payload=ll_payload, seed=1)
+    install(air)
+    import swarm
+
+    class Agent(swarm.SwarmAgent):
+        def received_bulk(self, conn_handle, data):
+            self.arrived = (air.now, bytes(data))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        air.l2cap = parent_l2cap
+        parent = Agent(1, True)
+        air.l2cap = child_l2cap
+        child = Agent(2)
+        air.link(parent._ble, child._ble)
+        air.run(until=1.0)
+        sender, receiver = (parent, child) if down else (child, parent)
+        conn_handle = next(iter(parent.connected_children)) if down else child.parent_handle
+        packets = air.writes + air.notifies
+        start = air.now
+        sender.send_bulk(conn_handle, PAYLOAD)
+        while not hasattr(receiver, "arrived") and air.now < start + 60.0:
+            air.run(until=air.now + 0.01)
+    assert not air.errors, air.errors[:5]
+    when, data = receiver.arrived
+    assert data == PAYLOAD
+    return when - start, air.writes + air.notifies - packets
+
+
+def main():
+    print("packet  direction  path                    time (ms)  bytes/s  GATT writes and indications")
+    for ll_payload in (27, 251):
+        for down in (True, False):
+            for name, parent_l2cap, child_l2cap in (("L2CAP", True, True), ("GATT", False, False), ("GATT after refusal", True, False)):
+                took, packets = run(ll_payload, parent_l2cap, child_l2cap, down)
+                print("%4d B  %-9s  %-22s  %9.0f  %7.0f  %27d" % (
+                    ll_payload, "down" if down else "up", name, 1000 * took, len(PAYLOAD) / took, packets))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#Measures how many commands a second central.SwarmCentral keeps going. First against LoopbackTransports that acknowledge at once, which shows the
+#cost of the central itself in real time. Then against simulated swarms of 100 XRPs with 1, 2 and 4 roots, each root with its own connection to the
+#central, where every XRP is kept busy with commands and the radio links set the pace. There, moves finish instantly, so only the radio counts.
+#Last, puts every fifth XRP of a simulated swarm in a named group with join(), moves the group with send_group(), takes half of it out again with
+#leave() and moves what is left, counting which XRPs follow each group command and how many writes it takes.
+#Usage: python -m sim.bench_central
+import asyncio
+import time
+
+from central import LoopbackTransport, SwarmCentral, Transport
+from sim.radio import Air, install
+from sim.swarmsim import Swarm, percentile
+
+LOOPBACK_ROBOTS = 256
+LOOPBACK_COMMANDS = 20
+AGENTS = 100
+#Commands each XRP is kept busy with at once
+IN_FLIGHT = 4
+DURATION = 20.0
+#Every SQUAD_EVERY-th XRP joins the named group
+SQUAD_EVERY = 5
+#Simulated seconds the simulation moves on between turns of the asyncio loop
+STEP = 0.002
+
+
+class AirTransport(Transport):
+    #A root in a simulated swarm, reached through one of the swarm's centrals
+    def __init__(self, central, root):
+        self.central = central
+        self.root = root
+
+    async def connect(self, on_notify) -> None:
+        self.central.on_notify = on_notify
+        self.central.connect(self.root)
+
+    async def write(self, frame: bytes) -> None:
+        self.central.write(frame)
+
+    def payload(self) -> int:
+        return self.central.payload()
+
+
+async def loopback(roots: int):
+    central = SwarmCentral()
+    per_root = LOOPBACK_ROBOTS // roots
+    for r in range(roots):
+        await central.add_root(LoopbackTransport(range(r * per_root, (r + 1) * per_root)))
+
+    async def drive(robot):
+        for _ in range(LOOPBACK_COMMANDS):
+            await central.send(robot, 90, 50)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(drive(robot) for robot in range(per_root * roots)))
+    return per_root * roots * LOOPBACK_COMMANDS / (time.perf_counter() - started)
+
+
+async def simulated(roots: int):
+    install(Air())
+    sim = Swarm(AGENTS, seed=1, roots=roots)
+    air = sim.air
+    central = SwarmCentral(timeout=10.0)
+    for link, root in zip(sim.centrals, sim.agents):
+        await central.add_root(AirTransport(link, root))
+    #Builds the tree with the asyncio loop turning, so the central hears the join notifications
+    while any(agent.parent_handle is None for agent in sim.agents) and air.now < 120:
+        await run(sim, air.now + 0.1)
+    await run(sim, air.now + 1.0)
+    known = sum(1 for robot in central.robots.values() if robot.root is not None)
+
+    start = air.now
+    end = start + DURATION
+    latencies = []
+    failures = [0]
+
+    async def drive(robot):
+        while air.now < end:
+            sent = air.now
+            try:
+                await central.send(robot, 0, 10)
+                latencies.append(air.now - sent)
+            except Exception:
+                failures[0] += 1
+
+    started = time.perf_counter()
+    clients = [asyncio.ensure_future(drive(agent.number)) for agent in sim.agents for _ in range(IN_FLIGHT)]
+    while not all(client.done() for client in clients):
+        await run(sim, air.now + STEP)
+    wall = time.perf_counter() - started
+    assert not air.errors, air.errors[:5]
+    return known, len(latencies) / (air.now - start), latencies, failures[0], wall
+
+
+async def named_group(roots: int):
+    install(Air())
+    sim = Swarm(AGENTS, seed=1, roots=roots)
+    air = sim.air
+    central = SwarmCentral(timeout=10.0)
+    for link, root in zip(sim.centrals, sim.agents):
+        await central.add_root(AirTransport(link, root))
+    while any(agent.parent_handle is None for agent in sim.agents) and air.now < 120:
+        await run(sim, air.now + 0.1)
+    await run(sim, air.now + 1.0)
+    completed = set()
+
+    def on_notify(root, data):
+        for number, seq in sim.swarm.completions(data):
+            if seq is None:
+                completed.add(number)
+
+    central.on_notify = on_notify
+    squad = [agent.number for agent in sim.agents][::SQUAD_EVERY]
+    for robot in squad:
+        await central.join(robot, "squad")
+    #Lets the group lists travel up the tree
+    await run(sim, air.now + 1.0)
+    results = []
+    for leaving in ((), squad[::2]):
+        for robot in leaving:
+            await central.leave(robot, "squad")
+        await run(sim, air.now + 1.0)
+        completed.clear()
+        writes = air.writes
+        await central.send_group("squad", 0, 10)
+        await run(sim, air.now + 2.0)
+        members = central.members["squad"]
+        results.append((len(members), len(completed & members), len(completed - members), air.writes - writes))
+    assert not air.errors, air.errors[:5]
+    return results
+
+
+async def run(sim, until):
+    sim.run(until)
+    sim.air.now = max(sim.air.now, until)
+    await asyncio.sleep(0)
+
+
+def main():
+    print("loopback roots, %d XRPs, %d commands each  commands/s (real time)" % (LOOPBACK_ROBOTS, LOOPBACK_COMMANDS))
+    for roots in (1, 4):
+        print("%14d  %40.0f" % (roots, asyncio.run(loopback(roots))))
+    print()
+    print("%d XRP swarm, %d commands in flight per XRP" % (AGENTS, IN_FLIGHT))
+    print("roots  XRPs known  commands/s  latency p50/p99 (ms)  failed  real time")
+    for roots in (1, 2, 4):
+        known, rate, latencies, failures, wall = asyncio.run(simulated(roots))
+        print("%5d  %10d  %10.0f  %8.0f %8.0f     %6d  %7.1f s" % (
+            roots, known, rate, 1000 * percentile(latencies, 0.5), 1000 * percentile(latencies, 0.99), failures, wall))
+    print()
+    print("named group in a %d XRP swarm" % AGENTS)
+    print("roots  members  members that followed  others that followed  writes")
+    for roots in (1, 2):
+        for members, followed, others, writes in asyncio.run(named_group(roots)):
+            print("%5d  %7d  %21d  %20d  %6d" % (roots, members, followed, others, writes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#Counts the radio writes it takes to move every XRP in a 200 XRP swarm, and a squad of 20 of them, by sending each XRP its own command, by packing the
+#commands into batch frames, and by sending one group frame. Also reports how long it takes for the last XRP in the group to start moving.
+#Usage: python -m sim.bench_group
+import random
+
+from sim.swarmsim import Swarm, depths
+
+AGENTS = 200
+SQUAD = 20
+SQUAD_GROUP = 7
+#Turn 90 degrees to the left and drive 50 cm
+MOVE = (0, 90, 0, 50)
+
+
+def move(targets, mode: str, squad: bool):
+    sim = Swarm(AGENTS, seed=1)
+    sim.form()
+    swarm = sim.swarm
+    agents = {agent.number: agent for agent in sim.agents}
+    depth, _ = depths(sim.agents)
+    assert all(depth[agents[number]] is not None for number in targets)
+    setup = 0
+    if mode == "group" and squad:
+        writes = sim.air.writes
+        for number in targets:
+            sim.central.write(bytes((swarm._FRAME_MEMBERSHIP, number, SQUAD_GROUP, 1)))
+        sim.run(sim.air.now + 5.0)
+        setup = sim.air.writes - writes
+
+    writes = sim.air.writes
+    start = sim.air.now
+    if mode == "single":
+        for number in targets:
+            sim.central.write(bytes((number,) + MOVE))
+    elif mode == "batch":
+        for frame in swarm.batch_frames([bytes((number,) + MOVE) for number in targets], sim.central.payload()):
+            sim.central.write(frame)
+    elif squad:
+        sim.central.write(swarm.group_frame(MOVE, group=SQUAD_GROUP))
+    else:
+        sim.central.write(swarm.group_frame(MOVE))
+    sim.run(start + 30.0)
+    assert not sim.air.errors, sim.air.errors[:5]
+
+    moved = {number for number, agent in agents.items() if any(m[0] >= start for m in agent._ble.moves)}
+    assert moved == set(targets), sorted(moved ^ set(targets))
+    last = max(min(m[0] for m in agents[number]._ble.moves if m[0] >= start) for number in targets)
+    return sim.air.writes - writes, setup, last - start
+
+
+def main():
+    squad = random.Random(SQUAD).sample(range(1, AGENTS), SQUAD)
+    print("target           frames  writes  group setup writes  last XRP starts")
+    for name, targets, is_squad in (("whole swarm", list(range(AGENTS)), False), ("squad of %d" % SQUAD, squad, True)):
+        for mode in ("single", "batch", "group"):
+            writes, setup, last = move(targets, mode, is_squad)
+            print("%-15s  %-6s  %6d  %18d  %12.0f ms" % (name, mode, writes, setup, 1000 * last))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#Switches off a relay one hop from the root of a 100 XRP swarm while the central is sending it commands, and measures how long the relay's subtree
+#takes to be back in the tree, with every one of its XRPs in the root's routing table again, and how many commands for the subtree are lost. The
+#central does not resend anything, so every command sent while the subtree is cut off is lost. Compares XRPs that advertise again after losing
+#their parent with XRPs that do not, as before.
+#Usage: python -m sim.bench_heal
+from sim.radio import Air, install
+from sim.swarmsim import Swarm, depths
+
+AGENTS = 100
+RATE = 20.0
+DURATION = 40.0
+#Seconds into the workload the relay is switched off
+FAIL_AT = 10.0
+SUPERVISION_TIMEOUT = 1.0
+SEEDS = (1, 2, 3)
+
+
+def subtree(parent, top):
+    below = {top}
+    changed = True
+    while changed:
+        changed = False
+        for agent, up in parent.items():
+            if up in below and agent not in below:
+                below.add(agent)
+                changed = True
+    return below
+
+
+def run(seed: int, heal: bool):
+    install(Air())
+    import swarm
+
+    class NoRejoin(swarm.SwarmAgent):
+        #An orphan that never advertises again, like before
+        def rejoin(self, timer=None):
+            pass
+
+    sim = Swarm(AGENTS, seed=seed, agent_class=None if heal else NoRejoin, supervision_timeout=SUPERVISION_TIMEOUT)
+    sim.form()
+    depth, parent = depths(sim.agents)
+    root = sim.agents[0]
+    #The relay with the largest subtree directly below the root
+    victim = max((agent for agent in sim.agents if depth[agent] == 1), key=lambda agent: len(subtree(parent, agent)))
+    orphans = {agent.number for agent in subtree(parent, victim)} - {victim.number}
+    failed = sim.air.now + FAIL_AT
+    state = {"recovered": None}
+
+    def check():
+        if state["recovered"] is not None:
+            return
+        #Until the supervision timeout the other XRPs still think the relay is there
+        if victim._ble.conns:
+            sim.air.schedule(0.05, check)
+            return
+        attached, _ = depths(sim.agents)
+        if all(number in root.routes for number in orphans) and all(attached[agent] is not None for agent in sim.agents if agent.number in orphans):
+            state["recovered"] = sim.air.now - failed
+            return
+        sim.air.schedule(0.05, check)
+
+    sim.air.schedule_at(failed, victim._ble.active, False)
+    sim.air.schedule_at(failed + 0.05, check)
+    load = sim.workload(RATE, DURATION)
+    assert not sim.air.errors, sim.air.errors[:5]
+    to_orphans = sum(len(times) for (number, _), times in load.sent.items() if number in orphans)
+    lost = [number for number, _ in load.undelivered if number != victim.number]
+    in_subtree = sum(1 for number in lost if number in orphans)
+    return len(orphans), state["recovered"], to_orphans, in_subtree, len(lost) - in_subtree
+
+
+def main():
+    print("%d XRPs, %.0f commands/s for %.0f s, relay switched off after %.0f s, %.1f s supervision timeout" % (
+        AGENTS, RATE, DURATION, FAIL_AT, SUPERVISION_TIMEOUT))
+    print("seed  orphans  rejoin  recovered after  commands for orphans  lost  lost elsewhere")
+    for seed in SEEDS:
+        for heal in (False, True):
+            orphans, recovered, sent, lost, elsewhere = run(seed, heal)
+            after = "never" if recovered is None else "%.2f s" % recovered
+            print("%4d  %7d  %6s  %15s  %20d  %4d  %14d" % (seed, orphans, "yes" if heal else "no", after, sent, lost, elsewhere))
+
+
+if __name__ == "__main__":
+    main()
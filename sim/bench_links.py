@@ -0,0 +1,49 @@
+#Compares link scheduling with the XRPs as they were, which scan without end while they have room for children and leave every connection at the
+#30 ms interval it started with. Scan windows take the radio from connections here: a connection event inside a scan window of either end is missed.
+#A 100 XRP swarm builds its tree, and then the central sends sequenced commands to random XRPs, at several rates. Moves finish instantly, so only the
+#radio counts. Reports the commands acknowledged per second, how long commands take to arrive and be acknowledged, and, after the swarm has been
+#quiet for a few seconds, how many connection events a second the links between XRPs hold. For reference, also runs the XRPs as they were with
+#scanning costing the connections nothing.
+#Usage: python -m sim.bench_links
+from sim.swarmsim import Swarm, depths, percentile
+
+AGENTS = 100
+RATES = (20.0, 60.0, 120.0)
+DURATION = 20.0
+QUIET = 5.0
+
+
+def unscheduled(number, children):
+    import swarm
+    return swarm.SwarmAgent(number, children, p_schedule_links=False)
+
+
+def run(rate: float, scheduled: bool, scan_priority: bool):
+    sim = Swarm(AGENTS, seed=1, agent_class=None if scheduled else unscheduled, scan_priority=scan_priority)
+    sim.form()
+    load = sim.workload(rate, DURATION)
+    #The workload ends with 30 s for the last acknowledgements, so the swarm has been quiet for a while by now
+    sim.run(sim.air.now + QUIET)
+    assert not sim.air.errors, sim.air.errors[:5]
+    depth, _ = depths(sim.agents)
+    events = sum(1 / interval for agent in sim.agents for handle, interval in agent._ble.intervals.items() if handle in agent._ble._as_central)
+    scanning = sum(1 for agent in sim.agents if agent._ble.scanning)
+    return load, events, scanning, max(d for d in depth.values() if d is not None)
+
+
+def main():
+    print("%d XRPs, sequenced commands to random XRPs for %.0f s, 30 ms interval to start with" % (AGENTS, DURATION))
+    print("rate/s  XRPs                             acked/s  delivery p50/p99 (ms)  ack p50/p99 (ms)  idle link events/s  scanning when idle")
+    for rate in RATES:
+        for name, scheduled, scan_priority in (("as they were, scanning is free", False, False), ("as they were", False, True),
+                                               ("link scheduling", True, True)):
+            load, events, scanning, deepest = run(rate, scheduled, scan_priority)
+            delivered = [latency for _, latency in load.delivered]
+            acks = [latency for _, latency in load.acks]
+            print("%6.0f  %-31s  %7.1f  %9.0f %9.0f    %6.0f %7.0f    %18.0f  %18d" % (
+                rate, name, len(acks) / DURATION, 1000 * percentile(delivered, 0.5), 1000 * percentile(delivered, 0.99),
+                1000 * percentile(acks, 0.5), 1000 * percentile(acks, 0.99), events, scanning))
+
+
+if __name__ == "__main__":
+    main()
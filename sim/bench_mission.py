@@ -0,0 +1,154 @@
+#Sends 10 XRPs in a 40 XRP swarm a route of 10 steps each, all at once, through central.SwarmCentral. First one step at a time, each sent once the
+#last has been acknowledged, as the web page does. Then as one mission per XRP, with and without a progress notification every 5 steps. Moves take
+#as long as they would on an XRP. Reports the writes and notifications the routes cost over every hop of the tree, counting only command traffic
+#and not the clock sync or tree building going on alongside, how long the routes took, and how long each XRP stood still between steps. Then
+#aborts a mission partway through, and sends a mission through relays with a smaller MTU than the root's.
+#Usage: python -m sim.bench_mission
+import asyncio
+
+from central import CommandDropped, SwarmCentral
+from sim import radio
+from sim.bench_central import AirTransport, run
+from sim.radio import Air, install, xrp_motion_time
+from sim.swarmsim import Swarm, depths, percentile
+
+AGENTS = 40
+ROUTES = 10
+STEPS = 10
+#Every route is a zigzag of 90 degree turns and 40 cm drives
+ROUTE = [(90 if i % 2 else -90, 40) for i in range(STEPS)]
+STEP = 0.002
+#Write and notification types that are not command traffic: depth and clock sync frames, and join, telemetry and clock sync notifications
+BACKGROUND_WRITES = (0x03, 0x06)
+BACKGROUND_NOTIFIES = (0x01, 0x08, 0x09)
+
+
+class Counter:
+    #Counts the command writes and notifications every radio sends, and their bytes
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+        write = radio.FakeBLE.gattc_write
+        notify = radio.FakeBLE.gatts_notify
+        counter = self
+
+        def gattc_write(ble, conn_handle, value_handle, data, mode=0):
+            if data and data[0] not in BACKGROUND_WRITES:
+                counter.add(data)
+            return write(ble, conn_handle, value_handle, data, mode)
+
+        def gatts_notify(ble, conn_handle, value_handle, data=None):
+            if data and (len(data) == 1 or data[0] not in BACKGROUND_NOTIFIES):
+                counter.add(data)
+            return notify(ble, conn_handle, value_handle, data)
+
+        radio.FakeBLE.gattc_write = gattc_write
+        radio.FakeBLE.gatts_notify = gatts_notify
+        self.restore = lambda: (setattr(radio.FakeBLE, "gattc_write", write), setattr(radio.FakeBLE, "gatts_notify", notify))
+
+    def add(self, data):
+        self.messages += 1
+        self.bytes += len(data)
+
+
+async def formed(mtu: int = None):
+    #mtu, if given, is the most every XRP but the root takes, so only the root's link to the central carries whole missions
+    install(Air())
+    sim = Swarm(AGENTS, seed=1, motion_time=xrp_motion_time)
+    air = sim.air
+    if mtu is not None:
+        for agent in sim.agents[1:]:
+            agent._ble.config(mtu=mtu)
+    central = SwarmCentral(timeout=30.0)
+    await central.add_root(AirTransport(sim.central, sim.agents[0]))
+    while any(agent.parent_handle is None for agent in sim.agents) and air.now < 120:
+        await run(sim, air.now + 0.1)
+    await run(sim, air.now + 1.0)
+    return sim, central
+
+
+def gaps(agent, start):
+    #Seconds the XRP stood still between the end of each step's drive and the next step's turn
+    moves = [move for move in agent._ble.moves if move[0] >= start]
+    ends = [when + xrp_motion_time(kind, amount) for when, kind, amount in moves]
+    return [moves[i + 1][0] - ends[i] for i in range(1, len(moves) - 1, 2)]
+
+
+async def routes(mode: str):
+    sim, central = await formed()
+    air = sim.air
+    depth, _ = depths(sim.agents)
+    #The 10 deepest XRPs, so most routes cross relays
+    robots = sorted((agent for agent in sim.agents[1:] if depth[agent] is not None), key=lambda agent: -depth[agent])[:ROUTES]
+    progress = []
+
+    async def follow(robot):
+        if mode == "steps":
+            for turn, distance in ROUTE:
+                await central.send(robot, turn, distance)
+        else:
+            await central.send_mission(robot, ROUTE, every=5 if mode == "mission, progress" else 0, on_progress=progress.append)
+
+    counter = Counter()
+    try:
+        start = air.now
+        clients = [asyncio.ensure_future(follow(agent.number)) for agent in robots]
+        while not all(client.done() for client in clients):
+            await run(sim, air.now + STEP)
+        for client in clients:
+            client.result()
+        took = air.now - start
+    finally:
+        counter.restore()
+    assert not air.errors, air.errors[:5]
+    assert len(progress) == (ROUTES if mode == "mission, progress" else 0)
+    stood = [gap for agent in robots for gap in gaps(agent, start)]
+    return counter, took, stood, sum(depth[agent] for agent in robots) / len(robots)
+
+
+async def abort():
+    #Aborts a mission 3 seconds in and returns how many of its steps the XRP started, and whether send_mission() raised CommandDropped
+    sim, central = await formed()
+    air = sim.air
+    agent = sim.agents[-1]
+    start = air.now
+    mission = asyncio.ensure_future(central.send_mission(agent.number, ROUTE))
+    while air.now < start + 3.0:
+        await run(sim, air.now + STEP)
+    await central.abort_mission(agent.number)
+    while not mission.done():
+        await run(sim, air.now + STEP)
+    assert not air.errors, air.errors[:5]
+    return sum(1 for move in agent._ble.moves if move[0] >= start) // 2, isinstance(mission.exception(), CommandDropped)
+
+
+async def small_mtu():
+    #Sends one of the deepest XRPs a mission of 4 routes through relays that only take the default MTU, and returns how many steps it followed
+    sim, central = await formed(23)
+    air = sim.air
+    depth, _ = depths(sim.agents)
+    agent = max((agent for agent in sim.agents[1:] if depth[agent] is not None), key=lambda agent: depth[agent])
+    start = air.now
+    mission = asyncio.ensure_future(central.send_mission(agent.number, 4 * ROUTE))
+    while not mission.done():
+        await run(sim, air.now + STEP)
+    mission.result()
+    assert not air.errors, air.errors[:5]
+    return sum(1 for move in agent._ble.moves if move[0] >= start) // 2
+
+
+def main():
+    print("%d XRPs, %d routes of %d steps at once" % (AGENTS, ROUTES, STEPS))
+    print("mode               average depth  messages/route  bytes/route  route time (s)  standing still between steps p50/max (ms)")
+    for mode in ("steps", "mission", "mission, progress"):
+        counter, took, stood, average = asyncio.run(routes(mode))
+        print("%-17s  %13.1f  %14.1f  %11.0f  %14.1f  %20.0f %6.0f" % (
+            mode, average, counter.messages / ROUTES, counter.bytes / ROUTES, took, 1000 * percentile(stood, 0.5), 1000 * max(stood)))
+    print()
+    started, dropped = asyncio.run(abort())
+    print("mission aborted 3 s in: %d of %d steps started, send_mission() raised CommandDropped: %s" % (started, STEPS, dropped))
+    print("mission of %d steps through 23 byte MTUs: %d steps followed" % (4 * STEPS, asyncio.run(small_mtu())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#Shows how long a relay takes to pass commands on to its children while it is driving itself, with commands followed inside the IRQ handler
+#(as before the motion queue) and with the motion queue followed from the main program.
+#The central tells the root relay to turn and drive 2 m, then sends a command for one of the root's 5 children every 100 ms for 5 seconds.
+#Usage: python -m sim.bench_motion_queue
+import contextlib
+import io
+
+from sim.radio import Air, Central, install, xrp_motion_time
+
+LEAVES = 5
+SENDS = 50
+SPACING = 0.1
+#Seconds the tree gets to exchange MTUs and routes once linked, and everything gets to be delivered and driven from the first command. The XRPs keep
+#syncing their clocks for as long as they are connected, so the air never goes quiet on its own.
+SETTLE = 2.0
+LIMIT = 30.0
+
+
+def run(in_irq: bool):
+    air = Air(conn_interval=0.0075, motion_time=xrp_motion_time)
+    install(air)
+    import swarm
+
+    class IrqAgent(swarm.SwarmAgent):
+        #Follows commands inside the IRQ handler, the way every XRP did before the motion queue
+        def enqueue(self, frame, offset=0, seq=None, start=None, flags=0):
+            self.follow(frame[offset:offset + 5])
+            return True
+
+    agent_class = IrqAgent if in_irq else swarm.SwarmAgent
+    with contextlib.redirect_stdout(io.StringIO()):
+        central = Central(air)
+        root = agent_class(0, True)
+        air.run_main(root._ble, root.process_motion)
+        central.connect(root)
+        leaves = []
+        for number in range(1, LEAVES + 1):
+            leaf = agent_class(number)
+            air.run_main(leaf._ble, leaf.process_motion)
+            air.link(root._ble, leaf._ble)
+            leaves.append(leaf)
+        air.run(air.now + SETTLE)
+
+        start = air.now
+        central.write(bytes((0, 0, 90, 2, 0)))
+        sent = {}
+        for i in range(SENDS):
+            leaf = leaves[i % LEAVES]
+            when = start + SPACING * (i + 1)
+            #The command's last byte is unique per send, so each delivery can be matched to when it was sent
+            frame = bytes((leaf.number, 0, 0, 0, i + 1))
+            sent[(leaf.number, i + 1)] = when
+            air.schedule_at(when, central.write, frame)
+        air.run(start + LIMIT)
+    assert not air.errors, air.errors
+
+    #A command that arrives while the IRQ handler is blocked is overwritten by the next one, and the blocked handler later relays whichever
+    #command is in the characteristic at the time, so only the first copy of each distinct command counts as delivered
+    latencies = {}
+    for leaf in leaves:
+        for when, _, data in leaf._ble.received:
+            if len(data) != 5:
+                continue
+            key = (data[0], data[4])
+            latencies.setdefault(key, when - sent[key])
+    followed = sum(1 for leaf in leaves for move in leaf._ble.moves if move[1] == "straight")
+    return list(latencies.values()), followed
+
+
+def main():
+    print("mode          distinct delivered  moves made  mean relay latency  max relay latency")
+    for in_irq in (True, False):
+        latencies, followed = run(in_irq)
+        print("%-12s  %18d  %10d  %15.0f ms  %15.0f ms" % (
+            "in IRQ" if in_irq else "motion queue", len(latencies), followed,
+            1000 * sum(latencies) / len(latencies), 1000 * max(latencies)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#Checks XRPLib's Odometry against sim.plant's simulated XRP, and what it costs in real time. The XRP drives a course of straights, turns and an
+#arc with odometry ticking at 100 Hz on the plant's clock, with the IMU and without it. Reports how far the pose is from where the XRP really is
+#at the end of each move, and how far get_pose_at() is from where it really was at random moments in the 2 s before.
+#Then times the ticks and get_pose_at() with histories of 200, 2,000 and 20,000 poses, against dead reckoning the way a main loop would keep it:
+#a list of (time, x, y, heading) tuples in floats, trimmed to the same length, searched with bisect. On the XRP each of those tuples and floats
+#is a new object on the heap, where Odometry's ticks make none but the IMU's scaled yaw; CPython cannot show that, so only the times are compared.
+#Usage: python -m sim.bench_odometry
+import bisect
+import math
+import random
+import sys
+import time
+
+from sim.plant import Plant, install
+
+#("straight", cm), ("turn", degrees) or ("arc", left effort, right effort, seconds)
+COURSE = (("straight", 40), ("turn", 90), ("straight", 30), ("arc", 0.3, 0.55, 2.0), ("turn", -135), ("straight", 50), ("arc", 0.5, 0.2, 1.5))
+LOOKUPS = 200
+HISTORIES = (200, 2000, 20000)
+TICKS = 100000
+
+
+class ListOdometry:
+    #Dead reckoning as a main loop would keep it, for comparison: the same sums, into a list of tuples
+    def __init__(self, odometry, history):
+        self.odometry = odometry
+        self.history = history
+        #The plant's clock, as install() gives it to XRPLib
+        self.clock = sys.modules[type(odometry).__module__].time
+        self.poses = [(self.clock.ticks_us(), 0.0, 0.0, 0.0)]
+        self.times = [self.poses[0][0]]
+        self.last = [odometry.left_motor.get_position_counts(), odometry.right_motor.get_position_counts()]
+
+    def update(self):
+        left = self.odometry.left_motor.get_position_counts()
+        right = self.odometry.right_motor.get_position_counts()
+        forward = (left - self.last[0] + right - self.last[1]) * self.odometry.cm_per_count / 2
+        self.last = [left, right]
+        _, x, y, heading = self.poses[-1]
+        new_heading = self.odometry.imu.get_yaw()
+        middle = math.radians((heading + new_heading) / 2)
+        now = self.clock.ticks_us()
+        self.poses.append((now, x + forward * math.cos(middle), y + forward * math.sin(middle), new_heading))
+        self.times.append(now)
+        if len(self.poses) > self.history:
+            del self.poses[0]
+            del self.times[0]
+
+    def get_pose_at(self, ticks_us):
+        i = bisect.bisect_right(self.times, ticks_us)
+        if i == 0:
+            return None
+        if i == len(self.times):
+            return self.poses[-1][1:]
+        (t0, x0, y0, h0), (t1, x1, y1, h1) = self.poses[i - 1], self.poses[i]
+        share = (ticks_us - t0) / (t1 - t0)
+        return x0 + (x1 - x0) * share, y0 + (y1 - y0) * share, h0 + (h1 - h0) * share
+
+
+def truth(plant, when):
+    #Where the XRP really was at a time on the plant's clock, from the plant's trace
+    i = bisect.bisect_left(plant.trace, (when,))
+    _, x, y, heading = plant.trace[min(i, len(plant.trace) - 1)]
+    return x, y, math.degrees(heading)
+
+
+def course(imu: bool):
+    plant = Plant()
+    install(plant)
+    from XRPLib.odometry import Odometry
+
+    plant.trace = []
+    drivetrain = plant.drivetrain(imu)
+    odometry = Odometry(drivetrain.left_motor, drivetrain.right_motor, drivetrain.imu)
+    pick = random.Random(1)
+    ends = []
+    lookups = []
+    for move in COURSE:
+        if move[0] == "arc":
+            drivetrain.set_effort(move[1], move[2])
+            plant.sleep(move[3])
+            drivetrain.stop()
+            plant.sleep(0.3)
+        else:
+            getattr(drivetrain, move[0])(move[1])
+        x, y, heading = truth(plant, plant.now)
+        ox, oy, oheading = odometry.get_pose()
+        ends.append((math.hypot(ox - x, oy - y), abs(oheading - heading)))
+        for _ in range(LOOKUPS // len(COURSE)):
+            when = plant.now - pick.uniform(0, 1.9)
+            x, y, heading = truth(plant, when)
+            ox, oy, oheading = odometry.get_pose_at(int(when * 1000000))
+            lookups.append((math.hypot(ox - x, oy - y), abs(oheading - heading)))
+    odometry.stop()
+    return ends, lookups
+
+
+def costs(history: int):
+    #Real microseconds per tick and per lookup, for Odometry and for ListOdometry
+    plant = Plant()
+    install(plant)
+    from XRPLib.odometry import Odometry
+
+    drivetrain = plant.drivetrain()
+    out = []
+    for kind in ("ring buffer", "list of tuples"):
+        odometry = Odometry(drivetrain.left_motor, drivetrain.right_motor, drivetrain.imu, history=history)
+        odometry.stop()
+        tracker = odometry if kind == "ring buffer" else ListOdometry(odometry, history)
+        #Fill the history, with the clock moving 10 ms a tick, and the wheels turning
+        drivetrain.set_effort(0.4, 0.5)
+        for _ in range(history):
+            plant.advance(plant.now + 0.01)
+            tracker.update()
+        #The wheels stand still from here, since stepping them would cost more than the ticks; the sums cost the same
+        started = time.perf_counter()
+        for _ in range(TICKS):
+            plant.now += 0.01
+            tracker.update()
+        tick = (time.perf_counter() - started) / TICKS
+        newest = int(plant.now * 1000000)
+        moments = [newest - random.Random(i).randrange(int(history * 0.95) * 10000) for i in range(10000)]
+        started = time.perf_counter()
+        for when in moments:
+            tracker.get_pose_at(when)
+        lookup = (time.perf_counter() - started) / len(moments)
+        out.append((kind, tick, lookup))
+    return out
+
+
+def main():
+    print("course: %s" % ", ".join(str(move) for move in COURSE))
+    print("heading from  pose off at end of each move, cm and degrees         get_pose_at off p50/max, cm         degrees")
+    for imu in (True, False):
+        ends, lookups = course(imu)
+        distances = sorted(distance for distance, _ in lookups)
+        angles = sorted(angle for _, angle in lookups)
+        print("%-12s  %-50s  %7.3f %7.3f  %7.3f %7.3f" % (
+            "IMU" if imu else "encoders", " ".join("%.2f/%.2f" % end for end in ends), distances[len(distances) // 2], distances[-1],
+            angles[len(angles) // 2], angles[-1]))
+    print()
+    print("history  kept as          per tick (us)  get_pose_at (us)")
+    for history in HISTORIES:
+        for kind, tick, lookup in costs(history):
+            print("%7d  %-15s  %13.2f  %16.2f" % (history, kind, 1e6 * tick, 1e6 * lookup))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#Compares driving through waypoints the way the swarm does now, turning to face each one with turn(), stopping, and driving to it with
+#straight(), with DifferentialDrive.follow_path(), which follows the path between them without stopping, on sim.plant's simulated XRP. Each
+#course is driven at max_effort 0.5 and 1.0 one way, and with follow_path() at a top speed just under what those efforts reach. The turns and
+#straights are worked out from where the waypoints are, as controls.js works them out, not from where the XRP ended up.
+#Reports the time to the last waypoint, how far from it the XRP came to rest, and how far the XRP passed from the waypoints before it, since
+#follow_path() cuts corners.
+#Usage: python -m sim.bench_path
+import math
+
+from sim.plant import Plant, install
+
+COURSES = (("square", ((50, 0), (50, 50), (0, 50), (0, 0))),
+           ("slalom", ((30, 15), (60, -15), (90, 15), (120, 0))),
+           ("zigzag", ((40, 0), (40, 40), (80, 40), (80, 80), (120, 80))))
+#max_effort for turn() and straight(), and the top speed for follow_path(), in cm/s
+SPEEDS = ((0.5, 25), (1.0, 50))
+LOOKAHEADS = (8, 15)
+
+
+def run(waypoints, effort: float, speed: float, lookahead: float = None):
+    plant = Plant()
+    install(plant)
+    plant.trace = []
+    drivetrain = plant.drivetrain()
+    if lookahead is None:
+        x = y = heading = 0.0
+        for px, py in waypoints:
+            turn = (math.degrees(math.atan2(py - y, px - x)) - heading + 180) % 360 - 180
+            drivetrain.turn(turn, effort)
+            drivetrain.straight(math.hypot(px - x, py - y), effort)
+            x, y, heading = px, py, heading + turn
+    else:
+        assert drivetrain.follow_path(list(waypoints), speed, lookahead)
+    took = plant.now
+    plant.sleep(0.5)
+    missed = [min(math.hypot(x - px, y - py) for _, x, y, _ in plant.trace) for px, py in waypoints[:-1]]
+    return took, math.hypot(plant.x - waypoints[-1][0], plant.y - waypoints[-1][1]), max(missed)
+
+
+def main():
+    print("course  effort or speed  driven with                  time (s)  at rest off by (cm)  passed waypoints by, max (cm)")
+    for name, waypoints in COURSES:
+        length = sum(math.hypot(b[0] - a[0], b[1] - a[1]) for a, b in zip(((0, 0),) + waypoints, waypoints))
+        for effort, speed in SPEEDS:
+            took, off, missed = run(waypoints, effort, speed)
+            print("%-6s  %-15s  %-27s  %8.2f  %19.2f  %29.2f" % (name, "effort %.1f" % effort, "turn() then straight()", took, off, missed))
+            for lookahead in LOOKAHEADS:
+                took, off, missed = run(waypoints, effort, speed, lookahead)
+                print("%-6s  %-15s  %-27s  %8.2f  %19.2f  %29.2f" % (
+                    name, "%d cm/s" % speed, "follow_path(), %d cm ahead" % lookahead, took, off, missed))
+        print("%-6s  %.0f cm long" % (name, length))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#Measures how many commands per second one XRP gets through when the central keeps 1, 2 or 3 sequenced commands in flight to it.
+#With 1 in flight the XRP sits idle for a whole round trip between moves; with more, the next move is already queued when the last one ends.
+#The XRP is at the end of a chain of relays, with connections modelled at a 30 ms connection interval.
+#Usage: python -m sim.bench_pipeline
+import contextlib
+import io
+
+from sim.radio import Air, Central, install, xrp_motion_time
+
+COMMANDS = 20
+#Turn 0 degrees and drive 20 cm
+COMMAND = (0, 0, 0, 20)
+#Seconds the chain gets to exchange MTUs and routes once linked, and the commands get to be followed and acknowledged. The XRPs keep syncing their
+#clocks for as long as they are connected, so the air never goes quiet on its own.
+SETTLE = 2.0
+LIMIT = 120.0
+
+
+def commands_per_second(depth: int, in_flight: int) -> float:
+    air = Air(conn_interval=0.03, motion_time=xrp_motion_time)
+    install(air)
+    import swarm
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        central = Central(air)
+        agents = []
+        for number in range(depth):
+            agent = swarm.SwarmAgent(number, True)
+            air.run_main(agent._ble, agent.process_motion)
+            if agents:
+                air.link(agents[-1]._ble, agent._ble)
+            else:
+                central.connect(agent)
+            agents.append(agent)
+        air.run(air.now + SETTLE)
+        target = agents[-1].number
+
+        outstanding = set()
+        state = {"next": 0, "done": 0, "end": None}
+
+        def send():
+            seq = state["next"]
+            state["next"] += 1
+            outstanding.add(seq)
+            central.write(swarm.sequenced_frame((target,) + COMMAND, seq))
+
+        def on_notify(data):
+            #Acknowledgements for sequence numbers no longer outstanding are duplicates and ignored
+            for number, seq in swarm.completions(data):
+                if number == target and seq in outstanding:
+                    outstanding.discard(seq)
+                    state["done"] += 1
+                    if state["next"] < COMMANDS:
+                        send()
+                    elif state["done"] == COMMANDS:
+                        state["end"] = air.now
+
+        central.on_notify = on_notify
+        start = air.now
+        for _ in range(in_flight):
+            send()
+        air.run(start + LIMIT)
+    assert not air.errors, air.errors
+    assert state["done"] == COMMANDS
+    return COMMANDS / (state["end"] - start)
+
+
+def main():
+    limit = 1 / (xrp_motion_time("turn", COMMAND[2]) + xrp_motion_time("straight", COMMAND[3]))
+    print("motion limit %.3f commands/s" % limit)
+    print("depth  1 in flight  2 in flight  3 in flight  (commands/s)")
+    for depth in (1, 3, 5, 8):
+        print("%5d  %11.3f  %11.3f  %11.3f" % ((depth,) + tuple(commands_per_second(depth, n) for n in (1, 2, 3))))
+
+
+if __name__ == "__main__":
+    main()
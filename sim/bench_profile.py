@@ -0,0 +1,56 @@
+#Point to point moves on sim.plant's simulated XRP, driven by XRPLib's DifferentialDrive as it is: straight() and turn() on the error alone, as
+#before, and following a trapezoidal and an S-curve motion profile with feed-forward. Each profile tops out at 90% of the speed max_effort reaches
+#and speeds up at the default 4 times that per second; the S-curve's jerk is 10 times its acceleration per second. Reports how long each call
+#took to return, how long the XRP took to come within 0.5 cm or 1 degree of the target for good, how far it went past the target, and where it
+#came to rest.
+#Usage: python -m sim.bench_profile
+import math
+
+from sim.plant import Plant, TRACK_WIDTH, install
+
+MOVES = (("straight", 10), ("straight", 30), ("straight", 100), ("turn", 30), ("turn", 90), ("turn", 180))
+EFFORTS = (0.5, 1.0)
+TOLERANCE = {"straight": 0.5, "turn": 1.0}
+#Share of the top speed a profile cruises at
+CRUISE = 0.9
+#Seconds to let the XRP come to rest after the call returns
+REST = 1.0
+
+
+def run(kind: str, amount: float, effort: float, mode: str):
+    plant = Plant()
+    install(plant)
+    drivetrain = plant.drivetrain()
+    options = {}
+    if mode != "error only":
+        #Top speed of a wheel at max_effort, by the drivetrain's own feed-forward, in cm/s or degrees/s
+        top = (effort - drivetrain.ks) / drivetrain.kv * (1 if kind == "straight" else 360 / (math.pi * TRACK_WIDTH))
+        options["max_velocity"] = CRUISE * top
+        if mode == "S-curve":
+            options["max_jerk"] = 40 * CRUISE * top
+    plant.trace = []
+    result = getattr(drivetrain, kind)(amount, effort, **options)
+    returned = plant.now
+    plant.sleep(REST)
+    if kind == "straight":
+        path = [(t, x) for t, x, _, _ in plant.trace]
+    else:
+        path = [(t, math.degrees(heading)) for t, _, _, heading in plant.trace]
+    settled = max((t for t, position in path if abs(position - amount) >= TOLERANCE[kind]), default=0.0)
+    return result, returned, settled, max(0.0, max(position for _, position in path) - amount), path[-1][1] - amount
+
+
+def main():
+    print("move           max_effort  control     returned (s)  settled (s)  past the target  at rest off by")
+    for kind, amount in MOVES:
+        unit = "cm" if kind == "straight" else "deg"
+        for effort in EFFORTS:
+            for mode in ("error only", "trapezoidal", "S-curve"):
+                result, returned, settled, past, off = run(kind, amount, effort, mode)
+                assert result
+                print("%-8s %3d %-3s  %10.1f  %-11s  %12.2f  %11.2f  %12.2f %-3s %11.2f %s" % (
+                    kind, amount, unit, effort, mode, returned, settled, past, unit, off, unit))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#Measures what central.SwarmRegistry costs per notification, in real time. The registry is filled with 100, 1,000 and 10,000 XRPs and then fed a
+#mix of the notifications a driving swarm sends: telemetry notifications holding 1 to 8 records, acks and lists of acks. Notifications name XRPs by
+#one byte, so they name 256 of them. Runs with no consumer, one consumer handed every change as it happens, one holding changes for a UI that
+#collects them 30 times a second, and four consumers of a few fields each. For comparison, reports what it costs a UI to poll the whole swarm
+#instead, copying a snapshot and comparing it with the last one, 30 times a second.
+#Then checks the model against a simulated swarm of 50 XRPs driving around with telemetry at 5 and 10 samples a second, with the telemetry budget
+#dropping records at 10, by replaying the notifications that reached the central: how far each XRP's pose is from where it really ended up.
+#Usage: python -m sim.bench_registry
+import functools
+import math
+import random
+import time
+
+from central import SwarmRegistry
+from sim.radio import Air, install, xrp_motion_time
+from sim.swarmsim import Swarm, percentile
+
+SIZES = (100, 1000, 10000)
+NOTIFICATIONS = 200000
+#Times a second a UI collects changes or polls, and notifications between collections, for 256 XRPs sending 10 records a second each
+UI_HZ = 30
+COLLECT_EVERY = 25
+#Swarm share of each kind of notification, as the central sees it with every XRP sending telemetry
+MIX = (("telemetry", 0.8), ("done", 0.15), ("done list", 0.05))
+AGENTS = 50
+RATE = 10.0
+DURATION = 30.0
+#Turn 45 degrees and drive 30 cm
+COMMAND = (0, 45, 0, 30)
+
+
+def varint(value: int) -> bytes:
+    #A zigzag varint, as swarm.put_varint() writes it
+    value = value * 2 if value >= 0 else -value * 2 - 1
+    out = bytearray()
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def traffic(count: int):
+    #Notifications for 256 XRPs driving around: mostly telemetry records of the change in the encoders and yaw since the last, with a key record
+    #every 10, and acks
+    pick = random.Random(1)
+    seqs = [0] * 256
+    acks = [0] * 256
+    out = []
+    for _ in range(count):
+        kind = pick.random()
+        if kind < MIX[0][1]:
+            data = bytearray((0x08,))
+            for number in pick.sample(range(256), pick.randint(1, 8)):
+                if seqs[number] % 10 == 0:
+                    data += bytes((number, seqs[number] & 0xFF, 0x9F)) + b"".join(varint(pick.randint(0, 50000)) for _ in range(5))
+                else:
+                    data += bytes((number, seqs[number] & 0xFF, 0x07)) + varint(pick.randint(0, 40)) + varint(pick.randint(0, 40)) + varint(
+                        pick.randint(-20, 20))
+                seqs[number] += 1
+        elif kind < MIX[0][1] + MIX[1][1]:
+            number = pick.randrange(256)
+            acks[number] = (acks[number] + 1) & 0xFF
+            data = bytes((0x03, number, acks[number]))
+        else:
+            data = bytearray((0x07,))
+            for number in pick.sample(range(256), pick.randint(2, 6)):
+                acks[number] = (acks[number] + 1) & 0xFF
+                data += bytes((number, acks[number]))
+        out.append(bytes(data))
+    return out
+
+
+def filled(size: int) -> SwarmRegistry:
+    registry = SwarmRegistry()
+    for number in range(size):
+        registry.update(number, root="root", heard=0.0, pose=(0.0, 0.0, 0.0))
+    return registry
+
+
+def updates(notifications) -> int:
+    #XRP updates the notifications make, counted on a registry of their own so the count costs the timed runs nothing
+    registry = filled(256)
+    count = [0]
+    update = registry.update
+
+    def counted(number, **changes):
+        count[0] += 1
+        update(number, **changes)
+
+    registry.update = counted
+    for data in notifications:
+        registry.notified("root", data)
+    return count[0]
+
+
+def feed(size: int, consumers: str, notifications):
+    #Seconds the notifications take, and the changes handed on
+    registry = filled(size)
+    handed = [0]
+
+    def on_diff(number, changes):
+        handed[0] += 1
+
+    held = None
+    if consumers == "every change":
+        registry.subscribe(on_diff)
+    elif consumers == "held for a UI":
+        held = registry.subscribe()
+    elif consumers == "4 of a few fields":
+        for fields in (("pose",), ("acked", "in_flight"), ("battery", "moving"), ("missed", "dropped", "timeouts")):
+            registry.subscribe(on_diff, fields)
+    started = time.perf_counter()
+    for i, data in enumerate(notifications):
+        registry.notified("root", data)
+        if held is not None and i % COLLECT_EVERY == 0:
+            handed[0] += len(held.take())
+    return time.perf_counter() - started, handed[0]
+
+
+def poll(size: int):
+    #Seconds to copy a snapshot of the whole swarm and compare it with the last one
+    registry = filled(size)
+    last = registry.snapshot()
+    started = time.perf_counter()
+    polls = max(10, 100000 // size)
+    for _ in range(polls):
+        snapshot = registry.snapshot()
+        changed = [number for number, robot in snapshot.items() if robot != last.get(number)]
+        last = snapshot
+    return (time.perf_counter() - started) / polls, len(changed)
+
+
+def dead_reckoned(agent, start: float):
+    #Where the XRP really is, from its moves since start: x ahead of where it started, y to its left, and heading, in centimeters and degrees
+    x = y = heading = 0.0
+    for when, kind, amount in agent._ble.moves:
+        if when < start:
+            continue
+        if kind == "turn":
+            heading += amount
+        else:
+            x += amount * math.cos(math.radians(heading))
+            y += amount * math.sin(math.radians(heading))
+    return x, y, heading
+
+
+def simulated(hz: float):
+    install(Air())
+    import swarm
+
+    sim = Swarm(AGENTS, seed=1, agent_class=functools.partial(swarm.SwarmAgent, p_telemetry_hz=hz), motion_time=xrp_motion_time)
+    start = sim.air.now
+    sim.form()
+    sim.workload(RATE, DURATION, COMMAND)
+    assert not sim.air.errors, sim.air.errors[:5]
+    now = [0.0]
+    registry = SwarmRegistry(clock=lambda: now[0])
+    changes = registry.subscribe()
+    for when, data in sim.central.notifications:
+        now[0] = when
+        registry.notified("root", data)
+    held = changes.take()
+    errors = []
+    for agent in sim.agents:
+        pose = registry.robots[agent.number]["pose"]
+        x, y, heading = dead_reckoned(agent, start)
+        errors.append(math.hypot(pose[0] - x, pose[1] - y))
+        assert abs(pose[2] - heading) < 0.1, (agent.number, pose, heading)
+        assert held[agent.number]["pose"] == pose
+    missed = sum(robot["missed"] for robot in registry.robots.values())
+    return errors, missed, sum(agent.telemetry_dropped for agent in sim.agents)
+
+
+def main():
+    notifications = traffic(NOTIFICATIONS)
+    updated = updates(notifications)
+    print("%d notifications, %.1f XRP updates each on average" % (len(notifications), updated / len(notifications)))
+    print("XRPs    consumers          per notification (us)  per XRP update (us)  changes handed on")
+    for size in SIZES:
+        for consumers in ("none", "every change", "held for a UI", "4 of a few fields"):
+            took, handed = feed(size, consumers, notifications)
+            print("%6d  %-17s  %21.2f  %19.2f  %17d" % (size, consumers, 1e6 * took / len(notifications), 1e6 * took / updated, handed))
+    print()
+    print("XRPs    polling the whole swarm instead: per poll (ms)  at %d a second, share of a core" % UI_HZ)
+    for size in SIZES:
+        took, _ = poll(size)
+        print("%6d  %46.2f  %31.0f%%" % (size, 1000 * took, 100 * took * UI_HZ))
+    print()
+    print("%d simulated XRPs driving, %.0f commands/s for %.0f s" % (AGENTS, RATE, DURATION))
+    print("samples/s  records dropped by budget  missed at central  pose error p50/max (cm)")
+    for hz in (5.0, 10.0):
+        errors, missed, dropped = simulated(hz)
+        print("%9.0f  %25d  %17d  %14.1f %6.1f" % (hz, dropped, missed, percentile(errors, 0.5), max(errors)))
+
+
+if __name__ == "__main__":
+    main()
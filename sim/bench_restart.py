@@ -0,0 +1,86 @@
+#Checks that an XRP keeps taking commands from a sender that starts numbering them from 0 again, as controls.js does after a page reload and
+#central.py does in a new session. The XRP is at the end of a chain of 3, and the first session sends it COMMANDS sequenced commands, up to 3 in flight.
+#A second session then sends COMMANDS more from sequence number 0, either with _SEQ_RESTART set until the first acknowledgement, as both senders do, or
+#without it, as a sender that does not know about it would. Without it every number is within the XRP's duplicate window, so each is acknowledged
+#again from the first session rather than followed, but the sender no longer waits forever on acknowledgements that never come.
+#Reports, for each session, the commands acknowledged and followed, and how long they took.
+#Usage: python -m sim.bench_restart
+import contextlib
+import io
+
+from sim.radio import Air, Central, install, xrp_motion_time
+
+COMMANDS = 10
+IN_FLIGHT = 3
+DEPTH = 3
+#Turn 0 degrees and drive 20 cm
+COMMAND = (0, 0, 0, 20)
+#Seconds the chain gets to exchange MTUs and routes once linked, and each session gets to finish. The XRPs keep syncing their clocks for as long as
+#they are connected, so the air never goes quiet on its own.
+SETTLE = 2.0
+LIMIT = 60.0
+
+
+def sessions(restart: bool):
+    air = Air(conn_interval=0.03, motion_time=xrp_motion_time)
+    install(air)
+    import swarm
+
+    results = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        central = Central(air)
+        agents = []
+        for number in range(DEPTH):
+            agent = swarm.SwarmAgent(number, True)
+            air.run_main(agent._ble, agent.process_motion)
+            if agents:
+                air.link(agents[-1]._ble, agent._ble)
+            else:
+                central.connect(agent)
+            agents.append(agent)
+        air.run(air.now + SETTLE)
+        target = agents[-1]
+
+        for session in range(2):
+            #A new sender: numbers from 0, and sets _SEQ_RESTART until its first acknowledgement, if it knows to
+            outstanding = set()
+            state = {"next": 0, "acked": 0, "end": None, "restart": session > 0 and restart}
+
+            def send():
+                seq = state["next"]
+                state["next"] += 1
+                outstanding.add(seq)
+                central.write(swarm.sequenced_frame((target.number,) + COMMAND, seq, restart=state["restart"]))
+
+            def on_notify(data):
+                for number, seq in swarm.completions(data):
+                    if number == target.number and seq in outstanding:
+                        outstanding.discard(seq)
+                        state["restart"] = False
+                        state["acked"] += 1
+                        if state["next"] < COMMANDS:
+                            send()
+                        elif state["acked"] == COMMANDS:
+                            state["end"] = air.now
+
+            central.on_notify = on_notify
+            accepted = target.queue_in
+            start = air.now
+            for _ in range(IN_FLIGHT):
+                send()
+            air.run(start + LIMIT)
+            took = None if state["end"] is None else state["end"] - start
+            results.append((state["acked"], target.queue_in - accepted, took))
+    assert not air.errors, air.errors
+    return results
+
+
+def main():
+    print("second sender            session  acknowledged  followed  time (s)")
+    for label, restart in (("sets _SEQ_RESTART", True), ("does not set it", False)):
+        for session, (acked, followed, took) in enumerate(sessions(restart)):
+            print("%-22s  %8d  %12d  %8d  %8s" % (label, session + 1, acked, followed, "never" if took is None else "%.2f" % took))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#Measures how command latency grows with the size of the swarm for 1, 2 and 4 roots, each with its own connection to a central.SwarmCentral. The
+#swarm builds its trees with the central telling the roots how unbalanced they are, then every XRP gets commands at random times, half a second
+#apart on average, from the central. Moves finish instantly, so only the radio counts. Also builds the 4 root swarms without balancing, to compare
+#the sizes of the trees.
+#Usage: python -m sim.bench_roots
+import asyncio
+import random
+
+from central import SwarmCentral
+from sim.bench_central import AirTransport, run
+from sim.radio import Air, install
+from sim.swarmsim import Swarm, depths, percentile
+
+SIZES = (50, 100, 200)
+#Commands per second each XRP gets, on average
+RATE = 2.0
+DURATION = 15.0
+STEP = 0.002
+
+
+async def simulated(agents: int, roots: int, balance: bool = True, workload: bool = True):
+    install(Air())
+    sim = Swarm(agents, seed=1, roots=roots)
+    air = sim.air
+    central = SwarmCentral(timeout=10.0, balance=balance)
+    for link, root in zip(sim.centrals, sim.agents):
+        await central.add_root(AirTransport(link, root))
+    while any(agent.parent_handle is None for agent in sim.agents) and air.now < 120:
+        await run(sim, air.now + 0.1)
+    await run(sim, air.now + 1.0)
+    sizes = sorted(central.tree_sizes().values())
+    depth, _ = depths(sim.agents)
+    deepest = max(d for d in depth.values() if d is not None)
+    if not workload:
+        return sizes, deepest, None
+
+    pick = random.Random(agents)
+    start = air.now
+    end = start + DURATION
+    latencies = []
+
+    async def drive(robot):
+        while True:
+            await asyncio.sleep(0)
+            wake = air.now + pick.expovariate(RATE)
+            if wake >= end:
+                return
+            while air.now < wake:
+                await asyncio.sleep(0)
+            sent = air.now
+            try:
+                await central.send(robot, 0, 10)
+                latencies.append(air.now - sent)
+            except Exception:
+                latencies.append(float("inf"))
+
+    clients = [asyncio.ensure_future(drive(agent.number)) for agent in sim.agents]
+    while not all(client.done() for client in clients):
+        await run(sim, air.now + STEP)
+    assert not air.errors, air.errors[:5]
+    return sizes, deepest, latencies
+
+
+def main():
+    print("XRPs  roots  tree sizes       max depth  commands  latency p50/p99 (ms)")
+    for agents in SIZES:
+        for roots in (1, 2, 4):
+            sizes, deepest, latencies = asyncio.run(simulated(agents, roots))
+            print("%4d  %5d  %-15s  %9d  %8d  %8.0f %8.0f" % (
+                agents, roots, "/".join(map(str, sizes)), deepest, len(latencies), 1000 * percentile(latencies, 0.5),
+                1000 * percentile(latencies, 0.99)))
+    print()
+    print("XRPs  sizes of 4 trees, balanced  not balanced")
+    for agents in SIZES:
+        balanced = asyncio.run(simulated(agents, 4, workload=False))
+        unbalanced = asyncio.run(simulated(agents, 4, balance=False, workload=False))
+        print("%4d  %-28s  %s" % (agents, "/".join(map(str, balanced[0])), "/".join(map(str, unbalanced[0]))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#Counts how many radio writes it takes to deliver one command to each XRP in full trees of different depths, once with the routing table
+#wiped before every command (so every relay falls back to sending to all of its children) and once with the routes the agents learned.
+#Usage: python -m sim.bench_routing [fanout]
+import contextlib
+import io
+import sys
+
+from sim.radio import Air, Central, install
+
+#Seconds the tree gets to exchange MTUs and routes once linked, and each command gets to be delivered. The XRPs keep syncing their clocks for as
+#long as they are connected, so the air never goes quiet on its own.
+SETTLE = 2.0
+DELIVER = 0.5
+
+
+def build_tree(depth: int, fanout: int):
+    """
+    Builds a full tree of SwarmAgents below a fake central device.
+
+    :return: The central, and a list of every agent with the root first
+    """
+    air = Air()
+    install(air)
+    import swarm
+
+    central = Central(air)
+    root = swarm.SwarmAgent(0, True)
+    air.run_main(root._ble, root.process_motion)
+    central.connect(root)
+    agents = [root]
+    level = [root]
+    for _ in range(depth):
+        next_level = []
+        for parent in level:
+            for _ in range(fanout):
+                child = swarm.SwarmAgent(len(agents), True)
+                air.run_main(child._ble, child.process_motion)
+                air.link(parent._ble, child._ble)
+                agents.append(child)
+                next_level.append(child)
+        level = next_level
+    air.run(air.now + SETTLE)
+    return air, central, agents
+
+
+def writes_per_command(air, central, agents, learned: bool) -> float:
+    air.writes = 0
+    central.notifications.clear()
+    for agent in agents[1:]:
+        if not learned:
+            for other in agents:
+                other.routes.clear()
+        central.write(bytes((agent.number, 0, 90, 1, 0)))
+        air.run(air.now + DELIVER)
+    import swarm
+    delivered = sum(len(swarm.completions(data)) for _, data in central.notifications)
+    return air.writes / delivered
+
+
+def main():
+    fanout = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    print("fanout", fanout)
+    print("depth  agents  flood writes/cmd  routed writes/cmd")
+    for depth in range(2, 6):
+        if sum(fanout ** d for d in range(depth + 1)) > 256:
+            print("%5d  more than 256 agents, skipped" % depth)
+            continue
+        with contextlib.redirect_stdout(io.StringIO()):
+            air, central, agents = build_tree(depth, fanout)
+            flood = writes_per_command(air, central, agents, learned=False)
+            air, central, agents = build_tree(depth, fanout)
+            routed = writes_per_command(air, central, agents, learned=True)
+        assert not air.errors, air.errors
+        print("%5d  %6d  %16.2f  %17.2f" % (depth, len(agents), flood, routed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#Measures how much time an XRP spends handling scan results with 100 and 200 devices advertising around it, half of them XRPs and half phones and
+#other devices. The scanning XRP's controller has no room for another connection, as when it is already at its limit, so every gap_connect() fails
+#and it keeps scanning for the whole run. Reports scan results handled, handler CPU time per simulated second and connection attempts per second.
+#Usage: python -m sim.bench_scan [directory holding another swarm.py to compare]
+import contextlib
+import io
+import sys
+import time
+
+from sim.radio import Air, Central, FakeBLE, UUID, install
+
+DURATION = 20.0
+_IRQ_SCAN_RESULT = 5
+
+
+def run(advertisers: int):
+    air = Air(conn_interval=0.03, connect_delay=0.05, max_connections=1, seed=advertisers)
+    install(air)
+    import swarm
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        central = Central(air)
+        root = swarm.SwarmAgent(0, True)
+        stats = {"results": 0, "cpu": 0.0, "connects": 0}
+        handler = root.event
+
+        def timed(event, data):
+            if event != _IRQ_SCAN_RESULT:
+                return handler(event, data)
+            started = time.perf_counter()
+            handler(event, data)
+            stats["cpu"] += time.perf_counter() - started
+            stats["results"] += 1
+
+        root._ble.irq(timed)
+        connect = root._ble.gap_connect
+
+        def counted_connect(*args):
+            stats["connects"] += 1
+            connect(*args)
+
+        root._ble.gap_connect = counted_connect
+        for number in range(1, advertisers // 2 + 1):
+            swarm.SwarmAgent(number, number % 2 == 0)
+        for i in range(advertisers - advertisers // 2):
+            #Phones, watches and beacons, with a 16 bit service, a 128 bit service that is not the XRP's, or both
+            other = FakeBLE(air)
+            other.active(True)
+            services = [UUID(0x180F)] if i % 3 == 0 else [UUID("0000fe2c-0000-1000-8000-00805f9b34fb")]
+            if i % 3 == 2:
+                services.append(UUID(0x180A))
+            other.gap_advertise(100000 + 50000 * (i % 4), swarm.advertising_payload(name=b"P", services=services))
+        central.connect(root)
+        air.run(until=DURATION)
+    assert not air.errors, air.errors[:5]
+    return stats["results"] / DURATION, stats["cpu"] / DURATION, stats["connects"] / DURATION
+
+
+def main():
+    if len(sys.argv) > 1:
+        sys.path.insert(0, sys.argv[1])
+    print("advertisers  scan results/s  handler CPU ms/s  connect attempts/s")
+    for advertisers in (100, 200):
+        results, cpu, connects = run(advertisers)
+        print("%11d  %14.0f  %16.1f  %18.1f" % (advertisers, results, 1000 * cpu, connects))
+
+
+if __name__ == "__main__":
+    main()
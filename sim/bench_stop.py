@@ -0,0 +1,160 @@
+#Measures how long an emergency stop takes to reach every XRP in a 100 XRP swarm that is under full command load: the central keeps sending
+#sequenced commands to random XRPs, faster than they can follow them, so every queue is full and every link has commands waiting on it. Moves take as
+#long as they would on an XRP. Every few seconds the central sends a stop for every XRP, and then a stop for one of the deepest XRPs. Reports, by
+#depth in the tree, the time from the central writing the stop to the XRP halting its drivetrain, and to its confirmation reaching the central. The
+#drivetrain ends the move at its next control tick, up to 10 ms later, which is added to the worst case. For comparison, also reports how long the
+#XRPs would have gone on moving without a stop, finishing the move they were making and then their queues.
+#Last, interrupts one XRP's main program with a stop, and with a latest wins command that throws away the waiting ones, at every line of
+#process_motion() in turn, as the IRQ handler can, and counts the commands followed after being thrown away.
+#Usage: python -m sim.bench_stop
+import contextlib
+import inspect
+import io
+import random
+import sys
+
+from sim.radio import Air, install, xrp_motion_time
+from sim.swarmsim import Swarm, by_depth, depths, percentile
+
+AGENTS = 100
+#Commands per second from the central, and seconds of load before each stop
+RATE = 100.0
+LOAD = 8.0
+TRIALS = 5
+#Longest a move runs on after halt(), one control tick of DifferentialDrive
+TICK = 0.01
+MOVE = (0, 90, 0, 30)
+#Commands waiting in the queue when the main program is interrupted
+QUEUED = 4
+
+
+def interrupted(kind: str, line: int) -> int:
+    #Queues QUEUED commands, each driving its own distance, and follows them with the IRQ handler cutting in when process_motion() reaches line.
+    #Returns how many of them were followed after being thrown away.
+    air = Air()
+    install(air)
+    import swarm
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent = swarm.SwarmAgent(1)
+    air.current = agent._ble
+    for i in range(QUEUED):
+        agent.enqueue(bytes((1, 0, 0, 0, 10 + i)), 0, i)
+    thrown = set()
+    notify_dropped = agent.notify_dropped
+
+    def dropped(seq=None):
+        thrown.add(seq)
+        notify_dropped(seq)
+
+    agent.notify_dropped = dropped
+    code = agent.process_motion.__code__
+    state = {"fired": False, "moves": 0}
+
+    def irq():
+        state["fired"] = True
+        state["moves"] = len(agent._ble.moves)
+        if kind == "stop":
+            #A stop throws every waiting command away, and the one being followed as well
+            thrown.update(range(QUEUED))
+            agent.stop()
+        else:
+            agent.enqueue_sequenced(swarm.sequenced_frame((1, 0, 0, 0, 99), 200, latest_wins=True))
+
+    def trace_line(frame, event, arg):
+        if event == "line" and frame.f_lineno == line and not state["fired"]:
+            irq()
+        return trace_line
+
+    sys.settrace(lambda frame, event, arg: trace_line if frame.f_code is code else None)
+    try:
+        for _ in range(2 * QUEUED):
+            agent.process_motion()
+    finally:
+        sys.settrace(None)
+    followed = [amount - 10 for _, kind_, amount in agent._ble.moves[state["moves"]:] if kind_ == "straight" and amount < 10 + QUEUED]
+    return sum(1 for i in followed if i in thrown)
+
+
+def main():
+    sim = Swarm(AGENTS, seed=1, motion_time=xrp_motion_time)
+    sim.form()
+    swarm = sim.swarm
+    air = sim.air
+    depth, _ = depths(sim.agents)
+    attached = [agent for agent in sim.agents if depth[agent] is not None]
+    deepest = sorted(attached, key=lambda agent: -depth[agent])[:TRIALS]
+    pick = random.Random(1)
+    seqs = {}
+    confirmed = {}
+
+    def send():
+        agent = pick.choice(attached)
+        seq = seqs.get(agent.number, 0)
+        seqs[agent.number] = (seq + 1) & 0xFF
+        sim.central.write(swarm.sequenced_frame((agent.number,) + MOVE, seq))
+        air.schedule_at(air.now + pick.expovariate(RATE), send)
+
+    def notified(data):
+        if len(data) == 2 and data[0] == swarm._NOTIFY_STOPPED:
+            confirmed.setdefault(data[1], air.now)
+
+    sim.central.on_notify = notified
+    send()
+    broadcast = []
+    single = []
+    waiting = []
+    busy = []
+    move_time = xrp_motion_time("turn", MOVE[1]) + xrp_motion_time("straight", 100 * MOVE[2] + MOVE[3])
+    for trial in range(TRIALS):
+        for target in (None, deepest[trial]):
+            sim.run(air.now + LOAD)
+            waiting.append(sum(agent.queue_in - agent.queue_head() for agent in attached))
+            start = air.now
+            if target is None:
+                busy.extend(max(0.0, agent._ble.main_busy_until - start) + (agent.queue_in - agent.queue_head()) * move_time for agent in attached)
+            confirmed.clear()
+            halts = {agent: len(agent._ble.halts) for agent in attached}
+            sim.central.write(swarm.stop_frame(None if target is None else target.number))
+            sim.run(start + 3.0)
+            for agent in attached if target is None else [target]:
+                halted = agent._ble.halts[halts[agent]:]
+                assert halted and agent.number in confirmed, agent.number
+                sample = (depth[agent], (halted[0] - start, confirmed[agent.number] - start))
+                (broadcast if target is None else single).append(sample)
+    assert not air.errors, air.errors[:5]
+
+    print("%d XRPs, max depth %d, %.0f commands/s, %.1f commands waiting in queues on average when a stop is sent" % (
+        AGENTS, max(depth[agent] for agent in attached), RATE, sum(waiting) / len(waiting)))
+    print()
+    print("stop for every XRP, %d times" % TRIALS)
+    print("depth  XRPs  halted p50/max (ms)  confirmed p50/max (ms)")
+    grouped = by_depth(broadcast)
+    for d in sorted(grouped):
+        halted = [sample[0] for sample in grouped[d]]
+        confirmed_at = [sample[1] for sample in grouped[d]]
+        print("%5d  %4d  %8.0f %6.0f        %8.0f %6.0f" % (
+            d, len(halted) // TRIALS, 1000 * percentile(halted, 0.5), 1000 * max(halted), 1000 * percentile(confirmed_at, 0.5),
+            1000 * max(confirmed_at)))
+    last = max(sample[1][0] for sample in broadcast)
+    print("last XRP halted after %.0f ms, moving for at most %.0f ms" % (1000 * last, 1000 * (last + TICK)))
+    print("without a stop, moving for another %.1f s p50, %.1f s max" % (percentile(busy, 0.5), max(busy)))
+    print()
+    print("stop for one of the deepest XRPs, %d times" % TRIALS)
+    print("halted p50/max (ms)  confirmed p50/max (ms)")
+    halted = [sample[1][0] for sample in single]
+    confirmed_at = [sample[1][1] for sample in single]
+    print("%8.0f %6.0f        %8.0f %6.0f" % (1000 * percentile(halted, 0.5), 1000 * max(halted), 1000 * percentile(confirmed_at, 0.5),
+                                              1000 * max(confirmed_at)))
+    print()
+    import swarm
+    lines, first = inspect.getsourcelines(swarm.SwarmAgent.process_motion)
+    print("IRQ handler cutting into process_motion() with %d commands waiting, at each of its %d lines" % (QUEUED, len(lines)))
+    print("interrupted by         commands followed after being thrown away, worst line  lines with any")
+    for kind in ("stop", "latest wins"):
+        counts = [interrupted(kind, line) for line in range(first, first + len(lines))]
+        print("%-21s  %47d  %14d" % (kind, max(counts), sum(1 for count in counts if count)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#Moves every XRP in a 100 XRP swarm at once, first with a group frame, which each XRP follows as soon as it arrives, and then with a frame that
+#starts the move 500 ms of swarm time after the root gets it. Every XRP's clock runs up to about 100 ppm fast or slow and starts at a random time,
+#and 2% of link layer packets are lost and resent. Reports how far each XRP's start is from the root's, by depth in the tree, over 5 moves each.
+#Usage: python -m sim.bench_sync
+from sim.radio import xrp_motion_time
+from sim.swarmsim import Swarm, by_depth, depths, percentile
+
+AGENTS = 100
+MOVE = (0, 90, 0, 20)
+TRIALS = 5
+#Seconds the XRPs are given to sync their clocks before the first move, and between moves
+SETTLE = 10.0
+DELAY_US = 500000
+
+
+def starts(sim: Swarm, frame: bytes):
+    #Sends frame to the root and returns, for every XRP, how many seconds after the root it started moving
+    start = sim.air.now
+    sim.central.write(frame)
+    sim.run(start + SETTLE)
+    first = {}
+    for agent in sim.agents:
+        moves = [move[0] for move in agent._ble.moves if move[0] >= start]
+        if moves:
+            first[agent] = moves[0]
+    root = first[sim.agents[0]]
+    return {agent: when - root for agent, when in first.items()}
+
+
+def main():
+    sim = Swarm(AGENTS, seed=1, loss=0.02, clock_skew=30.0, motion_time=xrp_motion_time)
+    sim.form()
+    sim.run(sim.air.now + SETTLE)
+    swarm = sim.swarm
+    depth, _ = depths(sim.agents)
+    print("%d agents, max depth %d, clocks %.0f ppm apart at most" % (
+        AGENTS, max(d for d in depth.values() if d is not None),
+        1000000 * (max(agent._ble.ticks_rate for agent in sim.agents) - min(agent._ble.ticks_rate for agent in sim.agents))))
+    print()
+    print("depth  agents  group frame skew p50/p99/max (ms)  scheduled skew p50/p99/max (ms)")
+    results = []
+    for frame in (swarm.group_frame(MOVE), swarm.at_frame(MOVE, DELAY_US)):
+        skew = []
+        for _ in range(TRIALS):
+            skew.extend((depth[agent], abs(offset)) for agent, offset in starts(sim, frame).items() if depth[agent] is not None)
+        results.append(by_depth(skew))
+    assert not sim.air.errors, sim.air.errors[:5]
+    for d in sorted(set(v for v in depth.values() if v is not None)):
+        row = "%5d  %6d" % (d, sum(1 for v in depth.values() if v == d))
+        for grouped in results:
+            samples = grouped.get(d, [0.0])
+            row += "  %8.1f %7.1f %7.1f          " % tuple(1000 * value for value in (percentile(samples, 0.5), percentile(samples, 0.99), max(samples)))
+        print(row.rstrip())
+
+
+if __name__ == "__main__":
+    main()
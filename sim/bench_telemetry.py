@@ -0,0 +1,85 @@
+#Runs 50 XRPs sending telemetry at 0 to 10 samples a second each while the central keeps them driving around with sequenced commands, and reports
+#how much of the telemetry reaches the central, how much of the root's link to the central it takes, and what it does to command delivery times
+#and to acks, which share the way up with the telemetry. Ack latency is from an XRP finishing a move to the central hearing about it. The link carries at most packets_per_event link layer packets of 27 bytes each way per 30 ms connection event.
+#Usage: python -m sim.bench_telemetry
+import functools
+import math
+
+from sim.radio import Air, install, xrp_motion_time
+from sim.swarmsim import Swarm, percentile
+
+AGENTS = 50
+RATE = 10.0
+DURATION = 30.0
+#Turn 45 degrees and drive 30 cm
+COMMAND = (0, 45, 0, 30)
+#ATT and L2CAP headers on every notification
+PDU_OVERHEAD = 7
+#A telemetry budget large enough that nothing is ever dropped
+NO_BUDGET = 1000000
+
+
+def run(hz: float, budget: bool):
+    install(Air())
+    import swarm
+
+    options = {"p_telemetry_hz": hz}
+    if not budget:
+        options["p_telemetry_budget"] = NO_BUDGET
+    sim = Swarm(AGENTS, seed=1, agent_class=functools.partial(swarm.SwarmAgent, **options), motion_time=xrp_motion_time)
+    sim.form()
+    air = sim.air
+    start = air.now
+    first = len(sim.central.notifications)
+    records = {agent.number: agent.record_count for agent in sim.agents}
+    load = sim.workload(RATE, DURATION, COMMAND)
+    assert not air.errors, air.errors[:5]
+    span = air.now - start
+
+    finished = {}
+    for agent in sim.agents:
+        straights = [move for move in agent._ble.moves if move[0] >= start and move[1] == "straight"]
+        finished[agent.number] = [when + xrp_motion_time("straight", cm) for when, _, cm in straights]
+    acks = []
+    latest = {}
+    updates = 0
+    telemetry_packets = packets = 0
+    for n, (when, data) in enumerate(sim.central.notifications):
+        if n < first:
+            #Key records sent before the commands start, which the central needs to make sense of the records after them
+            if data[0] == swarm._NOTIFY_TELEMETRY and len(data) > 1:
+                swarm.read_telemetry(data, latest)
+            continue
+        used = math.ceil((len(data) + PDU_OVERHEAD) / air.ll_payload)
+        packets += used
+        #Each XRP finishes its commands in order, so its acks come in the same order as its moves
+        for number, _ in swarm.completions(data):
+            acks.append(when - finished[number].pop(0))
+        if data[0] == swarm._NOTIFY_TELEMETRY and len(data) > 1:
+            telemetry_packets += used
+            updates += len(swarm.read_telemetry(data, latest))
+    sent = sum(agent.record_count - records[agent.number] for agent in sim.agents)
+    capacity = air.packets_per_event / air.conn_interval
+    return {
+        "sent": sent / span,
+        "updates": updates / span,
+        "dropped": sum(agent.telemetry_dropped for agent in sim.agents) / span,
+        "telemetry": telemetry_packets / span / capacity,
+        "link": packets / span / capacity,
+        "delivery": [1000 * percentile([latency for _, latency in load.delivered], f) for f in (0.5, 0.99)],
+        "ack": [1000 * percentile(acks, f) for f in (0.5, 0.99)],
+        "lost": load.count - len(load.delivered),
+    }
+
+
+def main():
+    print("%d XRPs driving, %.0f commands/s" % (AGENTS, RATE))
+    print("samples/s  budget  records sent/s  applied at central/s  dropped by budget/s  root link: telemetry  all  delivery p50/p99 (ms)  ack p50/p99 (ms)  lost")
+    for hz, budget in ((0, True), (1, True), (2, True), (5, True), (10, True), (10, False), (20, True), (20, False)):
+        r = run(hz, budget)
+        print("%9d  %6s  %14.0f  %20.0f  %19.0f  %20.0f%%  %3.0f%%  %11.0f %8.0f  %7.0f %8.0f  %4d" % (
+            hz, "yes" if budget else "no", r["sent"], r["updates"], r["dropped"], 100 * r["telemetry"], 100 * r["link"], *r["delivery"], *r["ack"], r["lost"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+#Builds a tree out of 50, 100 and 200 XRPs scattered over a 20 m square and reports how deep it ends up, once with every XRP connecting to the first
+#advertiser it hears (the old behaviour) and once with the wait based parent selection in SwarmAgent.consider(). Every fourth XRP cannot take children.
+#Usage: python -m sim.bench_tree
+from sim.radio import Air, install
+from sim.swarmsim import Swarm, tree_stats
+
+
+def build(count: int, greedy: bool, seed: int):
+    #swarm can only be imported once the fake modules are in place, and the agent class has to exist before the Swarm is made
+    install(Air())
+    import swarm
+
+    class GreedyAgent(swarm.SwarmAgent):
+        #Connects to the first XRP it hears, the way every XRP did before
+        def consider(self, first, rssi, adv_data):
+            return not self.connecting
+
+    sim = Swarm(count, seed=seed, agent_class=GreedyAgent if greedy else None)
+    formed = sim.form()
+    return sim.air, sim.agents, formed
+
+
+def main():
+    print("agents  policy   attached  avg depth  max depth  links > 12 m  formed by")
+    for count in (50, 100, 200):
+        for greedy in (True, False):
+            air, agents, formed = build(count, greedy, seed=count)
+            assert not air.errors, air.errors
+            attached, average, deepest, weak = tree_stats(agents)
+            print("%6d  %-7s  %8d  %9.2f  %9d  %12d  %7.1f s" % (
+                count, "greedy" if greedy else "policy", attached, average, deepest, weak, formed))
+
+
+if __name__ == "__main__":
+    main()
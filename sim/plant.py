@@ -0,0 +1,240 @@
+#Runs XRPLib's drivetrain code on a computer, against a simulated XRP on a virtual clock.
+#A Plant is the XRP's two wheels: each motor turns its effort into a wheel speed through a first order lag, less friction that holds a wheel at
+#rest below a deadband and takes that much effort off a turning one, and the encoders and IMU read back how far each wheel and the robot have
+#turned. install() puts fake machine and rp2 modules in sys.modules, so XRPLib's EncodedMotor, PID and DifferentialDrive run unchanged on top of
+#it, and gives those modules a time module that follows the plant's clock, so their sleeps move the simulation on instead of waiting. Timers
+#started through machine.Timer fire on the plant's clock too, like EncodedMotor's 50 Hz speed control.
+#The clock only moves when the code sleeps, so the code's own work takes no time unless it calls Plant.sleep() for it. VirtualLoop is an asyncio
+#event loop on the same clock, for code built on uasyncio.
+#Do not use it in the same process as sim.radio, which has fake modules of its own.
+import asyncio
+import math
+import selectors
+import sys
+import types
+
+#Wheel speed in cm/s at full effort, the time constant of the motor and wheel in seconds, and the effort friction takes
+MAX_SPEED = 60.0
+TAU = 0.08
+DEADBAND = 0.1
+#Simulation step in seconds
+STEP = 0.001
+WHEEL_DIAMETER = 6.0
+TRACK_WIDTH = 15.5
+#Encoder counts per wheel revolution, matching XRPLib.encoder.Encoder.resolution
+RESOLUTION = (30 / 14) * (28 / 16) * (36 / 9) * (26 / 8) * 12
+
+_plant = None
+
+
+class Plant:
+    def __init__(self, max_speed: float = MAX_SPEED, tau: float = TAU, deadband: float = DEADBAND):
+        """
+        A simulated XRP, at the origin facing along x. Call install() with it before making its drivetrain().
+
+        :param max_speed: Wheel speed in cm/s at full effort
+        :type max_speed: float
+        :param tau: Time constant of each motor and wheel, in seconds
+        :type tau: float
+        :param deadband: Effort friction takes, below which a wheel at rest does not start turning
+        :type deadband: float
+        """
+        self.max_speed = max_speed
+        self.tau = tau
+        self.deadband = deadband
+        self.now = 0.0
+        #Left and right: effort, wheel speed in cm/s, and distance turned in cm since the last encoder reset and in all
+        self.effort = [0.0, 0.0]
+        self.speed = [0.0, 0.0]
+        self.encoder = [0.0, 0.0]
+        self.distance = [0.0, 0.0]
+        #Pose of the robot in cm and radians
+        self.x = 0.0
+        self.y = 0.0
+        self.heading = 0.0
+        #[due time, period or None, callback, timer] of every timer running
+        self.timers = []
+        #(time, x, y, heading) every step, if set to a list
+        self.trace = None
+
+    def accelerate(self, effort: float, speed: float, dt: float) -> float:
+        #Wheel speed after dt seconds at an effort. Friction takes deadband off the effort against the way the wheel turns, so the wheel settles at
+        #max_speed at full effort and cannot start turning from rest below deadband.
+        effort = max(-1.0, min(1.0, effort))
+        if speed == 0:
+            if abs(effort) <= self.deadband:
+                return 0.0
+            friction = math.copysign(self.deadband, effort)
+        else:
+            friction = math.copysign(self.deadband, speed)
+        target = (effort - friction) / (1 - self.deadband) * self.max_speed
+        new = speed + (target - speed) * (1 - math.exp(-dt / self.tau))
+        #Friction stops the wheel rather than turning it the other way
+        return 0.0 if speed != 0 and new * speed < 0 and abs(effort) <= self.deadband else new
+
+    def sleep(self, seconds: float) -> None:
+        """
+        Moves the clock on, stepping the wheels and firing timers as it goes.
+        """
+        end = self.now + max(0.0, seconds)
+        while True:
+            due = min((timer[0] for timer in self.timers), default=end)
+            if due > end:
+                self.advance(end)
+                return
+            self.advance(due)
+            for timer in [timer for timer in self.timers if timer[0] <= self.now]:
+                if timer[1] is None:
+                    self.timers.remove(timer)
+                else:
+                    timer[0] += timer[1]
+                timer[2](timer[3])
+
+    def advance(self, until: float) -> None:
+        while self.now < until - 1e-12:
+            dt = min(STEP, until - self.now)
+            for side in range(2):
+                self.speed[side] = self.accelerate(self.effort[side], self.speed[side], dt)
+                self.encoder[side] += self.speed[side] * dt
+                self.distance[side] += self.speed[side] * dt
+            forward = (self.speed[0] + self.speed[1]) / 2 * dt
+            turned = (self.speed[1] - self.speed[0]) / TRACK_WIDTH * dt
+            self.x += forward * math.cos(self.heading + turned / 2)
+            self.y += forward * math.sin(self.heading + turned / 2)
+            self.heading += turned
+            self.now += dt
+            if self.trace is not None:
+                self.trace.append((self.now, self.x, self.y, self.heading))
+        self.now = max(self.now, until)
+
+    def drivetrain(self, imu: bool = True):
+        """
+        A DifferentialDrive for this XRP, built from XRPLib's EncodedMotor over fake motors and encoders.
+
+        :param imu: Gives the drivetrain an IMU; without one, it keeps its heading from the encoders
+        :type imu: bool
+        """
+        from XRPLib.differential_drive import DifferentialDrive
+        from XRPLib.encoded_motor import EncodedMotor
+        return DifferentialDrive(EncodedMotor(_Motor(self, 0), _Encoder(self, 0)), EncodedMotor(_Motor(self, 1), _Encoder(self, 1)),
+                                 _IMU(self) if imu else None, WHEEL_DIAMETER, TRACK_WIDTH)
+
+
+class _Motor:
+    #Stands in for XRPLib.motor.Motor
+    def __init__(self, plant, side):
+        self.plant = plant
+        self.side = side
+        self.flip_dir = False
+
+    def set_effort(self, effort):
+        self.plant.effort[self.side] = effort
+
+
+class _Encoder:
+    #Stands in for XRPLib.encoder.Encoder, counting whole encoder counts
+    resolution = RESOLUTION
+
+    def __init__(self, plant, side):
+        self.plant = plant
+        self.side = side
+
+    def reset_encoder_position(self):
+        self.plant.encoder[self.side] = 0.0
+
+    def get_position_counts(self):
+        return int(self.plant.encoder[self.side] / (math.pi * WHEEL_DIAMETER) * RESOLUTION)
+
+    def get_position(self):
+        return self.get_position_counts() / RESOLUTION
+
+
+class _IMU:
+    #Stands in for XRPLib.imu.IMU, with a yaw that is exactly the robot's heading
+    def __init__(self, plant):
+        self.plant = plant
+        self.offset = 0.0
+
+    def get_yaw(self):
+        return math.degrees(self.plant.heading) - self.offset
+
+    def get_heading(self):
+        return self.get_yaw() % 360
+
+    def reset_yaw(self):
+        self.offset = math.degrees(self.plant.heading)
+
+
+class _Timer:
+    #machine.Timer, firing on the plant's clock
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self.entry = None
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode=PERIODIC, period=-1, freq=-1, callback=None):
+        self.deinit()
+        interval = 1 / freq if freq > 0 else period / 1000
+        self.entry = [_plant.now + interval, interval if mode == self.PERIODIC else None, callback, self]
+        _plant.timers.append(self.entry)
+
+    def deinit(self):
+        if self.entry in _plant.timers:
+            _plant.timers.remove(self.entry)
+        self.entry = None
+
+
+class _Selector(selectors.DefaultSelector):
+    #Never waits: a wait moves the plant's clock on instead
+    def select(self, timeout=None):
+        events = super().select(0)
+        if not events and timeout:
+            _plant.sleep(timeout)
+        return events
+
+
+class VirtualLoop(asyncio.SelectorEventLoop):
+    """
+    An asyncio event loop whose time is the plant's clock, so uasyncio code runs as it would on the XRP, with sleeps costing no real time.
+    """
+
+    def __init__(self):
+        super().__init__(_Selector())
+
+    def time(self) -> float:
+        return _plant.now
+
+
+def _module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    return module
+
+
+def _unavailable(*args, **kwargs):
+    raise RuntimeError("not simulated")
+
+
+def install(plant: Plant) -> None:
+    """
+    Makes plant the XRP that XRPLib's timers and sleeps follow, and puts the fake modules XRPLib needs in sys.modules.
+    """
+    global _plant
+    _plant = plant
+    clock = _module("time", ticks_ms=lambda: int(_plant.now * 1000), ticks_us=lambda: int(_plant.now * 1000000),
+                    ticks_diff=lambda a, b: a - b, ticks_add=lambda a, b: a + b, time=lambda: _plant.now, sleep=lambda seconds: _plant.sleep(seconds),
+                    sleep_ms=lambda ms: _plant.sleep(ms / 1000), sleep_us=lambda us: _plant.sleep(us / 1000000))
+    if "XRPLib.differential_drive" not in sys.modules:
+        sys.modules["machine"] = _module("machine", Timer=_Timer, Pin=_unavailable, PWM=_unavailable, I2C=_unavailable, ADC=_unavailable,
+                                         disable_irq=lambda: 0, enable_irq=lambda state: None)
+        sys.modules["rp2"] = _module("rp2", asm_pio=lambda **kwargs: lambda program: program, StateMachine=_unavailable,
+                                     PIO=types.SimpleNamespace(SHIFT_LEFT=0, SHIFT_RIGHT=1))
+        import XRPLib.differential_drive
+        import XRPLib.odometry
+        import XRPLib.pid
+        import XRPLib.timeout
+    for name in ("XRPLib.differential_drive", "XRPLib.odometry", "XRPLib.pid", "XRPLib.timeout"):
+        sys.modules[name].time = clock
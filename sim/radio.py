@@ -0,0 +1,1117 @@
+#A fake of the MicroPython bluetooth module, plus just enough of micropython, machine and XRPLib.defaults to import swarm.py on a normal computer.
+#Every bluetooth.BLE() made while an Air is installed becomes one radio in that Air. Writes and notifications between radios are delivered through
+#a time ordered event queue, so unmodified SwarmAgent instances can talk to each other in one process.
+import builtins
+import heapq
+import math
+import random
+import sys
+import types
+
+#IRQ events, with the same values as swarm.py
+_IRQ_CENTRAL_CONNECT = 1
+_IRQ_CENTRAL_DISCONNECT = 2
+_IRQ_GATTS_WRITE = 3
+_IRQ_SCAN_RESULT = 5
+_IRQ_SCAN_DONE = 6
+_IRQ_PERIPHERAL_CONNECT = 7
+_IRQ_PERIPHERAL_DISCONNECT = 8
+_IRQ_GATTC_WRITE_DONE = 17
+_IRQ_GATTC_NOTIFY = 18
+_IRQ_GATTC_INDICATE = 19
+_IRQ_GATTS_INDICATE_DONE = 20
+_IRQ_MTU_EXCHANGED = 21
+_IRQ_L2CAP_ACCEPT = 22
+_IRQ_L2CAP_CONNECT = 23
+_IRQ_L2CAP_DISCONNECT = 24
+_IRQ_L2CAP_RECV = 25
+_IRQ_L2CAP_SEND_READY = 26
+_IRQ_CONNECTION_UPDATE = 27
+
+_ADV_IND = 0x00
+
+#The connection handle MicroPython reports when gap_connect() fails
+_CONN_HANDLE_FAILED = 0xFFFF
+
+_DEFAULT_MTU = 23
+#Bytes a characteristic value can hold until gatts_set_buffer() is called
+_DEFAULT_BUFFER = 20
+#ATT and L2CAP headers added to every write or notification
+_PDU_OVERHEAD = 7
+#L2CAP header on every packet of a connection oriented channel, the SDU length in the first packet of each SDU, and the size of a signaling packet
+_L2CAP_HEADER = 4
+_SDU_LENGTH = 2
+_SIGNAL_SIZE = 14
+#Status of an L2CAP disconnect for a channel the other end refused, as NimBLE reports no PSM listening
+_L2CAP_REFUSED = 2
+#HCI LE Connection Update, the one command hci_cmd() takes, the statuses it returns otherwise, and the unit connection intervals are given in
+_OGF_LE = 0x08
+_OCF_CONNECTION_UPDATE = 0x0013
+_HCI_UNKNOWN_COMMAND = 0x01
+_HCI_UNKNOWN_CONNECTION = 0x02
+_INTERVAL_UNIT = 0.00125
+#Connection events between a connection update being asked for and the new parameters taking effect
+_UPDATE_INSTANT = 6
+
+#Clock sync frames and notifications, with the same types and sizes as swarm.py. They go back and forth on every link for as long as the tree is up,
+#so they are counted apart from the rest of the traffic.
+_FRAME_SYNC = 0x06
+_SYNC_SIZE = 13
+_NOTIFY_SYNC = 0x09
+_NOTIFY_SYNC_SIZE = 5
+
+_ENOMEM = 12
+_EINVAL = 22
+_EOPNOTSUPP = 95
+_ENOTCONN = 107
+_EALREADY = 114
+
+#The Air that bluetooth.BLE() will join. Set by install().
+_air = None
+
+
+class UUID:
+    def __init__(self, value):
+        """
+        Stand-in for bluetooth.UUID. Stores the UUID the same way MicroPython does, as little endian bytes.
+
+        :param value: A 16 or 32 bit integer, a UUID string, or the raw bytes of the UUID
+        :type value: int, str or bytes
+        """
+        if isinstance(value, int):
+            self._bytes = value.to_bytes(2 if value < 0x10000 else 4, "little")
+        elif isinstance(value, str):
+            self._bytes = bytes.fromhex(value.replace("-", ""))[::-1]
+        else:
+            self._bytes = bytes(value)
+
+    def __bytes__(self):
+        return self._bytes
+
+    def __eq__(self, other):
+        return isinstance(other, UUID) and self._bytes == other._bytes
+
+    def __hash__(self):
+        return hash(self._bytes)
+
+    def __repr__(self):
+        return "UUID(" + self._bytes[::-1].hex() + ")"
+
+
+class Air:
+    def __init__(self, link_latency: float = 0.0, connect_delay: float = 0.0, conn_interval: float = 0.0, packets_per_event: int = 4, ll_payload: int = 27, loss: float = 0.0, max_connections: int = None, motion_time=None, rssi=None, supervision_timeout: float = 0.0, clock_skew: float = 0.0, l2cap: bool = True, scan_priority: bool = False, seed: int = 0):
+        """
+        The shared radio medium. Holds the simulated clock and the event queue every radio sends through.
+
+        :param link_latency: Seconds between a write or notification being sent and its IRQ firing on the other end
+        :type link_latency: float
+        :param connect_delay: Seconds between gap_connect() and the connection being made
+        :type connect_delay: float
+        :param conn_interval: Seconds between connection events, for every connection not given its own interval by gap_connect() or hci_cmd(). If 0,
+            every connection can carry any amount of data at once.
+        :type conn_interval: float
+        :param packets_per_event: Link layer packets each side of a connection can send in one connection event
+        :type packets_per_event: int
+        :param ll_payload: Bytes in one link layer packet; 27 without data length extension, up to 251 with it
+        :type ll_payload: int
+        :param loss: Chance of each link layer packet being lost. Lost packets are resent in the next slot, as the link layer does, so loss shows up as delay.
+        :type loss: float
+        :param max_connections: Most connections one radio's controller can hold. gap_connect() fails past it. None for no limit.
+        :type max_connections: int
+        :param motion_time: Function taking ("turn", degrees), ("straight", centimeters) or ("arc", (dx, dy, max_effort)) and returning how many
+            seconds the move blocks for. If None, moves finish instantly.
+        :type motion_time: callable
+        :param rssi: Function taking a scanning radio and an advertising radio and returning the RSSI the scanner hears the advertiser at, or None if it is
+            out of range. If None, every radio hears every other at -60 dBm.
+        :type rssi: callable
+        :param supervision_timeout: Seconds a radio that is switched off with active(False) stays connected, as far as the other end of each of its
+            connections knows, before the other end sees the connection drop
+        :type supervision_timeout: float
+        :param clock_skew: Standard deviation, in parts per million, of how fast each radio's ticks clock runs compared to the simulated clock. If not
+            0, each radio's ticks clock also starts at a random time.
+        :type clock_skew: float
+        :param l2cap: Whether radios support L2CAP connection oriented channels. Each radio's l2cap attribute can also be changed on its own.
+        :type l2cap: bool
+        :param scan_priority: Whether scanning takes the radio from connections. A connection event inside a scan window of either end is then
+            missed, and its packets wait for a later event, unless the event before it was missed too, as controllers take turns between the two.
+        :type scan_priority: bool
+        :param seed: Seed for everything random in the simulation, such as when each connection's events fall
+        :type seed: int
+        """
+        self.link_latency = link_latency
+        self.connect_delay = connect_delay
+        self.conn_interval = conn_interval
+        self.packets_per_event = packets_per_event
+        self.ll_payload = ll_payload
+        self.loss = loss
+        self.max_connections = max_connections
+        self.motion_time = motion_time
+        self.rssi = rssi
+        self.supervision_timeout = supervision_timeout
+        self.clock_skew = clock_skew
+        self.l2cap = l2cap
+        self.scan_priority = scan_priority
+        self.random = random.Random(seed)
+
+        self.now = 0.0
+        self._events = []
+        self._seq = 0
+
+        self.radios = []
+        self._by_addr = {}
+        #The radio whose IRQ handler or main loop is running, so the fake drivetrain knows which robot it is moving, and which of the two it is
+        self.current = None
+        self.in_irq = False
+
+        #Totals of everything sent over the air, apart from clock sync, which is totalled in sync_writes and sync_notifies
+        self.writes = 0
+        self.notifies = 0
+        self.sync_writes = 0
+        self.sync_notifies = 0
+        #Exceptions raised by IRQ handlers. MicroPython prints these and keeps going, so the simulation does too.
+        self.errors = []
+
+    def schedule(self, delay: float, callback, *args):
+        """
+        Runs callback(*args) once the simulated clock has advanced by delay seconds.
+        """
+        self.schedule_at(self.now + delay, callback, *args)
+
+    def schedule_at(self, when: float, callback, *args):
+        """
+        Runs callback(*args) when the simulated clock reaches when.
+        """
+        self._seq += 1
+        heapq.heappush(self._events, (max(when, self.now), self._seq, callback, args))
+
+    def run(self, until: float = None) -> None:
+        """
+        Processes events in time order until the queue is empty, or until the clock would pass until.
+        """
+        while self._events:
+            if until is not None and self._events[0][0] > until:
+                self.now = until
+                return
+            when, _, callback, args = heapq.heappop(self._events)
+            self.now = when
+            callback(*args)
+
+    def dispatch(self, radio, event: int, data) -> None:
+        """
+        Calls the IRQ handler of radio, catching anything it raises. If an earlier handler on the radio is still blocked in a move, the event waits
+        for it, as it would on the robot.
+        """
+        if radio._irq is None or not radio._active:
+            return
+        if radio.irq_busy_until > self.now:
+            self.schedule_at(radio.irq_busy_until, self.dispatch, radio, event, data)
+            return
+        self._call(radio, True, radio._irq, event, data)
+        radio.irq_busy_until = radio.clock
+        self._wake(radio)
+
+    def _call(self, radio, in_irq, callback, *args):
+        previous = (self.current, self.in_irq, radio.clock)
+        self.current = radio
+        self.in_irq = in_irq
+        if previous[0] is not radio:
+            radio.clock = self.now
+        try:
+            return callback(*args)
+        except Exception as e:
+            self.errors.append((self.now, radio, args[0] if in_irq else callback, e))
+        finally:
+            self.current, self.in_irq = previous[0], previous[1]
+
+    def run_main(self, radio, step) -> None:
+        """
+        Gives radio a main program. step() is called whenever the main program is free and something may have changed, and is called again straight
+        after it returns True, standing in for a "while True" loop in the robot's main program.
+        """
+        radio.main = step
+        self._wake(radio)
+
+    def _wake(self, radio) -> None:
+        if radio.main is not None and not radio.main_scheduled:
+            radio.main_scheduled = True
+            self.schedule_at(radio.main_busy_until, self._run_main, radio)
+
+    def _run_main(self, radio) -> None:
+        radio.main_scheduled = False
+        if not radio._active:
+            return
+        busy = self._call(radio, False, radio.main)
+        radio.main_busy_until = radio.clock
+        if busy:
+            self._wake(radio)
+
+    def radio_for(self, addr):
+        return self._by_addr.get(bytes(addr))
+
+    def link(self, central, peripheral, interval: float = None) -> None:
+        """
+        Connects two radios immediately, firing the connect IRQ on both sides.
+
+        :param central: The radio acting as the central (the parent)
+        :type central: FakeBLE
+        :param peripheral: The radio acting as the peripheral (the child)
+        :type peripheral: FakeBLE
+        :param interval: Seconds between the connection's events, defaulting to conn_interval
+        :type interval: float
+        """
+        interval = self.conn_interval if interval is None else interval
+        central_handle = central._new_handle()
+        peripheral_handle = peripheral._new_handle()
+        central.conns[central_handle] = (peripheral, peripheral_handle)
+        central._as_central.add(central_handle)
+        peripheral.conns[peripheral_handle] = (central, central_handle)
+        #Every connection has its own connection event timing
+        anchor = self.random.random() * interval
+        central.anchors[central_handle] = anchor
+        peripheral.anchors[peripheral_handle] = anchor
+        central.intervals[central_handle] = interval
+        peripheral.intervals[peripheral_handle] = interval
+        #Connecting as a peripheral stops advertising, as on a real controller
+        peripheral.adv_data = None
+        peripheral.adv_token += 1
+        self.dispatch(central, _IRQ_PERIPHERAL_CONNECT, (central_handle, peripheral.addr_type, peripheral.addr))
+        self.dispatch(peripheral, _IRQ_CENTRAL_CONNECT, (peripheral_handle, central.addr_type, central.addr))
+
+    def unlink(self, radio, conn_handle: int) -> None:
+        """
+        Drops a connection, firing the disconnect IRQ on both sides.
+        """
+        if conn_handle not in radio.conns:
+            return
+        #Channels on the connection close first, as the stack reports them
+        for side, handle in ((radio, conn_handle), (radio.conns[conn_handle][0], radio.conns[conn_handle][1])):
+            channel = side.channel
+            if channel is not None and channel.conn_handle == handle:
+                side.channel = None
+                self.dispatch(side, _IRQ_L2CAP_DISCONNECT, (handle, channel.cid, channel.psm, 0))
+        peer, peer_handle = radio.conns.pop(conn_handle)
+        peer.conns.pop(peer_handle, None)
+        for side, handle in ((radio, conn_handle), (peer, peer_handle)):
+            side.mtus.pop(handle, None)
+            side._tx.pop(handle, None)
+            side._in_flight.pop(handle, None)
+            side.anchors.pop(handle, None)
+            side.intervals.pop(handle, None)
+        for side, handle, other in ((radio, conn_handle, peer), (peer, peer_handle, radio)):
+            #The side that called gap_connect() sees a peripheral disconnect, the other side a central disconnect
+            event = _IRQ_PERIPHERAL_DISCONNECT if handle in side._as_central else _IRQ_CENTRAL_DISCONNECT
+            side._as_central.discard(handle)
+            self.dispatch(side, event, (handle, other.addr_type, other.addr))
+
+    def _advertising_event(self, advertiser, token) -> None:
+        #One advertisement from advertiser. Each scanning radio in range hears it if it happens to be inside the radio's scan window.
+        if advertiser.adv_token != token or advertiser.adv_data is None:
+            return
+        for scanner in self.radios:
+            if scanner is advertiser or not scanner.scanning or not scanner._active:
+                continue
+            if self.random.random() >= scanner.scan_duty:
+                continue
+            rssi = -60 if self.rssi is None else self.rssi(scanner, advertiser)
+            if rssi is not None:
+                self.dispatch(scanner, _IRQ_SCAN_RESULT, (advertiser.addr_type, advertiser.addr, _ADV_IND, rssi, advertiser.adv_data))
+        #Advertisements are spaced by the interval plus up to 10 ms of random delay, as the spec requires
+        self.schedule(advertiser.adv_interval + self.random.random() * 0.01, self._advertising_event, advertiser, token)
+
+    def _end_scan(self, scanner, token) -> None:
+        if scanner.scan_token == token and scanner.scanning:
+            scanner.scanning = False
+            self.dispatch(scanner, _IRQ_SCAN_DONE, (0,))
+
+    def _finish_connect(self, central, addr_type, addr) -> None:
+        central.connecting = None
+        peripheral = self.radio_for(addr)
+        full = self.max_connections is not None and max(len(central.conns), len(peripheral.conns) if peripheral else 0) >= self.max_connections
+        if peripheral is None or peripheral.adv_data is None or full:
+            self.dispatch(central, _IRQ_PERIPHERAL_DISCONNECT, (_CONN_HANDLE_FAILED, addr_type, addr))
+            return
+        self.link(central, peripheral, central.connect_interval)
+
+    def _update_connection(self, central, conn_handle, interval, latency, timeout) -> None:
+        #The new parameters of a connection taking effect, from the instant on
+        if conn_handle not in central.conns:
+            return
+        peer, peer_handle = central.conns[conn_handle]
+        for side, handle in ((central, conn_handle), (peer, peer_handle)):
+            side.intervals[handle] = interval
+            side.anchors[handle] = self.now
+            #Packets already booked keep their delivery times; the events are numbered afresh from the instant
+            side._tx.pop(handle, None)
+        for side, handle in ((central, conn_handle), (peer, peer_handle)):
+            self.dispatch(side, _IRQ_CONNECTION_UPDATE, (handle, round(interval / _INTERVAL_UNIT), latency, timeout, 0))
+
+    def _deliver_write(self, sender, conn_handle, value_handle, data) -> None:
+        if conn_handle not in sender.conns or not sender._active:
+            return
+        peer, peer_handle = sender.conns[conn_handle]
+        #The stack stores the value as soon as it arrives, even if the IRQ handler is still busy with an earlier event
+        peer.values[value_handle] = data[:peer.buffers.get(value_handle, _DEFAULT_BUFFER)]
+        peer.received.append((self.now, value_handle, peer.values[value_handle]))
+        self.dispatch(peer, _IRQ_GATTS_WRITE, (peer_handle, value_handle))
+
+    def _deliver_notify(self, sender, conn_handle, value_handle, data, indicate=False) -> None:
+        if conn_handle not in sender.conns or not sender._active:
+            return
+        peer, peer_handle = sender.conns[conn_handle]
+        self.dispatch(peer, _IRQ_GATTC_INDICATE if indicate else _IRQ_GATTC_NOTIFY, (peer_handle, value_handle, data))
+        if indicate:
+            #The stack confirms the indication by itself, in a later connection event
+            self.schedule_at(peer._send_time(peer_handle, 1), self._deliver_done, sender, conn_handle, _IRQ_GATTS_INDICATE_DONE, value_handle)
+
+    def _respond_write(self, sender, conn_handle, value_handle) -> None:
+        #The write response, sent by the stack as soon as a write with response arrives
+        if conn_handle not in sender.conns:
+            return
+        peer, peer_handle = sender.conns[conn_handle]
+        self.schedule_at(peer._send_time(peer_handle, 1), self._deliver_done, sender, conn_handle, _IRQ_GATTC_WRITE_DONE, value_handle)
+
+    def _deliver_done(self, radio, conn_handle, event, value_handle) -> None:
+        if conn_handle in radio.conns:
+            self.dispatch(radio, event, (conn_handle, value_handle, 0))
+
+    def _l2cap_request(self, radio, conn_handle, psm, mtu) -> None:
+        #An L2CAP connection request arriving. The other end takes it if it is listening on the PSM and has no channel open already, and the
+        #answer goes back in a later connection event.
+        if conn_handle not in radio.conns:
+            radio.channel = None
+            return
+        peer, peer_handle = radio.conns[conn_handle]
+        channel = radio.channel
+        accepted = peer.l2cap and peer._active and psm in peer.listening and peer.channel is None
+        if accepted:
+            peer_mtu = peer.listening[psm]
+            mps = self.ll_payload - _L2CAP_HEADER
+            theirs = _Channel(peer_handle, channel.cid, psm, peer_mtu, mtu, mps)
+            peer.channel = theirs
+            self.dispatch(peer, _IRQ_L2CAP_ACCEPT, (peer_handle, channel.cid, psm, peer_mtu, mtu))
+        if not accepted:
+            self.schedule_at(peer._send_time(peer_handle, _SIGNAL_SIZE, 0), self._l2cap_refused, radio, channel)
+            return
+        #Each side can send as many packets as fit in two of the other side's SDUs before it has to wait for credits
+        channel.credits = 2 * -(-(peer_mtu + _SDU_LENGTH) // mps)
+        theirs.credits = 2 * -(-(mtu + _SDU_LENGTH) // mps)
+        channel.peer_mtu = peer_mtu
+        channel.mps = mps
+        theirs.open = True
+        self.dispatch(peer, _IRQ_L2CAP_CONNECT, (peer_handle, theirs.cid, psm, peer_mtu, mtu))
+        self.schedule_at(peer._send_time(peer_handle, _SIGNAL_SIZE, 0), self._l2cap_connected, radio, channel)
+
+    def _l2cap_refused(self, radio, channel) -> None:
+        if radio.channel is channel:
+            radio.channel = None
+            self.dispatch(radio, _IRQ_L2CAP_DISCONNECT, (channel.conn_handle, channel.cid, channel.psm, _L2CAP_REFUSED))
+
+    def _l2cap_connected(self, radio, channel) -> None:
+        if radio.channel is channel:
+            channel.open = True
+            self.dispatch(radio, _IRQ_L2CAP_CONNECT, (channel.conn_handle, channel.cid, channel.psm, channel.mtu, channel.peer_mtu))
+            radio._l2cap_pump()
+
+    def _deliver_kframe(self, sender, channel, data, first, sdu_length) -> None:
+        #One packet of an SDU arriving on the other end of a channel
+        if sender.channel is not channel or channel.conn_handle not in sender.conns:
+            return
+        peer = sender.conns[channel.conn_handle][0]
+        theirs = peer.channel
+        if theirs is None or theirs.cid != channel.cid:
+            return
+        if first:
+            theirs.assembling = bytearray()
+            theirs.expected = sdu_length
+        theirs.assembling += data
+        theirs.held += 1
+        if len(theirs.assembling) >= theirs.expected:
+            theirs.sdus.append([bytes(theirs.assembling), 0, theirs.held])
+            theirs.held = 0
+            self.dispatch(peer, _IRQ_L2CAP_RECV, (theirs.conn_handle, theirs.cid))
+
+    def _deliver_credits(self, radio, channel, credits) -> None:
+        if radio.channel is channel:
+            channel.credits += credits
+            radio._l2cap_pump()
+
+    def _l2cap_closed(self, radio, channel) -> None:
+        #The other end of a channel hearing it was closed
+        if channel.conn_handle not in radio.conns:
+            return
+        peer = radio.conns[channel.conn_handle][0]
+        theirs = peer.channel
+        if theirs is not None and theirs.cid == channel.cid:
+            peer.channel = None
+            self.dispatch(peer, _IRQ_L2CAP_DISCONNECT, (theirs.conn_handle, theirs.cid, theirs.psm, 0))
+
+    def _deliver_mtu(self, radio, conn_handle) -> None:
+        if conn_handle not in radio.conns:
+            return
+        peer, peer_handle = radio.conns[conn_handle]
+        mtu = min(radio.preferred_mtu, peer.preferred_mtu)
+        radio.mtus[conn_handle] = mtu
+        peer.mtus[peer_handle] = mtu
+        self.dispatch(radio, _IRQ_MTU_EXCHANGED, (conn_handle, mtu))
+        self.dispatch(peer, _IRQ_MTU_EXCHANGED, (peer_handle, mtu))
+
+
+class _Channel:
+    #One end of an L2CAP connection oriented channel
+    def __init__(self, conn_handle: int, cid: int, psm: int, mtu: int, peer_mtu: int, mps: int):
+        self.conn_handle = conn_handle
+        self.cid = cid
+        self.psm = psm
+        self.mtu = mtu
+        self.peer_mtu = peer_mtu
+        self.mps = mps
+        self.open = False
+        #Packets this end may still send, SDUs queued to send as [bytes, bytes handed to the link layer], and whether l2cap_send() has said the
+        #channel is stalled
+        self.credits = 0
+        self.queue = []
+        self.stalled = False
+        #SDUs received and not yet read, as [bytes, bytes read, packets they took], and the SDU being put back together
+        self.sdus = []
+        self.assembling = bytearray()
+        self.expected = 0
+        self.held = 0
+
+
+class FakeBLE:
+    def __init__(self, air: Air = None):
+        """
+        Stand-in for bluetooth.BLE. Only implements the calls swarm.py makes.
+        """
+        self.air = air if air is not None else _air
+        self.air.radios.append(self)
+        index = len(self.air.radios)
+        self.addr_type = 0
+        self.addr = bytes((0xC0, 0, 0, 0, index >> 8, index & 0xFF))
+        self.air._by_addr[self.addr] = self
+
+        self._irq = None
+        self._active = False
+        self._next_handle = 0
+        self._next_value = 1
+        #Value handle -> bytes stored in the local GATT server, and how many bytes each one can hold
+        self.values = {}
+        self.buffers = {}
+        #Connection handle -> (peer radio, the peer's handle for the same connection)
+        self.conns = {}
+        #Connection handles this radio opened with gap_connect()
+        self._as_central = set()
+        #Negotiated MTU of each connection, and the MTU this radio asks for
+        self.mtus = {}
+        self.preferred_mtu = _DEFAULT_MTU
+        #Connection handle -> packets booked in each of its connection events, the time of one of the connection's events, and the seconds between
+        #them. connect_interval is the interval the gap_connect() in progress asked for, if any.
+        self._tx = {}
+        #Connection handle -> (local time, arrival time) of its sends not yet arrived, which later sends cannot overtake
+        self._in_flight = {}
+        self.anchors = {}
+        self.intervals = {}
+        self.connect_interval = None
+        #Writes and notifications sent, and the packets that were already queued ahead of them, in total and at worst
+        self.sends = 0
+        self.backlog_total = 0
+        self.backlog_max = 0
+        #Whether the radio supports L2CAP channels, the PSMs it listens on with the MTU for each, and its one channel, as MicroPython allows only one
+        self.l2cap = self.air.l2cap
+        self.listening = {}
+        self.channel = None
+        self._next_cid = 0x40
+
+        #What the radio is advertising, if anything, and how often. Tokens let old advertising and scanning timers notice they have been replaced.
+        self.adv_data = None
+        self.adv_interval = 0.1
+        self.adv_token = 0
+        #Whether the radio is scanning, and the fraction of the time it is actually listening. The scan's windows start every scan_interval seconds
+        #from scan_start and last scan_window seconds, until scan_ends.
+        self.scanning = False
+        self.scan_duty = 1.0
+        self.scan_start = 0.0
+        self.scan_interval = 1.0
+        self.scan_window = 0.0
+        self.scan_ends = math.inf
+        self.scan_token = 0
+        self.connecting = None
+
+        #(time, kind, amount) of every move the fake drivetrain made on behalf of this radio, and (time, value handle, bytes) of every write it received
+        self.moves = []
+        self.received = []
+        #Time of every halt() of the fake drivetrain on behalf of this radio, and whether it is halted. Moves while halted are not made.
+        self.halts = []
+        self.halted = False
+
+        #The robot's main program, if it has one, and when it and the IRQ handler are next free. A move blocks whichever of the two made it.
+        self.main = None
+        self.main_scheduled = False
+        self.main_busy_until = 0.0
+        self.irq_busy_until = 0.0
+        #The robot's own clock while its code is running. It runs ahead of the simulated clock by however long the moves made so far blocked for.
+        self.clock = 0.0
+        #The robot's ticks clock reads ticks_start seconds plus ticks_rate times the robot's clock
+        self.ticks_start = 0.0
+        self.ticks_rate = 1.0
+        if self.air.clock_skew:
+            self.ticks_start = self.air.random.uniform(0, 100)
+            self.ticks_rate = 1 + self.air.random.gauss(0, self.air.clock_skew) / 1000000
+
+    def _local_now(self) -> float:
+        return self.clock if self.air.current is self else self.air.now
+
+    def _new_handle(self) -> int:
+        handle = self._next_handle
+        self._next_handle += 1
+        return handle
+
+    def active(self, change: bool = None) -> bool:
+        if change is not None:
+            if self._active and not change:
+                self._power_off()
+            self._active = bool(change)
+        return self._active
+
+    def _power_off(self) -> None:
+        #Stands in for a robot losing power: it stops advertising and scanning at once, and the other end of each connection finds out when the
+        #supervision timeout runs out. Anything still on its way to or from the radio is lost.
+        self.adv_data = None
+        self.adv_token += 1
+        self.scanning = False
+        self.scan_token += 1
+        self.channel = None
+        for handle in list(self.conns):
+            self.air.schedule(self.air.supervision_timeout, self.air.unlink, self, handle)
+
+    def config(self, *args, **kwargs):
+        if "mtu" in kwargs:
+            self.preferred_mtu = kwargs["mtu"]
+        if args and args[0] == "mac":
+            return (self.addr_type, self.addr)
+        if args and args[0] == "mtu":
+            return self.preferred_mtu
+        return None
+
+    def _send_time(self, conn_handle: int, length: int, overhead: int = _PDU_OVERHEAD) -> float:
+        #When a write or notification of length bytes, plus overhead bytes of headers, sent now will have fully arrived, given the packets already
+        #queued on the connection
+        air = self.air
+        now = self._local_now()
+        interval = self.intervals.get(conn_handle, air.conn_interval)
+        if interval <= 0:
+            return now + air.link_latency
+        packets = -(-(length + overhead) // air.ll_payload)
+        if air.loss > 0:
+            for _ in range(packets):
+                while air.random.random() < air.loss:
+                    packets += 1
+        #Packets taken in each connection event still to come, by event number. A move in the main program can leave a notification booked for when
+        #the move ends, so events are filled in whatever order sends happen, and a later send can still use an earlier event.
+        booked = self._tx.setdefault(conn_handle, {})
+        anchor = self.anchors.get(conn_handle, 0.0)
+        #Anything sent now goes out at the next connection event, at the earliest
+        event = math.floor((now - anchor) / interval) + 1
+        #Radios whose scan windows can take the connection's events
+        scanners = ()
+        if air.scan_priority and conn_handle in self.conns:
+            scanners = [radio for radio in (self, self.conns[conn_handle][0]) if radio.scanning]
+        if len(booked) > 64:
+            for old in [e for e in booked if e < event]:
+                del booked[old]
+        #Packets already waiting to go out on the connection ahead of this send
+        backlog = 0
+        missed = False
+        while True:
+            if scanners and not missed:
+                when = anchor + event * interval
+                if any(radio._scan_window_at(when) for radio in scanners):
+                    missed = True
+                    event += 1
+                    continue
+            missed = False
+            used = booked.get(event, 0)
+            backlog += used
+            taken = min(packets, air.packets_per_event - used)
+            if taken > 0:
+                booked[event] = used + taken
+                packets -= taken
+            if packets == 0:
+                break
+            event += 1
+        self.backlog_max = max(self.backlog_max, backlog)
+        self.backlog_total += backlog
+        self.sends += 1
+        arrival = anchor + event * interval + air.link_latency
+        #Packets leave a connection in the order they were sent, also when an update has numbered its events afresh. Only a send booked ahead by a
+        #move in the main program can be overtaken, by one sent before that move ends.
+        sent = [send for send in self._in_flight.get(conn_handle, ()) if send[1] > air.now]
+        arrival = max([arrival] + [earlier for when, earlier in sent if when <= now])
+        sent.append((now, arrival))
+        self._in_flight[conn_handle] = sent
+        return arrival
+
+    def _scan_window_at(self, when: float) -> bool:
+        #Whether the scan going on now has a window open at when
+        return self.scan_start <= when < self.scan_ends and (when - self.scan_start) % self.scan_interval < self.scan_window
+
+    def _check_length(self, conn_handle: int, data) -> None:
+        if len(data) > self.mtus.get(conn_handle, _DEFAULT_MTU) - 3:
+            raise OSError(_EINVAL)
+
+    def irq(self, handler) -> None:
+        self._irq = handler
+
+    def gatts_register_services(self, services):
+        handles = []
+        for _, characteristics in services:
+            service_handles = []
+            for _ in characteristics:
+                handle = self._next_value
+                self._next_value += 1
+                self.values[handle] = b""
+                service_handles.append(handle)
+            handles.append(tuple(service_handles))
+        return tuple(handles)
+
+    def gatts_read(self, value_handle: int) -> bytes:
+        return self.values[value_handle]
+
+    def gatts_write(self, value_handle: int, data, send_update: bool = False) -> None:
+        self.values[value_handle] = bytes(data)
+
+    def gatts_set_buffer(self, value_handle: int, length: int, append: bool = False) -> None:
+        self.buffers[value_handle] = length
+
+    def gatts_notify(self, conn_handle: int, value_handle: int, data=None) -> None:
+        if conn_handle not in self.conns:
+            raise OSError(_ENOTCONN)
+        if data is None:
+            data = self.values[value_handle]
+        self._check_length(conn_handle, data)
+        self._count_notify(data)
+        self.air.schedule_at(self._send_time(conn_handle, len(data)), self.air._deliver_notify, self, conn_handle, value_handle, bytes(data))
+
+    def gatts_indicate(self, conn_handle: int, value_handle: int, data=None) -> None:
+        if conn_handle not in self.conns:
+            raise OSError(_ENOTCONN)
+        if data is None:
+            data = self.values[value_handle]
+        self._check_length(conn_handle, data)
+        self._count_notify(data)
+        self.air.schedule_at(self._send_time(conn_handle, len(data)), self.air._deliver_notify, self, conn_handle, value_handle, bytes(data), True)
+
+    def _count_notify(self, data) -> None:
+        if len(data) == _NOTIFY_SYNC_SIZE and data[0] == _NOTIFY_SYNC:
+            self.air.sync_notifies += 1
+        else:
+            self.air.notifies += 1
+
+    def gattc_write(self, conn_handle: int, value_handle: int, data, mode: int = 0) -> None:
+        if conn_handle not in self.conns:
+            raise OSError(_ENOTCONN)
+        self._check_length(conn_handle, data)
+        if len(data) == _SYNC_SIZE and data[0] == _FRAME_SYNC:
+            self.air.sync_writes += 1
+        else:
+            self.air.writes += 1
+        when = self._send_time(conn_handle, len(data))
+        self.air.schedule_at(when, self.air._deliver_write, self, conn_handle, value_handle, bytes(data))
+        if mode == 1:
+            self.air.schedule_at(when, self.air._respond_write, self, conn_handle, value_handle)
+
+    def l2cap_listen(self, psm: int, mtu: int) -> None:
+        if not self.l2cap:
+            raise OSError(_EOPNOTSUPP)
+        self.listening[psm] = mtu
+
+    def l2cap_connect(self, conn_handle: int, psm: int, mtu: int) -> None:
+        if not self.l2cap:
+            raise OSError(_EOPNOTSUPP)
+        if conn_handle not in self.conns:
+            raise OSError(_ENOTCONN)
+        if self.channel is not None:
+            raise OSError(_EALREADY)
+        self._next_cid += 1
+        self.channel = _Channel(conn_handle, self._next_cid, psm, mtu, 0, 0)
+        self.air.schedule_at(self._send_time(conn_handle, _SIGNAL_SIZE, 0), self.air._l2cap_request, self, conn_handle, psm, mtu)
+
+    def _open_channel(self, conn_handle: int, cid: int) -> "_Channel":
+        channel = self.channel
+        if channel is None or channel.conn_handle != conn_handle or channel.cid != cid or not channel.open:
+            raise OSError(_ENOTCONN)
+        return channel
+
+    def l2cap_send(self, conn_handle: int, cid: int, data) -> bool:
+        """
+        Queues an SDU, and returns False if the channel is now stalled, after which l2cap_send() must not be called again until _IRQ_L2CAP_SEND_READY.
+        """
+        channel = self._open_channel(conn_handle, cid)
+        if len(data) > channel.peer_mtu:
+            raise OSError(_EINVAL)
+        if channel.stalled:
+            raise OSError(_ENOMEM)
+        channel.queue.append([bytes(data), 0])
+        self._l2cap_pump()
+        channel.stalled = bool(channel.queue)
+        return not channel.stalled
+
+    def _l2cap_pump(self) -> None:
+        #Hands packets of queued SDUs to the link layer while there are credits for them, and says when the channel is no longer stalled
+        channel = self.channel
+        while channel.queue and channel.credits > 0:
+            sdu = channel.queue[0]
+            data, sent = sdu
+            first = sent == 0
+            size = channel.mps - _SDU_LENGTH if first else channel.mps
+            piece = data[sent:sent + size]
+            sdu[1] += len(piece)
+            channel.credits -= 1
+            when = self._send_time(channel.conn_handle, len(piece), _L2CAP_HEADER + (_SDU_LENGTH if first else 0))
+            self.air.schedule_at(when, self.air._deliver_kframe, self, channel, piece, first, len(data))
+            if sdu[1] >= len(data):
+                channel.queue.pop(0)
+        if channel.stalled and not channel.queue:
+            channel.stalled = False
+            self.air.dispatch(self, _IRQ_L2CAP_SEND_READY, (channel.conn_handle, channel.cid, 0))
+
+    def l2cap_recvinto(self, conn_handle: int, cid: int, buf) -> int:
+        """
+        Reads from the first SDU waiting into buf, or returns how many bytes are waiting in it if buf is None. Credits for an SDU go back to the other
+        end once it has been read.
+        """
+        channel = self._open_channel(conn_handle, cid)
+        if not channel.sdus:
+            return 0
+        sdu = channel.sdus[0]
+        data, read, packets = sdu
+        if buf is None:
+            return len(data) - read
+        count = min(len(buf), len(data) - read)
+        buf[:count] = data[read:read + count]
+        sdu[1] += count
+        if sdu[1] >= len(data):
+            channel.sdus.pop(0)
+            peer = self.conns[conn_handle][0]
+            self.air.schedule_at(self._send_time(conn_handle, _SIGNAL_SIZE, 0), self.air._deliver_credits, peer, peer.channel, packets)
+        return count
+
+    def l2cap_disconnect(self, conn_handle: int, cid: int) -> None:
+        channel = self._open_channel(conn_handle, cid)
+        self.channel = None
+        self.air.schedule_at(self._send_time(conn_handle, _SIGNAL_SIZE, 0), self.air._l2cap_closed, self, channel)
+        self.air.dispatch(self, _IRQ_L2CAP_DISCONNECT, (conn_handle, cid, channel.psm, 0))
+
+    def gattc_exchange_mtu(self, conn_handle: int) -> None:
+        if conn_handle not in self.conns:
+            raise OSError(_ENOTCONN)
+        self.air.schedule_at(self._send_time(conn_handle, 0), self.air._deliver_mtu, self, conn_handle)
+
+    def gap_advertise(self, interval_us, adv_data=None, resp_data=None, connectable=True) -> None:
+        self.adv_token += 1
+        if interval_us is None:
+            self.adv_data = None
+            return
+        if adv_data is not None:
+            self.adv_data = bytes(adv_data)
+        elif self.adv_data is None:
+            self.adv_data = b""
+        self.adv_interval = interval_us / 1000000
+        self.air.schedule_at(self._local_now() + self.air.random.random() * self.adv_interval, self.air._advertising_event, self, self.adv_token)
+
+    def gap_scan(self, duration_ms, interval_us: int = 1280000, window_us: int = 11250, active: bool = False) -> None:
+        self.scan_token += 1
+        if duration_ms is None:
+            if self.scanning:
+                self.scanning = False
+                self.air.dispatch(self, _IRQ_SCAN_DONE, (0,))
+            return
+        self.scanning = True
+        self.scan_duty = min(1.0, window_us / interval_us)
+        self.scan_start = self._local_now()
+        self.scan_interval = interval_us / 1000000
+        self.scan_window = window_us / 1000000
+        self.scan_ends = self.scan_start + duration_ms / 1000 if duration_ms > 0 else math.inf
+        if duration_ms > 0:
+            self.air.schedule_at(self._local_now() + duration_ms / 1000, self.air._end_scan, self, self.scan_token)
+
+    def gap_connect(self, addr_type: int, addr, scan_duration_ms: int = 2000, min_conn_interval_us: int = None, max_conn_interval_us: int = None) -> None:
+        if self.connecting is not None:
+            raise OSError(_EALREADY)
+        self.connecting = bytes(addr)
+        #The controller is taken to pick the longest interval allowed
+        self.connect_interval = None if max_conn_interval_us is None else max_conn_interval_us / 1000000
+        self.air.schedule(self.air.connect_delay, self.air._finish_connect, self, addr_type, bytes(addr))
+
+    def hci_cmd(self, ogf: int, ocf: int, request, response) -> int:
+        #Only takes LE Connection Update, from the central of the connection. The controller is taken to pick the longest interval allowed, and the
+        #new parameters take effect _UPDATE_INSTANT connection events later.
+        if ogf != _OGF_LE or ocf != _OCF_CONNECTION_UPDATE:
+            return _HCI_UNKNOWN_COMMAND
+        conn_handle = request[0] | request[1] << 8
+        if conn_handle not in self._as_central:
+            return _HCI_UNKNOWN_CONNECTION
+        interval = (request[4] | request[5] << 8) * _INTERVAL_UNIT
+        latency = request[6] | request[7] << 8
+        timeout = request[8] | request[9] << 8
+        old = self.intervals.get(conn_handle, self.air.conn_interval)
+        anchor = self.anchors.get(conn_handle, 0.0)
+        now = self._local_now()
+        instant = now if old <= 0 else anchor + (math.floor((now - anchor) / old) + _UPDATE_INSTANT) * old
+        self.air.schedule_at(instant, self.air._update_connection, self, conn_handle, interval, latency, timeout)
+        return 0
+
+    def gap_disconnect(self, conn_handle: int) -> bool:
+        if conn_handle not in self.conns:
+            return False
+        self.air.schedule(self.air.link_latency, self.air.unlink, self, conn_handle)
+        return True
+
+
+class Central:
+    def __init__(self, air: Air, mtu: int = 247):
+        """
+        Stands in for the web page. Connects to a root agent, writes command frames to it and keeps every notification it gets back.
+
+        :param mtu: The MTU to ask for once connected, as browsers do on their own
+        :type mtu: int
+        """
+        self.air = air
+        self.ble = FakeBLE(air)
+        self.ble.active(True)
+        self.ble.config(mtu=mtu)
+        self.ble.irq(self._event)
+        self.conn_handle = None
+        self.value_handle = None
+        #(time, bytes) of every notification received
+        self.notifications = []
+        #Called with the bytes of each notification as it arrives, if set
+        self.on_notify = None
+
+    def _event(self, event, data):
+        if event == _IRQ_PERIPHERAL_CONNECT:
+            self.conn_handle = data[0]
+        elif event == _IRQ_PERIPHERAL_DISCONNECT:
+            self.conn_handle = None
+        elif event == _IRQ_GATTC_NOTIFY:
+            self.notifications.append((self.air.now, bytes(data[2])))
+            if self.on_notify is not None:
+                self.on_notify(bytes(data[2]))
+
+    def connect(self, agent) -> None:
+        self.value_handle = agent._command
+        self.air.link(self.ble, agent._ble)
+        self.ble.gattc_exchange_mtu(self.conn_handle)
+
+    def payload(self) -> int:
+        return self.ble.mtus.get(self.conn_handle, _DEFAULT_MTU) - 3
+
+    def write(self, frame) -> None:
+        self.ble.gattc_write(self.conn_handle, self.value_handle, frame)
+
+
+def xrp_motion_time(kind: str, amount: float) -> float:
+    """
+    Rough time an XRP at half effort spends on a move, including the PID settling at the end. An arc goes at its own max_effort, in proportion.
+    """
+    if kind == "turn":
+        return abs(amount) / 180 + 0.3
+    if kind == "arc":
+        #The turn in place first, if any, then the outer wheel's way along the arc
+        dx, dy, effort = amount
+        turn, length, angle = _arc(dx, dy)
+        return (abs(turn) / (360 * effort) + 0.3 if turn else 0.0) + (length + abs(math.radians(angle)) * _TRACK_WIDTH / 2) / (50 * effort) + 0.2
+    return abs(amount) / 25 + 0.3
+
+
+#Wheel track of the XRP in centimeters, for working out how far each wheel goes in a turn
+_TRACK_WIDTH = 15.5
+#Bearing in degrees past which DifferentialDrive.arc_to() turns in place first, by default
+_MAX_BEARING = 15
+
+
+def _arc(dx, dy):
+    #The moves DifferentialDrive.arc_to() makes to a point: degrees turned in place first, then the length of the arc in centimeters and the
+    #degrees it turns the robot through
+    bearing = math.degrees(math.atan2(dy, dx))
+    turn = bearing - math.copysign(_MAX_BEARING, bearing) if abs(bearing) > _MAX_BEARING else 0.0
+    half = math.radians(bearing - turn)
+    chord = math.hypot(dx, dy)
+    return turn, chord * half / math.sin(half) if half else chord, 2 * math.degrees(half)
+
+
+def _progress(radio):
+    #How far the radio's robot has gone, from its moves so far: left and right wheel distance in centimeters, and yaw in degrees. A move in
+    #progress counts in proportion to how much of it has passed.
+    now = radio.clock if _air.current is radio else _air.now
+    left = right = yaw = 0.0
+    for start, kind, amount in radio.moves:
+        if start >= now:
+            break
+        duration = _air.motion_time(kind, amount) if _air.motion_time is not None else 0.0
+        share = 1.0 if duration <= 0 else min(1.0, (now - start) / duration)
+        if kind == "arc":
+            turn, length, angle = _arc(amount[0], amount[1])
+            yaw += (turn + angle) * share
+            left += (length - (turn + angle) * math.pi * _TRACK_WIDTH / 360) * share
+            right += (length + (turn + angle) * math.pi * _TRACK_WIDTH / 360) * share
+            continue
+        done = amount * share
+        if kind == "turn":
+            yaw += done
+            left -= done * math.pi * _TRACK_WIDTH / 360
+            right += done * math.pi * _TRACK_WIDTH / 360
+        else:
+            left += done
+            right += done
+    return left, right, yaw
+
+
+class _Drivetrain:
+    #Fake drivetrain that records each move, and when it started, against the radio whose code asked for it. The move blocks that code for as long
+    #as the Air's motion model says.
+    def _move(self, kind, amount):
+        radio = _air.current
+        if radio.halted:
+            return False
+        radio.moves.append((radio.clock, kind, amount))
+        if _air.motion_time is not None:
+            radio.clock += _air.motion_time(kind, amount)
+        return True
+
+    def turn(self, turn_degrees, *args, **kwargs):
+        return self._move("turn", turn_degrees)
+
+    def straight(self, distance, *args, **kwargs):
+        return self._move("straight", distance)
+
+    def arc_to(self, dx, dy, max_effort=0.5, *args, **kwargs):
+        return self._move("arc", (dx, dy, max_effort))
+
+    def stop(self):
+        pass
+
+    def halt(self):
+        #Moves already made by a main program are not cut short, since each runs to its end as soon as it starts
+        radio = _air.current
+        radio.halts.append(radio.clock)
+        radio.halted = True
+
+    def resume(self):
+        _air.current.halted = False
+
+    def get_left_encoder_position(self):
+        return _progress(_air.current)[0]
+
+    def get_right_encoder_position(self):
+        return _progress(_air.current)[1]
+
+
+class _IMU:
+    def reset(self, *args, **kwargs):
+        pass
+
+    def get_yaw(self):
+        return _progress(_air.current)[2] if _air.current is not None else 0
+
+
+class _ADC:
+    def read_u16(self):
+        #A charged battery pack, with a little noise
+        return 52000 + _air.random.randrange(-200, 200)
+
+
+class _Board:
+    def __init__(self):
+        self.on_switch = _ADC()
+
+    def is_button_pressed(self):
+        return False
+
+
+def _run_soft(radio, when, callback, arg):
+    #Runs a scheduled callback on radio at when, or once its IRQ handler is free if that is later
+    def run():
+        if not radio._active:
+            return
+        if radio.irq_busy_until > _air.now:
+            _air.schedule_at(radio.irq_busy_until, run)
+            return
+        _air._call(radio, True, callback, arg)
+        radio.irq_busy_until = radio.clock
+    _air.schedule_at(when, run)
+
+
+def _schedule(callback, arg):
+    #Scheduled callbacks run after the IRQ handler returns, and hold up the IRQ handler until they finish, like on the robot
+    radio = _air.current
+    _run_soft(radio, radio.clock, callback, arg)
+
+
+class _Timer:
+    #Software timer. Callbacks are soft, so like scheduled callbacks they take turns with the IRQ handler of the radio that started the timer.
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self._token = 0
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode=PERIODIC, period=-1, freq=-1, callback=None):
+        self.deinit()
+        radio = _air.current
+        interval = 1 / freq if freq > 0 else period / 1000
+        token = self._token
+
+        def fire(due):
+            if self._token != token:
+                return
+            if mode == _Timer.PERIODIC:
+                _run_soft(radio, due + interval, fire, due + interval)
+            callback(self)
+
+        _run_soft(radio, radio.clock + interval, fire, radio.clock + interval)
+
+    def deinit(self):
+        self._token += 1
+
+
+def _ticks(scale):
+    radio = _air.current
+    if radio is None:
+        return int(scale * _air.now)
+    return int(scale * (radio.ticks_start + radio.ticks_rate * radio.clock))
+
+
+def _sleep(seconds):
+    #A sleep is timed by the robot's own ticks clock
+    if _air.current is not None:
+        _air.current.clock += seconds / _air.current.ticks_rate
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    return module
+
+
+def install(air: Air) -> None:
+    """
+    Makes air the medium every new bluetooth.BLE() joins, puts the fake modules in sys.modules and imports swarm, so "import swarm" works afterwards.
+    """
+    global _air
+    _air = air
+    if getattr(sys.modules.get("bluetooth"), "FakeBLE", None) is FakeBLE:
+        return
+    builtins.const = lambda value: value
+    sys.modules["bluetooth"] = _module("bluetooth", BLE=FakeBLE, FakeBLE=FakeBLE, UUID=UUID)
+    sys.modules["micropython"] = _module("micropython", const=builtins.const, schedule=_schedule)
+    sys.modules["machine"] = _module("machine", Timer=_Timer)
+    sys.modules["XRPLib.defaults"] = _module("XRPLib.defaults", drivetrain=_Drivetrain(), imu=_IMU(), board=_Board())
+    #swarm.py uses the MicroPython time functions, which have to follow the simulated clock rather than the computer's, and random, which has to
+    #follow the seed
+    import swarm
+    swarm.time = _module("time", ticks_ms=lambda: _ticks(1000), ticks_us=lambda: _ticks(1000000), ticks_diff=lambda a, b: a - b,
+                         ticks_add=lambda a, b: a + b, sleep_ms=lambda ms: _sleep(ms / 1000), sleep_us=lambda us: _sleep(us / 1000000))
+    swarm.random = _module("random", getrandbits=lambda bits: _air.random.getrandbits(bits))
@@ -0,0 +1,259 @@
+#Runs a whole swarm of unmodified SwarmAgents in simulated time: the XRPs are scattered over a field, build their tree by scanning and connecting as
+#they would on the floor, and then the central sends sequenced commands to random XRPs. Reports how long commands take to arrive and be acknowledged
+#at each depth of the tree, how much radio traffic each command costs, and how many packets relays have waiting to go out.
+#Usage: python -m sim.swarmsim [--agents 200] [--rate 20] [--duration 60] [--loss 0.05] [--seed 1]
+import argparse
+import contextlib
+import io
+import math
+import random
+import time
+
+from sim.radio import Air, Central, install, xrp_motion_time
+
+FIELD = 20.0
+FORM_LIMIT = 120.0
+
+
+def path_loss(scanner, advertiser):
+    #Log distance path loss with 3 dB of shadowing; advertisers weaker than -95 dBm are not heard at all
+    distance = max(0.5, math.dist(scanner.pos, advertiser.pos))
+    rssi = -45 - 25 * math.log10(distance) + scanner.air.random.gauss(0, 3)
+    return round(rssi) if rssi > -95 else None
+
+
+def depths(agents):
+    """
+    Works out each agent's depth in the tree from the connections in the simulation, roots being the agents connected to a central. Agents not
+    connected to a root, through their parent or through a subtree cut off from it, get None.
+    """
+    by_radio = {agent._ble: agent for agent in agents}
+    depth = {}
+    parent = {}
+    for agent in agents:
+        for handle, (peer, _) in agent._ble.conns.items():
+            if handle not in agent._ble._as_central:
+                if peer in by_radio:
+                    parent[agent] = by_radio[peer]
+                else:
+                    depth[agent] = 0
+
+    def depth_of(agent):
+        if agent not in depth:
+            #Marked first, so a loop of agents that are each other's parents comes out as not connected instead of recursing forever
+            depth[agent] = None
+            above = depth_of(parent[agent]) if agent in parent else None
+            depth[agent] = None if above is None else above + 1
+        return depth[agent]
+
+    return {agent: depth_of(agent) for agent in agents}, parent
+
+
+def tree_stats(agents):
+    """
+    Returns how many agents are in the tree, their average and largest depth, and how many links are longer than 12 m.
+    """
+    depth, parent = depths(agents)
+    attached = [d for d in depth.values() if d is not None]
+    weak = sum(1 for agent in parent if math.dist(agent._ble.pos, parent[agent]._ble.pos) > 12)
+    return len(attached), sum(attached) / len(attached), max(attached), weak
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Swarm:
+    def __init__(self, count: int, seed: int = 0, loss: float = 0.0, conn_interval: float = 0.03, agent_class=None, field: float = FIELD, roots: int = 1,
+                 **air_options):
+        """
+        Scatters count agents over a square field, with the roots, agents 0 to roots-1, in the middle next to their centrals. Every fourth agent
+        other than the roots cannot take children. Nothing happens until form() is called.
+
+        :param count: Number of agents, at most 256 since numbers are one byte
+        :type count: int
+        :param loss: Chance of each link layer packet being lost and resent
+        :type loss: float
+        :param agent_class: SwarmAgent or a subclass of it, for comparing changes to the agent. Defaults to swarm.SwarmAgent.
+        :param roots: Number of root agents, each with its own central. The first central is also central.
+        :type roots: int
+        :param air_options: Passed on to Air, for example motion_time or max_connections
+        """
+        self.air = Air(conn_interval=conn_interval, connect_delay=0.05, loss=loss, rssi=path_loss, seed=seed, **air_options)
+        install(self.air)
+        import swarm
+        self.swarm = swarm
+        agent_class = agent_class or swarm.SwarmAgent
+        place = random.Random(seed)
+        self.agents = []
+        #Real seconds spent running the simulation
+        self.wall = 0.0
+        with contextlib.redirect_stdout(io.StringIO()):
+            #Roots other than the first stand in a ring 1 m from the middle
+            spots = [(field / 2 + (math.cos(2 * math.pi * r / roots) if r else 0), field / 2 + (math.sin(2 * math.pi * r / roots) if r else 0))
+                     for r in range(roots)]
+            self.centrals = []
+            for spot in spots:
+                central = Central(self.air)
+                central.ble.pos = spot
+                self.centrals.append(central)
+            self.central = self.centrals[0]
+            for number in range(count):
+                agent = agent_class(number, number % 4 != 0 or number < roots)
+                agent._ble.pos = spots[number] if number < roots else (place.random() * field, place.random() * field)
+                self.air.run_main(agent._ble, agent.process_motion)
+                self.agents.append(agent)
+
+    def run(self, until: float) -> None:
+        #Agents print as they go, which would only slow the simulation down
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.air.run(until=until)
+        self.wall += time.perf_counter() - started
+
+    def form(self, limit: float = FORM_LIMIT) -> float:
+        """
+        Connects each central to its root and runs until every agent has a parent, or limit seconds have passed. Returns the time taken.
+        """
+        with contextlib.redirect_stdout(io.StringIO()):
+            for central, root in zip(self.centrals, self.agents):
+                central.connect(root)
+        while self.air.now < limit and any(agent.parent_handle is None for agent in self.agents):
+            self.run(self.air.now + 1.0)
+        formed = self.air.now
+        #Lets the last join notifications reach the root
+        self.run(self.air.now + 1.0)
+        return formed
+
+    def workload(self, rate: float, duration: float, command=(0, 0, 0, 20)):
+        """
+        Sends sequenced commands to random agents in the tree, at random times averaging rate per second, for duration seconds, then runs until
+        they have all been acknowledged or have had 30 seconds to be.
+
+        :param command: Direction, degrees, meters and centimeters of every command
+        :return: A Workload holding what happened to each command
+        """
+        depth, _ = depths(self.agents)
+        targets = [agent for agent in self.agents if depth[agent] is not None]
+        pick = random.Random(len(self.agents))
+        load = Workload(self, depth, duration)
+        when = self.air.now
+        end = when + duration
+        while True:
+            when += pick.expovariate(rate)
+            if when >= end:
+                break
+            self.air.schedule_at(when, load.send, pick.choice(targets).number, command)
+        self.central.on_notify = load.acked
+        self.run(end + 30.0)
+        load.collect()
+        return load
+
+
+class Workload:
+    #What happened to the commands of one Swarm.workload() run
+    def __init__(self, sim: Swarm, depth, duration: float):
+        self.sim = sim
+        self.duration = duration
+        self.depth = {agent.number: d for agent, d in depth.items()}
+        self.agent = {agent.number: agent for agent in sim.agents}
+        self.next_seq = {}
+        #(number, seq) -> list of send times, oldest first, in case a sequence number is reused
+        self.sent = {}
+        #(depth, latency) of every command delivered, and of every acknowledgement
+        self.delivered = []
+        self.acks = []
+        #(number, send time) of every command that never arrived
+        self.undelivered = []
+        self.count = 0
+        air = sim.air
+        self.writes = air.writes
+        self.notifies = air.notifies
+        self.received = {agent.number: len(agent._ble.received) for agent in sim.agents}
+        #Only packets waiting behind the workload's own traffic count, not the join notifications from building the tree
+        for agent in sim.agents:
+            agent._ble.sends = agent._ble.backlog_total = agent._ble.backlog_max = 0
+
+    def send(self, number, command):
+        seq = self.next_seq.get(number, 0)
+        self.next_seq[number] = (seq + 1) & 0xFF
+        self.sent.setdefault((number, seq), []).append(self.sim.air.now)
+        self.count += 1
+        self.sim.central.write(self.sim.swarm.sequenced_frame((number,) + tuple(command), seq))
+
+    def acked(self, data):
+        for number, seq in self.sim.swarm.completions(data):
+            times = self.sent.get((number, seq))
+            if times:
+                self.acks.append((self.depth[number], self.sim.air.now - times[0]))
+
+    def collect(self):
+        air = self.sim.air
+        self.writes = air.writes - self.writes
+        self.notifies = air.notifies - self.notifies
+        for number, agent in self.agent.items():
+            #The ack for a command has to come in before the next command with the same sequence number, so the oldest send is the one delivered
+            pending = {key: list(times) for key, times in self.sent.items() if key[0] == number}
+            for when, _, data in agent._ble.received[self.received[number]:]:
+                if len(data) == 8 and data[0] == self.sim.swarm._FRAME_SEQUENCED and data[3] == number:
+                    times = pending.get((number, data[1]))
+                    if times:
+                        self.delivered.append((self.depth[number], when - times.pop(0)))
+            for times in pending.values():
+                self.undelivered.extend((number, when) for when in times)
+
+
+def by_depth(samples):
+    grouped = {}
+    for depth, value in samples:
+        grouped.setdefault(depth, []).append(value)
+    return grouped
+
+
+def report(sim: Swarm, load: Workload, formed: float) -> None:
+    attached, average, deepest, _ = tree_stats(sim.agents)
+    print("%d agents, %d in the tree after %.1f s, average depth %.2f, max depth %d" % (len(sim.agents), attached, formed, average, deepest))
+    print("%d commands over %.0f s: %d delivered, %d acknowledged, %.2f writes and %.2f notifies per command" % (
+        load.count, load.duration, len(load.delivered), len(load.acks), load.writes / load.count, load.notifies / load.count))
+    print("simulated %.0f s in %.1f s of real time, %.0fx faster than real time" % (
+        sim.air.now, sim.wall, sim.air.now / sim.wall))
+    print()
+    delivered = by_depth(load.delivered)
+    acks = by_depth(load.acks)
+    depth, _ = depths(sim.agents)
+    backlog = by_depth((d, agent._ble) for agent, d in depth.items() if d is not None and agent.connected_children)
+    print("depth  agents  delivery p50/p90/p99 (ms)  ack p50/p90/p99 (ms)  relays  mean/max packets waiting")
+    for d in sorted(set(v for v in depth.values() if v is not None)):
+        row = "%5d  %6d" % (d, sum(1 for v in depth.values() if v == d))
+        for samples in (delivered.get(d), acks.get(d)):
+            if samples:
+                row += "  %6.0f %6.0f %6.0f     " % tuple(1000 * percentile(samples, f) for f in (0.5, 0.9, 0.99))
+            else:
+                row += "  %6s %6s %6s     " % ("-", "-", "-")
+        radios = backlog.get(d, [])
+        sends = sum(radio.sends for radio in radios)
+        if sends:
+            row += "  %6d  %8.2f %8d" % (len(radios), sum(radio.backlog_total for radio in radios) / sends, max(radio.backlog_max for radio in radios))
+        print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulates a swarm of XRPs building a tree and following commands from the central.")
+    parser.add_argument("--agents", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=20.0, help="commands per second from the central")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of commands")
+    parser.add_argument("--loss", type=float, default=0.0, help="chance of each link layer packet being lost")
+    parser.add_argument("--interval", type=float, default=0.03, help="connection interval in seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    sim = Swarm(args.agents, seed=args.seed, loss=args.loss, conn_interval=args.interval, motion_time=xrp_motion_time)
+    formed = sim.form()
+    load = sim.workload(args.rate, args.duration)
+    assert not sim.air.errors, sim.air.errors[:5]
+    report(sim, load, formed)
+
+
+if __name__ == "__main__":
+    main()
@@ -32,7 +32,9 @@ import micropython
 import machine
 from XRPLib.defaults import *
 import math
+import random
 import struct
+import time
 
 #region IRQ events
 #These are the different events that can occur when using bluetooth. When one is triggered, the event function runs with the specific event type, along with event specific data.
@@ -75,6 +77,7 @@ _FLAG_READ = const(0x0002)
 _FLAG_WRITE_NO_RESPONSE = const(0x0004)
 _FLAG_WRITE = const(0x0008)
 _FLAG_NOTIFY = const(0x0010)
+_FLAG_INDICATE = const(0x0020)
 #endregion
 
 #region Advertisement stuff
@@ -93,6 +96,7 @@ _ADV_TYPE_UUID16_MORE = const(0x2)
 _ADV_TYPE_UUID32_MORE = const(0x4)
 _ADV_TYPE_UUID128_MORE = const(0x6)
 _ADV_TYPE_APPEARANCE = const(0x19)
+_ADV_TYPE_MANUFACTURER = const(0xFF)
 
 _ADV_MAX_PAYLOAD = const(31)
 #endregion
@@ -103,11 +107,13 @@ _ADV_MAX_PAYLOAD = const(31)
 
 #The UUID is the unique bluetooth identifier of the program.
 _UUID = bluetooth.UUID("51ff9301-d04e-4a0d-91c9-975fca9cdf95")
+#The UUID as it appears in advertising payloads
+_UUID_BYTES = bytes(_UUID)
 #_COMMAND is the bluetooth characteristic used to transfer data. It is a 2 element tuple containing the characteristic's unique ID and a set of flags that show the behaviors
 #the command uses, combined by a bitwise or. _COMMAND transfers the following data in the following order:
 _COMMAND = (
     bluetooth.UUID("ed59696a-b609-4cea-a09a-5885cce3c5ca"),
-    _FLAG_WRITE | _FLAG_WRITE_NO_RESPONSE
+    _FLAG_WRITE | _FLAG_WRITE_NO_RESPONSE | _FLAG_NOTIFY | _FLAG_INDICATE
 )
 #The service is the sole service this program uses. It is a tuple of it's UUID and the sole characteristic, _COMMAND. By writing to this service from the site, a 5 element
 #byte array is transmitted to the XRP. The elements are as follows:
@@ -116,16 +122,332 @@ _COMMAND = (
 #2:Degrees the XRP turns. Technically, the limit is 255 degrees, but the site will only send up to 180 degrees.
 #3:Meters the XRP travels, to a maximum of 255, as any amount after that may violate the geneva convention
 #4:Centimeters the XRP travels, to a maximum of 255, but practically capped at 99 due to conversion to meters.
+#Frames that are not exactly 5 bytes long start with one of the following types instead:
+#_FRAME_BATCH: The remaining bytes are any number of 5 byte commands, one after another, for different XRPs. Each XRP follows the ones with its own
+#number and passes the rest on, split up by which child leads to them, so commanding many XRPs only takes as many writes as fit in the negotiated MTU.
+#_FRAME_SEQUENCED: 8 bytes. Byte 1 is a sequence number the central picks for each command it sends to an XRP, byte 2 holds option bits, and bytes 3-7
+#are a normal 5 byte command. The XRP acknowledges it with a _NOTIFY_DONE carrying the same sequence number, so the central can keep several commands
+#in flight per XRP and match up the acknowledgements. A sequence number matching one of the last _SEQ_WINDOW the XRP accepted is a duplicate: it is
+#not followed again, and the XRP notifies a _NOTIFY_DONE or _NOTIFY_DROPPED for it again if the command has ended, so a sender waiting on it carries on.
+#With _SEQ_LATEST_WINS set, every command still waiting in the XRP's queue is dropped, and the new command is followed as soon as the current move ends.
+#_SEQ_RESTART, in sequenced, arc and mission frames, tells the XRP the sender has started numbering again, after a page reload or a new central
+#session, so none of the numbers it accepted before count as duplicates. Senders set it on every command until the first acknowledgement comes back.
+_FRAME_BATCH = const(0x01)
+_FRAME_SEQUENCED = const(0x02)
+_SEQUENCED_SIZE = const(8)
+_SEQ_LATEST_WINS = const(0x01)
+_SEQ_RESTART = const(0x04)
+_SEQ_WINDOW = const(16)
+#How each sequence number the XRP has accepted ended, for acknowledging duplicates
+_OUTCOME_WAITING = const(0)
+_OUTCOME_DONE = const(1)
+_OUTCOME_DROPPED = const(2)
+#_FRAME_DEPTH: 3 bytes. Sent by a parent to each new child, and passed down whenever it changes; byte 1 is the child's depth in the tree. The XRP connected
+#to the central device counts as depth 0. An XRP that has lost its parent sends _DEPTH_DETACHED instead, see the Tree building region. Byte 2 is how
+#many more XRPs the tree holds than the smallest tree under the same central, which only a central with several roots sends, to its roots with a
+#depth of 0. A 2 byte frame has no byte 2, which counts as 0.
+_FRAME_DEPTH = const(0x03)
+#_FRAME_GROUP: 8 bytes, a command for every XRP in a group. Byte 1 says how the group is given: with _GROUP_ID, byte 2 is a group number the XRPs have
+#joined; with _GROUP_MASK, the frame is for every XRP whose number ANDed with byte 2 equals byte 3, so a mask of 0 and a value of 0 means every XRP.
+#Bytes 4-7 are the direction, degrees, meters and centimeters of a normal command. Each XRP follows it if it is in the group, and passes it on only to
+#the children with members of the group below them, so one write moves a whole squad. Completions are 1 byte notifications, as for 5 byte commands.
+_FRAME_GROUP = const(0x04)
+_GROUP_SIZE = const(8)
+_GROUP_ID = const(0)
+_GROUP_MASK = const(1)
+#_FRAME_MEMBERSHIP: 4 bytes; byte 1 is the number of an XRP, byte 2 a group number, and byte 3 is 1 for the XRP to join the group or 0 to leave it.
+_FRAME_MEMBERSHIP = const(0x05)
+_MEMBERSHIP_SIZE = const(4)
+#_FRAME_SYNC: 13 bytes, a parent's half of a clock sync round trip. See the Clock sync region.
+_FRAME_SYNC = const(0x06)
+_SYNC_SIZE = const(13)
+#_FRAME_AT: 12 bytes, a group frame for a move every XRP in the group starts at the same time. Bytes 1-7 are as in a group frame, and bytes 8-11 are
+#the swarm time to start at, in microseconds, little endian. With _AT_RELATIVE set in byte 1, bytes 8-11 are instead how many microseconds after
+#the root gets the frame to start, and the root swaps them for the swarm time before passing the frame on, so the central does not need to know
+#the swarm clock.
+_FRAME_AT = const(0x07)
+_AT_SIZE = const(12)
+_AT_RELATIVE = const(0x80)
+#_FRAME_BULK: A piece of a bulk payload from the parent, written with a response when there is no L2CAP channel for it. See the Bulk transfers region.
+_FRAME_BULK = const(0x08)
+#_FRAME_MISSION: Part of a mission, see the Missions region. Byte 1 is a sequence number, as for a sequenced frame, byte 2 holds option bits, byte 3 is
+#the XRP's number, byte 4 how many steps go between progress notifications (0 for none), byte 5 the index of the first step in the frame and byte 6
+#how many steps the whole mission has. The remaining bytes are steps of 4 bytes each, the direction, degrees, meters and centimeters of a normal
+#command. With _MISSION_ABORT set, the frame has no steps and aborts the mission with its sequence number.
+_FRAME_MISSION = const(0x09)
+#_FRAME_STOP: 3 bytes, an emergency stop. Byte 1 is the number of the XRP to stop and byte 2 holds option bits; with _STOP_ALL set every XRP stops and
+#byte 1 is ignored. It is checked for before any other frame, and each XRP passes it on to its children before doing anything else with it. The XRP
+#cuts short the move it is making at the drivetrain's next control tick, throws away every command waiting in its queue and its mission, and
+#notifies a _NOTIFY_STOPPED instead of a completion or _NOTIFY_DROPPED for each of them. It stays stopped until it takes a command sent after the stop.
+_FRAME_STOP = const(0x0A)
+_STOP_SIZE = const(3)
+_STOP_ALL = const(0x01)
+#_FRAME_ARC: 8 or 9 bytes, a sequenced frame for a move to a point in one curve rather than a turn then a straight. Bytes 1-3 are as in a sequenced
+#frame, and bytes 4-5 and 6-7 are how far ahead of the XRP and to its left the point is, in centimeters, as signed 16 bit little endian numbers.
+#Byte 8, if there, is the max_effort in hundredths, from _ARC_MIN_EFFORT to 100, with 0 for arc_to()'s default of 0.5. arc_to() needs more effort
+#than the drivetrain's ks of 0.1 for the wheels to turn, so an XRP drops an arc frame with any other effort. The XRP drives there with
+#drivetrain.arc_to(), and acknowledges it as it would a sequenced frame. At the same effort an arc is a little quicker than a turn then a straight,
+#since it saves the stop between the two, and ends closer to the point.
+_FRAME_ARC = const(0x0B)
+_ARC_SIZE = const(9)
+_ARC_MIN_EFFORT = const(11)
 _SERVICE = (
     _UUID,
     (_COMMAND,)
 )
+
+#Notifications travel up the tree to the central device on the same characteristic. A 1 byte notification is the number of an XRP that has finished
+#its command. Longer notifications start with one of the following types:
+#_NOTIFY_JOIN: The remaining bytes are the numbers of XRPs that can now be reached through the XRP that sent it. Each XRP sends one for itself and its
+#whole subtree when it connects to a parent, and passes on the ones from its children, so every XRP learns which child leads to which number.
+#_NOTIFY_DROPPED: The second byte is the number of an XRP that threw away a command, because its motion queue was full or a latest wins command replaced
+#it. For sequenced commands the third byte is the command's sequence number.
+#_NOTIFY_DONE: 3 bytes; the number of an XRP and the sequence number of the command it has finished.
+_NOTIFY_JOIN = const(0x01)
+_NOTIFY_DROPPED = const(0x02)
+_NOTIFY_DONE = const(0x03)
+#_NOTIFY_GROUPS: Byte 1 holds option bits and the remaining bytes are every group with members in the sending XRP's subtree, replacing the last list it
+#sent. Each XRP sends one when that changes, merging in its children's lists, so every XRP knows which children lead to which groups. With
+#_GROUPS_ALL set the list did not fit in one packet, and the parent passes on every group frame to that child.
+_NOTIFY_GROUPS = const(0x04)
+_GROUPS_ALL = const(0x01)
+#Relays hold on to completions for the ack window after the first one arrives, and then send them all on together, so a squad finishing at once costs
+#the links near the root one notification instead of one per XRP. A lone completion is still sent as a 1 byte or _NOTIFY_DONE notification. The
+#waiting completions are sent before any _NOTIFY_DROPPED or _NOTIFY_STOPPED, so the central hears of an XRP's commands ending in order.
+#_NOTIFY_COMPLETED: The remaining bytes are the numbers of XRPs that finished a command sent without a sequence number.
+#_NOTIFY_COMPLETED_MAP: The same, as a bitmap; byte 1 is the number of the XRP given by the lowest bit of byte 2, and bit b of byte 2+i is XRP
+#byte 1+8*i+b. Used instead of _NOTIFY_COMPLETED when shorter.
+#_NOTIFY_DONE_LIST: The remaining bytes are pairs of an XRP's number and the sequence number of the command it finished.
+_NOTIFY_COMPLETED = const(0x05)
+_NOTIFY_COMPLETED_MAP = const(0x06)
+_NOTIFY_DONE_LIST = const(0x07)
+#_NOTIFY_TELEMETRY: The remaining bytes are telemetry records from one or more XRPs, see the Telemetry region.
+_NOTIFY_TELEMETRY = const(0x08)
+#_NOTIFY_SYNC: 5 bytes, an XRP's half of a clock sync round trip, sent to its parent and not passed on. See the Clock sync region.
+_NOTIFY_SYNC = const(0x09)
+_NOTIFY_SYNC_SIZE = const(5)
+#_NOTIFY_BULK: A piece of a bulk payload from a child, sent as an indication when there is no L2CAP channel for it. See the Bulk transfers region.
+_NOTIFY_BULK = const(0x0A)
+#_NOTIFY_PROGRESS: 4 bytes; the number of an XRP following a mission, the mission's sequence number, and how many of its steps it has finished.
+_NOTIFY_PROGRESS = const(0x0B)
+#_NOTIFY_STOPPED: 2 bytes; the number of an XRP that has stopped for a _FRAME_STOP. Every command sent to it before the stop is either finished or gone.
+_NOTIFY_STOPPED = const(0x0C)
+#Default ack window in milliseconds. 0 sends every completion on as soon as it arrives.
+_ACK_WINDOW_MS = const(20)
+#Most completions of each kind held at once. The window is cut short if more arrive.
+_MAX_DONE = const(128)
+
+#Size of one command in a frame
+_COMMAND_SIZE = const(5)
+#Most commands in one batch frame at the largest MTU
+_MAX_BATCH = const(48)
+#Size of a slot in the motion queue: a command, its sequence number, option bits, and the swarm time to start at. _SLOT_SEQ is set in the option
+#bits if the command had a sequence number, _SLOT_AT if it has a start time, and _SLOT_MISSION if the slot stands for the mission. With _SLOT_ARC set,
+#bytes 1-4 are the point of an arc frame instead of a move, and byte 7 its effort. The IRQ handler sets _SLOT_DROPPED on a slot it has thrown away.
+_SLOT_SIZE = const(11)
+_SLOT_SEQ = const(0x01)
+_SLOT_AT = const(0x02)
+_SLOT_MISSION = const(0x04)
+_SLOT_ARC = const(0x08)
+_SLOT_DROPPED = const(0x10)
+
+#The MTU every connection starts with, and the one the XRP asks for. 247 fills one link layer packet when data length extension is supported.
+_DEFAULT_MTU = const(23)
+_MAX_MTU = const(247)
+#Largest write or notification that fits in a default sized packet
+_DEFAULT_PAYLOAD = const(20)
+#endregion
+
+#region Tree building
+#Instead of connecting to the first XRP it hears advertising, a scanning XRP waits a while after first hearing it, and only connects if it is still
+#advertising by then. The wait grows with the XRP's depth, its number of children and how weak the signal is, so the XRP that keeps the tree shallowest,
+#most balanced, and with the strongest links usually gets there first. Advertisers put the number of children they can still take, and the size of
+#the subtree they bring, in the manufacturer data of their advertisement. A parent with only _RESERVED_SLOTS free slots left also waits longer for
+#advertisers that cannot take children, saving those slots for XRPs that can. With several roots under one central, XRPs in a tree holding more
+#XRPs than the smallest also wait _TREE_WAIT_MS for every XRP more, so new XRPs mostly join the smallest tree and the trees stay shallow.
+_MAX_CHILDREN = const(6)
+_DEPTH_WAIT_MS = const(400)
+_LOAD_WAIT_MS = const(60)
+_RSSI_WAIT_MS = const(20)
+_RESERVE_WAIT_MS = const(300)
+_RESERVED_SLOTS = const(2)
+_TREE_WAIT_MS = const(50)
+#Signals stronger than _RSSI_GOOD add no wait; signals weaker than _RSSI_MIN are ignored
+_RSSI_GOOD = const(-70)
+_RSSI_MIN = const(-90)
+#Scan interval and window in microseconds
+_SCAN_INTERVAL_US = const(60000)
+_SCAN_WINDOW_US = const(30000)
+#Longest a gap_connect() looks for the advertiser, in milliseconds
+_CONNECT_SCAN_MS = const(2000)
+#With a hundred devices advertising, scan results arrive hundreds of times a second, so the XRP remembers each advertiser it has heard, by address
+#type and address, in a scan cache. Devices that are not XRPs are skipped without looking at their payload again until _SCAN_TTL_MS has passed, as
+#are XRPs that are already children. An XRP the XRP failed to connect to is skipped for _CONNECT_BACKOFF_MS, doubling with every failure in a row
+#up to _MAX_BACKOFF_SHIFT times. An XRP not heard for _SCAN_TTL_MS starts its wait again. When the cache holds _SCAN_CACHE_SIZE devices, entries for
+#devices that are not XRPs and for XRPs gone quiet are dropped, and if that frees nothing, new advertisers are left until something does.
+_SCAN_PENDING = const(0)
+_SCAN_IGNORED = const(1)
+_SCAN_CONNECTING = const(2)
+_SCAN_CONNECTED = const(3)
+_SCAN_FAILED = const(4)
+_SCAN_TTL_MS = const(5000)
+_CONNECT_BACKOFF_MS = const(500)
+_MAX_BACKOFF_SHIFT = const(4)
+_SCAN_CACHE_SIZE = const(64)
+#Advertising interval in microseconds
+_ADV_INTERVAL_US = const(500000)
+#When its parent disconnects, an XRP keeps its children and advertises again, so a relay that is still scanning takes it and its whole subtree in
+#one connection, and the subtree's numbers reach the new parent in the XRP's join notification. It starts at _REJOIN_INTERVAL_US to be found
+#quickly, and doubles the interval every _REJOIN_STEP_MS until it is back to _ADV_INTERVAL_US. Until it has a parent again it passes
+#_DEPTH_DETACHED down as its children's depth, and XRPs at that depth stop scanning, so an orphan is never taken by an XRP in its own subtree.
+_REJOIN_INTERVAL_US = const(50000)
+_REJOIN_STEP_MS = const(1000)
+_DEPTH_DETACHED = const(255)
+#endregion
+
+#region Motion queue
+#The IRQ handler never drives the XRP itself, since a move blocks for seconds and the XRP could not relay anything for its children meanwhile.
+#Commands for the XRP are copied into a fixed size queue instead, and run() follows them from the main program, where bluetooth events are still
+#handled while the motors run. When the queue is full, _OVERFLOW_DROP_NEW throws away the incoming command and _OVERFLOW_DROP_OLD throws away the
+#oldest one still waiting. Either way the parent is sent a _NOTIFY_DROPPED notification for it.
+_QUEUE_DEPTH = const(8)
+_OVERFLOW_DROP_NEW = const(0)
+_OVERFLOW_DROP_OLD = const(1)
+#endregion
+
+#region Missions
+#A mission is a list of up to _MAX_STEPS steps for one XRP, each a turn and a drive like a normal command. It is sent once, in as many
+#_FRAME_MISSION frames as it takes, and queued as one slot in the motion queue once all its steps have arrived. The main program then follows the
+#steps back to back, without waiting on the radio between them, notifying a _NOTIFY_PROGRESS after every so many steps and a _NOTIFY_DONE at the
+#end, as for a sequenced command. An abort stops the mission after the step being followed, or throws it away if it has not started, and the XRP
+#notifies a _NOTIFY_DROPPED instead. An XRP holds one mission at a time, so a new one arriving before the last has ended is dropped.
+_MAX_STEPS = const(128)
+_STEP_SIZE = const(4)
+_MISSION_HEADER = const(7)
+_MISSION_ABORT = const(0x02)
+#endregion
+
+#region Link scheduling
+#A relay's scan windows and connection events share one radio, so every scan window is time its links cannot use. Connection intervals trade the
+#other way: short ones carry more packets, and sooner, while long ones leave the radio free and use less power. With link scheduling on, an XRP counts
+#the command, completion and telemetry frames it handles, but not the clock sync, depth, join or group frames, and every _SCHEDULE_MS checks whether
+#any came through. The first frame of a burst has it ask for intervals of _FAST_MIN_US to _FAST_MAX_US on the connections to its children and stop
+#scanning straight away, since an update only takes effect some connection events later. Once none has come through for _IDLE_TICKS checks in a
+#row, it asks for _IDLE_MIN_US to _IDLE_MAX_US again and scans in windows of _SCAN_BURST_MS, one after another, until traffic starts. While busy it
+#still scans for _SCAN_BURST_MS every _BUSY_SCAN_TICKS checks, so new XRPs can join.
+#While the XRP is still forming its part of the tree, from joining until _SETTLE_MS pass without a new child or every child slot is taken, new
+#children connect at the short intervals, and it scans in one window lasting until it settles, so link scheduling never slows the tree being
+#built. Traffic cuts that window short too, and the XRP then scans for _SCAN_BURST_MS every _FORMING_SCAN_TICKS checks until it settles.
+#Only the central of a connection can ask for new parameters, so each XRP schedules the connections to its children, and its parent the one to it.
+#MicroPython has no call for it, so the XRP sends the HCI LE Connection Update command itself through BLE.hci_cmd(), on builds that have it; on
+#others, only new children connect at the interval of the moment. _IRQ_CONNECTION_UPDATE reports the interval each connection ended up with.
+_SCHEDULE_MS = const(100)
+_IDLE_TICKS = const(20)
+_BUSY_SCAN_TICKS = const(20)
+_SCAN_BURST_MS = const(300)
+_FORMING_SCAN_TICKS = const(10)
+_SETTLE_MS = const(5000)
+_FAST_MIN_US = const(7500)
+_FAST_MAX_US = const(15000)
+_IDLE_MIN_US = const(45000)
+_IDLE_MAX_US = const(60000)
+#Supervision timeout asked for, in units of 10 ms
+_SUPERVISION_TIMEOUT = const(400)
+#Opcode group and command of HCI LE Connection Update. Its parameters are the connection handle, the least and most interval in units of 1.25 ms,
+#the peripheral latency, the supervision timeout, and the least and most connection event length, each 2 bytes, little endian.
+_OGF_LE = const(0x08)
+_OCF_CONNECTION_UPDATE = const(0x0013)
+_CONNECTION_UPDATE_SIZE = const(14)
+#endregion
+
+#region Debug log
+#Allocating memory in the IRQ handler churns the heap, and the garbage collections that follow stall the motor timers, so commands are passed on
+#and queued using buffers allocated once in __init__, and the IRQ handler does not print. It keeps its last _LOG_SIZE messages in a ring buffer
+#instead, which dump_log() prints from the main program.
+_LOG_SIZE = const(32)
+#endregion
+
+#region Bulk transfers
+#Payloads too big for one frame, such as mission lists, config blobs or log dumps, go between a parent and a child with send_bulk(). They are cut
+#into pieces, each starting with a _BULK_HEADER byte header: the frame type, where the piece goes in the payload, and the payload's length, both 2
+#bytes little endian. The pieces go over an L2CAP connection oriented channel, opened on demand with l2cap_connect() to the _BULK_PSM every XRP
+#listens on, as SDUs of up to _BULK_MTU bytes. The stack gives the sender credits for as many packets as the receiver has room for, and
+#l2cap_send() returns False once they run out, so the rest waits for _IRQ_L2CAP_SEND_READY. The receiver reads each SDU as it arrives, which hands
+#the credits back, and closes the channel once it has the whole payload, which tells the sender it arrived. MicroPython only has one channel at a
+#time, so payloads for other connections wait for it to close.
+#If the stack has no L2CAP, or the other XRP refuses the channel because it has one open already, the payload goes as _FRAME_BULK writes to a
+#child or _NOTIFY_BULK indications to the parent instead. Each is sent once the last was acknowledged, so none overwrites another in the
+#characteristic before the receiver has read it.
+_BULK_PSM = const(0x0080)
+_BULK_MTU = const(512)
+_BULK_HEADER = const(5)
+_MAX_BULK = const(65535)
+#endregion
+
+#region Clock sync
+#Every XRP below the root keeps a swarm clock, which is the root's ticks_us() clock, by timing round trips to its parent. The XRP notifies its parent
+#a _NOTIFY_SYNC holding its own ticks_us() when sent, t1. The parent notes the swarm time it arrives at, t2, waits a random time of up to
+#_SYNC_SPREAD_MS, and writes back a _FRAME_SYNC holding t1, t2 and the swarm time it is sent at, t3. The XRP notes the time that arrives at, t4.
+#Both messages take at least no time to get through, so the swarm clock is between t3-t4 and t2-t1 ahead of the XRP's clock. Each message waits for
+#the next connection event, and the random wait makes the wait on the way back as random as the one on the way there. The XRP takes the narrowest
+#range its last _SYNC_SAMPLES samples all agree on, moved on for the drift between the two clocks, and uses the middle of it. If they are more than
+#_SYNC_JUMP_US from agreeing, the parent's clock has jumped and the XRP starts again from the latest sample. The drift is how far the swarm clock
+#moves against the XRP's from the first set of _SYNC_SAMPLES samples, once that was at least _DRIFT_MIN_MS ago, and is at most _MAX_DRIFT. Each
+#_DRIFT_SPAN_MS it starts again from the latest set, since ticks_diff() only works over half the 18 minutes ticks_us() takes to wrap.
+#XRPs sync every _SYNC_FAST_MS until they have _SYNC_SAMPLES samples, then every _SYNC_MS, each plus a random time of up to _SYNC_SPREAD_MS.
+#Times are 4 bytes, little endian, and wrap as ticks_us() does.
+_SYNC_SAMPLES = const(16)
+_SYNC_FAST_MS = const(100)
+_SYNC_MS = const(500)
+#63, so that random.getrandbits(6) gives the random part
+_SYNC_SPREAD_MS = const(63)
+_SYNC_JUMP_US = const(5000)
+_DRIFT_MIN_MS = const(20000)
+_DRIFT_SPAN_MS = const(240000)
+#Crystals are good to about 50 ppm, so two clocks drifting apart faster than 200 ppm means the estimate is off
+_MAX_DRIFT = 0.0002
+#How close to its start time a scheduled move stops sleeping in milliseconds and sleeps the rest in microseconds
+_START_SLACK_US = const(2000)
+#endregion
+
+#region Telemetry
+#An XRP made with p_telemetry_hz set samples its drivetrain, IMU and board that many times a second while it has a parent, and sends each sample up
+#the tree as a record in a _NOTIFY_TELEMETRY notification. Each record is:
+#0:Number of the XRP
+#1:Record number, counting up by one for each record the XRP sends and wrapping at 256, so the central can tell when one went missing on the way
+#2:Which values follow. Bit i is set if value i is in the record, and _TELEMETRY_KEY is set for a key record.
+#Then each value in the record as a zigzag varint: the value doubled, or minus the value doubled less 1 if it is negative, 7 bits at a time lowest
+#first, with the top bit set on every byte but the last. A key record holds every value as it is. Other records hold the change in each value since
+#the XRP's last record, leaving out values that have not changed, so an XRP standing still sends 3 byte records. Every _TELEMETRY_KEY_EVERY
+#records is a key record, and so is the first after connecting to a parent, so a central that missed a record only waits for the next one.
+#The values are:
+#0:Left encoder position in millimeters
+#1:Right encoder position in millimeters
+#2:Yaw in tenths of a degree
+#3:Battery voltage, as the top 8 bits of the on switch ADC reading
+#4:State bits: _STATE_MOVING while following a command, _STATE_BUTTON while the button is pressed
+_TELEMETRY_VALUES = const(5)
+_TELEMETRY_KEY = const(0x80)
+_TELEMETRY_KEY_EVERY = const(10)
+_STATE_MOVING = const(0x01)
+_STATE_BUTTON = const(0x02)
+#Longest record: 3 bytes, then up to 5 bytes for each value
+_MAX_RECORD = const(3+5*_TELEMETRY_VALUES)
+#Telemetry must never crowd out commands and acks. Each XRP sends its parent at most _TELEMETRY_BUDGET bytes of records a second, its own and its
+#children's together, in bursts of up to _TELEMETRY_BURST bytes. Records are held for _TELEMETRY_HOLD_MS, so several go in one notification.
+#Records over the budget are dropped, except key records, which may overdraw it by up to one burst, so a busy part of the tree is decimated to
+#its key records instead of going dark. Once a relay drops a record from an XRP, the central cannot use that XRP's records until its next key
+#record, so the relay drops those too, leaving the budget for records that can be used. An XRP's own records that it drops are never numbered, so
+#they leave no gap.
+_TELEMETRY_BUDGET = const(1500)
+_TELEMETRY_BURST = const(300)
+_TELEMETRY_HOLD_MS = const(50)
 #endregion
 
 #region Supporting Methods
 #Methods copied from https://github.com/micropython/micropython/blob/master/examples/bluetooth/ble_advertising.py to allow for bluetooth advertising.
 # Generate a payload to be passed to gap_advertise(adv_data=...).
-def advertising_payload(limited_disc=False, br_edr=False, name=None, services=None, appearance=0):
+def advertising_payload(limited_disc=False, br_edr=False, name=None, services=None, appearance=0, manufacturer=None):
     payload = bytearray()
 
     def _append(adv_type, value):
@@ -154,6 +476,9 @@ def advertising_payload(limited_disc=False, br_edr=False, name=None, services=No
     if appearance:
         _append(_ADV_TYPE_APPEARANCE, struct.pack("<h", appearance))
 
+    if manufacturer:
+        _append(_ADV_TYPE_MANUFACTURER, manufacturer)
+
     if len(payload) > _ADV_MAX_PAYLOAD:
         raise ValueError("advertising payload too large")
 
@@ -184,15 +509,261 @@ def decode_services(payload):
     for u in decode_field(payload, _ADV_TYPE_UUID128_COMPLETE):
         services.append(bluetooth.UUID(u))
     return services
+
+
+#Returns whether an advertising payload lists the 128 bit service UUID given as bytes, comparing bytes in place rather than decoding every field
+def advertises_service(payload, uuid):
+    i=0
+    length=len(payload)
+    while i+1<length:
+        size=payload[i]
+        if payload[i+1]==_ADV_TYPE_UUID128_COMPLETE or payload[i+1]==_ADV_TYPE_UUID128_MORE:
+            for start in range(i+2, min(length, i+1+size)-15, 16):
+                for j in range(16):
+                    if payload[start+j]!=uuid[j]:
+                        break
+                else:
+                    return True
+        i+=1+size
+    return False
+
+
+#Returns the first byte of the first field of the given type in an advertising payload, or -1 if there is no such field or it is empty
+def field_byte(payload, adv_type):
+    i=0
+    length=len(payload)
+    while i+1<length:
+        if payload[i+1]==adv_type:
+            return payload[i+2] if payload[i]>1 and i+2<length else -1
+        i+=1+payload[i]
+    return -1
+
+
+#Packs 5 byte commands into as few frames as possible, each at most payload bytes long. A command on its own is sent as a plain 5 byte frame,
+#so XRPs that only understand single commands keep working.
+def batch_frames(commands, payload=_DEFAULT_PAYLOAD):
+    per_frame=max(1, (payload-1)//_COMMAND_SIZE)
+    frames=[]
+    for i in range(0, len(commands), per_frame):
+        chunk=commands[i:i+per_frame]
+        if len(chunk)==1:
+            frames.append(bytes(chunk[0]))
+        else:
+            frame=bytearray((_FRAME_BATCH,))
+            for command in chunk:
+                frame+=command
+            frames.append(frame)
+    return frames
+
+
+#Wraps a 5 byte command in a sequenced frame
+def sequenced_frame(command, seq, latest_wins=False, restart=False):
+    return bytes((_FRAME_SEQUENCED, seq&0xFF, (_SEQ_LATEST_WINS if latest_wins else 0)|(_SEQ_RESTART if restart else 0)))+bytes(command)
+
+
+#Makes an arc frame for an XRP to drive to the point dx centimeters ahead of it and dy to its left, at max_effort effort, or arc_to()'s default if None
+def arc_frame(number, dx, dy, seq, latest_wins=False, restart=False, effort=None):
+    frame=bytes((_FRAME_ARC, seq&0xFF, (_SEQ_LATEST_WINS if latest_wins else 0)|(_SEQ_RESTART if restart else 0), number, dx&0xFF, dx>>8&0xFF, dy&0xFF, dy>>8&0xFF))
+    return frame if effort is None else frame+bytes((round(100*effort),))
+
+
+#Splits a mission for an XRP, given as a list of 4 byte moves, into frames of at most payload bytes. every is how many steps go between progress
+#notifications, or 0 for none.
+def mission_frames(number, steps, seq, every=0, payload=_DEFAULT_PAYLOAD, restart=False):
+    per_frame=(payload-_MISSION_HEADER)//_STEP_SIZE
+    frames=[]
+    for first in range(0, len(steps), per_frame):
+        part=steps[first:first+per_frame]
+        frames.append(bytes((_FRAME_MISSION, seq&0xFF, _SEQ_RESTART if restart else 0, number, every, first, len(steps)))+b"".join(bytes(step) for step in part))
+    return frames
+
+
+def abort_frame(number, seq):
+    return bytes((_FRAME_MISSION, seq&0xFF, _MISSION_ABORT, number, 0, 0, 0))
+
+
+#An emergency stop for one XRP, or for every XRP if number is None
+def stop_frame(number=None):
+    return bytes((_FRAME_STOP, 0 if number is None else number, _STOP_ALL if number is None else 0))
+
+
+#Returns (number, sequence number) for every completion in a notification, with None as the sequence number for commands sent without one
+def completions(notification):
+    if len(notification)==1:
+        return [(notification[0], None)]
+    kind=notification[0]
+    if kind==_NOTIFY_DONE and len(notification)==3:
+        return [(notification[1], notification[2])]
+    if kind==_NOTIFY_COMPLETED:
+        return [(number, None) for number in notification[1:]]
+    if kind==_NOTIFY_COMPLETED_MAP:
+        first=notification[1]
+        return [(first+8*i+bit, None) for i in range(len(notification)-2) for bit in range(8) if notification[2+i]>>bit&1]
+    if kind==_NOTIFY_DONE_LIST:
+        return [(notification[i], notification[i+1]) for i in range(1, len(notification)-1, 2)]
+    return []
+
+
+#Reads the 4 byte little endian time at offset in data
+def get_time(data, offset):
+    return data[offset]|data[offset+1]<<8|data[offset+2]<<16|data[offset+3]<<24
+
+
+def put_time(buffer, offset, value):
+    for i in range(4):
+        buffer[offset+i]=value>>8*i&0xFF
+
+
+#Reads the 2 byte little endian signed number at offset in data
+def get_int16(data, offset):
+    value=data[offset]|data[offset+1]<<8
+    return value-0x10000 if value&0x8000 else value
+
+
+#Makes a frame for a move, given as the last 4 bytes of a command, that every XRP in a group starts delay_us microseconds after the root gets it.
+#The group is given as for group_frame().
+def at_frame(move, delay_us, group=None, mask=0, value=0):
+    frame=bytearray(group_frame(move, group, mask, value))
+    frame[0]=_FRAME_AT
+    frame[1]|=_AT_RELATIVE
+    frame+=bytes(4)
+    put_time(frame, 8, delay_us)
+    return bytes(frame)
+
+
+#Writes value into buffer at offset as a zigzag varint, returning the offset after it
+def put_varint(buffer, offset, value):
+    value=value<<1 if value>=0 else ((-value)<<1)-1
+    while value>=0x80:
+        buffer[offset]=value&0x7F|0x80
+        value>>=7
+        offset+=1
+    buffer[offset]=value
+    return offset+1
+
+
+#Returns the length of the telemetry record starting at offset in data, or 0 if it runs past the end
+def record_length(data, offset):
+    length=len(data)
+    i=offset+3
+    if i>length:
+        return 0
+    mask=data[offset+2]
+    for bit in range(_TELEMETRY_VALUES):
+        if mask>>bit&1:
+            while i<length and data[i]&0x80:
+                i+=1
+            i+=1
+    return i-offset if i<=length else 0
+
+
+#Applies the records in a _NOTIFY_TELEMETRY notification to latest, which maps each XRP's number to [record number, list of values] and is kept
+#by the central between notifications. A record that is not a key record only applies straight after the one before it; after a gap, the XRP's
+#values stay as they were until its next key record. Returns the numbers of the XRPs whose values were updated.
+def read_telemetry(notification, latest):
+    updated=[]
+    i=1
+    while i<len(notification):
+        length=record_length(notification, i)
+        if not length:
+            break
+        number, seq, mask=notification[i], notification[i+1], notification[i+2]
+        known=latest.get(number)
+        if mask&_TELEMETRY_KEY or (known is not None and known[1] is not None and seq==(known[0]+1)&0xFF):
+            values=[0]*_TELEMETRY_VALUES if mask&_TELEMETRY_KEY else known[1]
+            j=i+3
+            for bit in range(_TELEMETRY_VALUES):
+                if mask>>bit&1:
+                    value=shift=0
+                    while True:
+                        byte=notification[j]
+                        value|=(byte&0x7F)<<shift
+                        shift+=7
+                        j+=1
+                        if byte<0x80:
+                            break
+                    value=value>>1 if value&1==0 else -((value+1)>>1)
+                    values[bit]=value if mask&_TELEMETRY_KEY else values[bit]+value
+            latest[number]=[seq, values]
+            updated.append(number)
+        else:
+            #Missed a record, so the values wait for the next key record
+            latest[number]=[seq, None]
+        i+=length
+    return updated
+
+
+#Makes a group frame for a move, given as the last 4 bytes of a command. With group set, it is for the XRPs in that group; otherwise it is for the XRPs
+#whose number ANDed with mask equals value. The defaults address every XRP.
+def group_frame(move, group=None, mask=0, value=0):
+    if group is not None:
+        return bytes((_FRAME_GROUP, _GROUP_ID, group, 0))+bytes(move)
+    return bytes((_FRAME_GROUP, _GROUP_MASK, mask, value&mask))+bytes(move)
 #endregion
 class SwarmAgent:
-    def __init__(self, p_number, p_children=False):
+    def __init__(self, p_number, p_children=False, p_queue_depth=_QUEUE_DEPTH, p_overflow=_OVERFLOW_DROP_NEW, p_ack_window=_ACK_WINDOW_MS, p_telemetry_hz=0, p_telemetry_budget=_TELEMETRY_BUDGET, p_schedule_links=True):
         #Numeric identifier of the XRP, ranging from 0-255. Should be unique, unless the user wishes multiple XRPs to be controlled by one icon.
         self.number=p_number
 
         #Whether or not the XRP will connect to other XRPs
         self.children=p_children
 
+        #Motion queue. Slots are allocated once, here, so the IRQ handler only copies bytes. queue_in and queue_cut only ever change in the IRQ
+        #handler: queue_in counts the commands added, and every command before queue_cut has been thrown away. queue_out only ever changes in the
+        #main program and counts the commands it has taken out, so neither side can overwrite the other's count. The waiting commands are the ones
+        #from queue_head() up to queue_in. There is a slot more than p_queue_depth, so the slot the main program is copying is never reused under it.
+        self.queue=[bytearray(_SLOT_SIZE) for _ in range(p_queue_depth+1)]
+        self.queue_depth=p_queue_depth
+        self.queue_in=0
+        self.queue_out=0
+        self.queue_cut=0
+        self.overflow=p_overflow
+        #Number of commands thrown away because the queue was full
+        self.dropped=0
+        #The command being followed, copied out of the queue so the IRQ handler can reuse its slot
+        self.moving=bytearray(_SLOT_SIZE)
+        #Sequence number of the last sequenced command accepted, used to spot duplicates, and how every sequence number accepted ended
+        self.last_seq=None
+        self.outcomes=bytearray(256)
+        #Whether the main program is following a command
+        self.following=False
+
+        #Outgoing frames are built in tx and sent through views made here, so passing on a batch frame allocates nothing. tx_views[n] covers a batch
+        #frame of n commands and tx_single a lone command.
+        self.tx=bytearray(_MAX_MTU-3)
+        view=memoryview(self.tx)
+        self.tx_view=view
+        self.tx_views=[view[:1+_COMMAND_SIZE*n] for n in range(_MAX_BATCH+1)]
+        self.tx_single=view[1:1+_COMMAND_SIZE]
+        #Notifications sent for this XRP: a 1 byte completion, a _NOTIFY_DONE, and a _NOTIFY_DROPPED with or without a sequence number
+        self.completion=bytes((p_number,))
+        self.done=bytearray((_NOTIFY_DONE, p_number, 0))
+        #A second _NOTIFY_DONE for duplicates, which the IRQ handler acknowledges while the main program may be filling in done
+        self.redone=bytearray((_NOTIFY_DONE, p_number, 0))
+        self.drop=bytearray((_NOTIFY_DROPPED, p_number, 0))
+        self.drop_short=memoryview(self.drop)[:2]
+
+        #Mission, see the Missions region. The steps, 4 bytes each, and the sequence number of the mission held, or None if there is none. Once every
+        #step has arrived it is queued, and the main program follows it. mission_aborted is set by the IRQ handler to stop it.
+        self.mission=bytearray(_MAX_STEPS*_STEP_SIZE)
+        self.mission_seq=None
+        self.mission_steps=0
+        self.mission_loaded=0
+        self.mission_every=0
+        self.mission_aborted=False
+        #Whether the XRP has stopped for a _FRAME_STOP and not yet taken a command since. Set by the IRQ handler and cleared by the main program.
+        self.stopped=False
+        self.stopped_notify=bytearray((_NOTIFY_STOPPED, p_number))
+        #Whether the main program is following the mission, and how many of its steps it has followed
+        self.mission_running=False
+        self.mission_done=0
+        self.progress=bytearray((_NOTIFY_PROGRESS, p_number, 0, 0))
+
+        #Ring buffer of debug messages and the number that goes with each, and the number of messages logged
+        self.log_messages=[None]*_LOG_SIZE
+        self.log_values=[0]*_LOG_SIZE
+        self.log_count=0
+
         #Bluetooth activation
         self._ble = bluetooth.BLE()
         self._ble.active(True)
@@ -203,95 +774,1432 @@ class SwarmAgent:
         #Sets _command to be the registered service
         ((self._command,),) = self._ble.gatts_register_services((_SERVICE,))
 
+        #Asks for a larger MTU on every connection, and lets _command hold a whole batch frame instead of the default 20 bytes
+        self._ble.config(mtu=_MAX_MTU)
+        self._ble.gatts_set_buffer(self._command, _MAX_MTU-3)
+
+        #Bulk transfers, see the Bulk transfers region. bulk_out holds the payloads waiting to go to each connection, as [payload, bytes sent,
+        #whether it goes by GATT], bulk_acking the connections with a GATT piece not yet acknowledged, and bulk_in the payload coming in from each
+        #connection, as [payload, bytes received]. channel is the open L2CAP channel, as [connection, cid, largest SDU the other end takes, whether
+        #it is stalled, whether this XRP opened it], and opening the connection one is being opened on.
+        self.bulk_out={}
+        self.bulk_acking=set()
+        self.bulk_in={}
+        self.channel=None
+        self.opening=None
+        self.bulk_piece=bytearray(_BULK_MTU)
+        self.bulk_rx=bytearray(_BULK_MTU)
+        try:
+            self._ble.l2cap_listen(_BULK_PSM, _BULK_MTU)
+            self.l2cap=True
+        except (AttributeError, OSError):
+            #Firmware built without L2CAP, so bulk payloads always go by GATT
+            self.l2cap=False
+
+        #Negotiated MTU of each connection, for connections where it is larger than the default
+        self.mtus={}
+
         #Parent handle, that is set to whatever the handle is when the parent connects
-        self.parent_handle=""
+        self.parent_handle=None
         
         #A set of all the connected child XRPs
         self.connected_children=set()
+
+        #Routing table, mapping the number of every XRP below this one to the handle of the child it can be reached through
+        self.routes={}
+
+        #Groups the XRP is in, the groups with members below each child (None if the child has too many to list), and the last list sent to the parent
+        self.groups=set()
+        self.child_groups={}
+        self.announced_groups=set()
+
+        #Completions waiting for the ack window to end: numbers of XRPs that finished unsequenced commands, and number, sequence number pairs,
+        #with how many of each there are. Aggregated notifications are built in acks.
+        self.ack_window=p_ack_window
+        self.done_numbers=bytearray(_MAX_DONE)
+        self.done_count=0
+        self.done_seqs=bytearray(2*_MAX_DONE)
+        self.done_seq_count=0
+        self.acks=bytearray(_MAX_MTU-3)
+        self.ack_timer=machine.Timer(-1)
+        self.ack_timer_running=False
+        #Bound methods are made here, since making one allocates
+        self._flush_acks=self.flush_acks
+        self._own_done=self.own_done
+        self._notify_dropped=self.notify_dropped
+
+        #Telemetry, see the Telemetry region. Samples are taken this many times a second, or never if 0. The last values sent go in telemetry_sent,
+        #and records are built in record. Records waiting to go to the parent are held in telemetry_out, after its type byte, up to telemetry_length.
+        #The budget is kept in thousandths of a byte, topped up by p_telemetry_budget of them every millisecond, and starts full on connecting to a parent.
+        self.telemetry_hz=p_telemetry_hz
+        self.telemetry_sample=[0]*_TELEMETRY_VALUES
+        self.telemetry_sent=[0]*_TELEMETRY_VALUES
+        self.record=bytearray(_MAX_RECORD)
+        self.record_count=0
+        self.since_key=0
+        self.telemetry_out=bytearray(_MAX_MTU-3)
+        self.telemetry_out[0]=_NOTIFY_TELEMETRY
+        self.telemetry_length=1
+        self.telemetry_budget=p_telemetry_budget
+        self.telemetry_tokens=0
+        self.telemetry_topped_up=0
+        #Records this XRP dropped to stay within its budget, and which XRPs below it it has dropped a record from since their last key record
+        self.telemetry_dropped=0
+        self.telemetry_gaps=bytearray(256)
+        self.sample_timer=machine.Timer(-1)
+        self.hold_timer=machine.Timer(-1)
+        self.hold_timer_running=False
+        self._sample_telemetry=self.sample_telemetry
+        self._flush_telemetry=self.flush_telemetry
+
+        #Clock sync, see the Clock sync region. The swarm clock is sync_offset microseconds ahead of ticks_us() at ticks_us() time sync_at, and
+        #gains sync_drift microseconds on it every microsecond. sync_lows, sync_highs and sync_times hold the range and arrival time of the last
+        #_SYNC_SAMPLES samples, and window_offset and window_at the estimate the drift is measured from.
+        self.sync_offset=0
+        self.sync_at=0
+        self.sync_drift=0.0
+        self.sync_lows=[0]*_SYNC_SAMPLES
+        self.sync_highs=[0]*_SYNC_SAMPLES
+        self.sync_times=[0]*_SYNC_SAMPLES
+        self.sync_count=0
+        self.window_offset=None
+        self.window_at=0
+        self.sync_request=bytearray(_NOTIFY_SYNC_SIZE)
+        self.sync_request[0]=_NOTIFY_SYNC
+        self.sync_timer=machine.Timer(-1)
+        self.sync_running=False
+        self._sync=self.sync
+        #Replies to children's sync requests, by connection, the connections with one waiting, and the timer that sends them
+        self.sync_replies={}
+        self.sync_waiting=set()
+        self.reply_timer=machine.Timer(-1)
+        self.reply_timer_running=False
+        self._send_sync_replies=self.send_sync_replies
+        #Where a relative _FRAME_AT is turned into one with a swarm time
+        self.at=bytearray(_AT_SIZE)
+
+        #Depth of the XRP in the tree, 0 being the XRP connected to the central device, and how many more XRPs its tree holds than the smallest
+        self.depth=0
+        self.excess=0
+        #Scan cache, see the Tree building region. Maps address type and address to [state, time the state started, time last heard, failures
+        #in a row]. scan_key is where the key is put together before it is copied into the bytes used to look it up.
+        self.scan_cache={}
+        self.scan_key=bytearray(7)
+        #Whether a gap_connect() is in progress, and whether the XRP is scanning
+        self.connecting=False
+        self.scanning=False
+        #Advertising interval while the XRP looks for a new parent, and the timer that backs it off
+        self.rejoin_interval=_REJOIN_INTERVAL_US
+        self.rejoin_timer=machine.Timer(-1)
+        self._rejoin=self.rejoin
+
+        #Link scheduling, see the Link scheduling region. traffic counts the frames handled since the last check, quiet the checks in a row without
+        #any, and fast is whether the XRP is asking for short intervals. intervals maps each connection to the interval it last reported, in units of
+        #1.25 ms, and scan_ends is when the current scan window ends. grew is when the XRP last joined the tree or took a child, for forming(), and
+        #settled whether check_links() has seen it stop forming since. can_update is cleared if BLE.hci_cmd() turns out not to be there.
+        self.schedule_links=p_schedule_links
+        self.grew=0
+        self.settled=False
+        self.traffic=0
+        self.quiet=0
+        self.checks=0
+        self.fast=False
+        self.intervals={}
+        self.scan_ends=0
+        self.can_update=True
+        self.update_request=bytearray(_CONNECTION_UPDATE_SIZE)
+        self.update_response=bytearray(1)
+        self.link_timer=machine.Timer(-1)
+        self.link_timer_running=False
+        self._check_links=self.check_links
         
         #Starts advertising the XRP
         print("Advertising")
-        self._ble.gap_advertise(500000, advertising_payload(name=str(self.number), services=[_UUID])) #TODO: Add correct parameters for gap_advertise. These include the interval and a payload.
+        self.advertise()
         imu.reset()
+
+    #Advertises the XRP, along with how many children it can still take and how many XRPs its subtree holds
+    def advertise(self, interval_us=_ADV_INTERVAL_US):
+        free=_MAX_CHILDREN-len(self.connected_children) if self.children else 0
+        info=bytes((free, min(255, 1+len(self.routes))))
+        self._ble.gap_advertise(interval_us, advertising_payload(name=str(self.number).encode(), services=[_UUID], manufacturer=info))
     
+    #Advertises again after losing the parent, doubling the interval every _REJOIN_STEP_MS. Also the callback of rejoin_timer.
+    def rejoin(self, timer=None):
+        if self.parent_handle is not None:
+            return
+        self.advertise(self.rejoin_interval)
+        if self.rejoin_interval<_ADV_INTERVAL_US:
+            self.rejoin_interval=min(2*self.rejoin_interval, _ADV_INTERVAL_US)
+            self.rejoin_timer.init(mode=machine.Timer.ONE_SHOT, period=_REJOIN_STEP_MS, callback=self._rejoin)
+
+    #Starts scanning for children, if the XRP can take more and is attached to the tree. With link scheduling, the scan lasts one window of
+    #_SCAN_BURST_MS, or until the XRP has settled while it is forming without traffic, and check_links() starts the next.
+    def start_scan(self):
+        if self.children==True and not self.scanning and len(self.connected_children)<_MAX_CHILDREN and self.parent_handle is not None and self.depth!=_DEPTH_DETACHED:
+            self.scanning=True
+            if self.schedule_links:
+                window=max(_SCAN_BURST_MS, _SETTLE_MS-time.ticks_diff(time.ticks_ms(), self.grew)) if self.forming() and not self.fast else _SCAN_BURST_MS
+                self.scan_ends=time.ticks_add(time.ticks_ms(), window)
+                self._ble.gap_scan(window, _SCAN_INTERVAL_US, _SCAN_WINDOW_US)
+            else:
+                self._ble.gap_scan(0, _SCAN_INTERVAL_US, _SCAN_WINDOW_US)
+
+    #Whether the XRP is still taking children as the tree forms, see the Link scheduling region
+    def forming(self):
+        return len(self.connected_children)<_MAX_CHILDREN and time.ticks_diff(time.ticks_ms(), self.grew)<_SETTLE_MS
+
+    def stop_scan(self):
+        if self.scanning:
+            self.scanning=False
+            self._ble.gap_scan(None)
+
     #This function runs every time an event occurs, having a parameter for the type of the event and the data the event contains
     def event(self, event, data):
         #These events are for interactions between the device and its parent
         if event==_IRQ_CENTRAL_CONNECT:
             # A central device has connected to this peripheral.
             conn_handle, addr_type, addr = data
-            print("Connected to device:" + conn_handle)
+            self.log("Connected to device:", conn_handle)
             #Stops advertising so that it doesn't accidentally join another XRP
             self._ble.gap_advertise(None)
-            parent_handle=conn_handle
-            if self.children==True and len(self.connected_children)<6:
-                #If the XRP can have other XRPs and it has less than six connected XRPs(this amount needs to be lowered after testing to see efficiency), the XRP begins to scan for other bluetooth devices for an indefinite period of time
-                self._ble.gap_scan(0)
-            pass
+            self.rejoin_timer.deinit()
+            self.parent_handle=conn_handle
+            #Tells the parent which XRPs can be reached through this one
+            self.announce((self.number,)+tuple(self.routes))
+            self.announced_groups=set()
+            self.announce_groups()
+            self.telemetry_tokens=1000*_TELEMETRY_BURST
+            self.telemetry_topped_up=time.ticks_ms()
+            if self.telemetry_hz:
+                #The new parent, or the central, has none of the XRP's values yet, so the first record is a key record
+                self.since_key=0
+                self.sample_timer.init(mode=machine.Timer.PERIODIC, freq=self.telemetry_hz, callback=self._sample_telemetry)
+            if self.depth==_DEPTH_DETACHED:
+                #Back in the tree. A new parent sends the real depth straight away; the central device never does, since the XRP it connects to is depth 0.
+                self.set_depth(0)
+            #If the XRP can have other XRPs and it has less than six connected XRPs(this amount needs to be lowered after testing to see efficiency), the XRP begins to scan for other bluetooth devices for an indefinite period of time
+            self.grew=time.ticks_ms()
+            self.settled=False
+            self.start_scan()
+            if self.schedule_links and self.children==True and not self.link_timer_running:
+                self.link_timer_running=True
+                self.link_timer.init(mode=machine.Timer.PERIODIC, period=_SCHEDULE_MS, callback=self._check_links)
         elif event==_IRQ_CENTRAL_DISCONNECT:
             # A central has disconnected from this peripheral.
             conn_handle, addr_type, addr = data
-            print("Disconnected from parent")
-            parent_handle=""
+            self.log("Disconnected from parent")
+            self.mtus.pop(conn_handle, None)
+            self.intervals.pop(conn_handle, None)
+            self.drop_bulk(conn_handle)
             #Reset parent handle
-            pass
+            self.parent_handle=None
+            self.sample_timer.deinit()
+            self.stop_sync()
+            self.telemetry_length=1
+            #Keeps the children, tells them the subtree is detached, and looks for a new parent
+            self.set_depth(_DEPTH_DETACHED)
+            self.rejoin_interval=_REJOIN_INTERVAL_US
+            self.rejoin()
         elif event == _IRQ_GATTS_WRITE:
             # A client has written to this characteristic or descriptor.
             #This runs when the parent sends data to the child.
             conn_handle, value_handle = data
-            #Reads the data
-            commands=self._ble.gatts_read(self._command)
-            if commands[0]==self.number:
-                #If the XRP is the intended recipient, the commands are followed
-                if(commands[1]==0):
-                    #If the value is 0, the XRP turns left
-                    drivetrain.turn(commands[2]) # type: ignore
+            #Reads the data. gatts_read() allocates the only new object on the way through; everything after it indexes the frame in place.
+            frame=self._ble.gatts_read(self._command)
+            length=len(frame)
+            if length==_COMMAND_SIZE or (length>0 and frame[0]!=_FRAME_SYNC and frame[0]!=_FRAME_DEPTH):
+                self.traffic+=1
+                if not self.fast:
+                    self.speed_up()
+            if length==_STOP_SIZE and frame[0]==_FRAME_STOP:
+                #Checked first, so a stop is never held up behind the other frame types
+                if frame[2]&_STOP_ALL:
+                    for connection in self.connected_children:
+                        self._ble.gattc_write(connection, self._command, frame)
+                    self.stop()
+                elif frame[1]==self.number:
+                    self.stop()
                 else:
-                    #Else it turns right
-                    drivetrain.turn(-commands[2]) # type: ignore
-                #The XRP drives straight for commands[3] meters and commands[4] centimeters
-                drivetrain.straight(commands[3]*100+commands[4]) # type: ignore
-                #The XRP notifies its parent
-                self._ble.gatts_notify(parent_handle, self._command, bytearray(self.number.to_bytes(1, 'big')))
-                # If it should, it reads the command from the central device.
-            else:
-                #If the XRP is not the intended recipient, the children are sent the data
-                for connection in self.connected_children:
-                    self._ble.gattc_write(connection, self._command, commands)
+                    self.send_on(frame[1], frame)
+            elif length==_COMMAND_SIZE:
+                if frame[0]==self.number:
+                    #If the XRP is the intended recipient, the command is queued to be followed
+                    self.enqueue(frame)
+                else:
+                    self.send_on(frame[0], frame)
+            elif length>_COMMAND_SIZE and frame[0]==_FRAME_BATCH:
+                for i in range(1, length-_COMMAND_SIZE+1, _COMMAND_SIZE):
+                    if frame[i]==self.number:
+                        self.enqueue(frame, i)
+                self.forward(frame)
+            elif (length==_SEQUENCED_SIZE and frame[0]==_FRAME_SEQUENCED) or ((length==_SEQUENCED_SIZE or length==_ARC_SIZE) and frame[0]==_FRAME_ARC):
+                if frame[3]==self.number:
+                    self.enqueue_sequenced(frame, _SLOT_ARC if frame[0]==_FRAME_ARC else 0)
+                else:
+                    self.send_on(frame[3], frame)
+            elif (length==2 or length==3) and frame[0]==_FRAME_DEPTH:
+                self.set_depth(frame[1], frame[2] if length==3 else 0)
+            elif length==_GROUP_SIZE and frame[0]==_FRAME_GROUP:
+                self.follow_group(frame)
+            elif length==_AT_SIZE and frame[0]==_FRAME_AT:
+                if frame[1]&_AT_RELATIVE:
+                    #Only the root should get these. The start time is fixed here, once, for the whole swarm.
+                    at=self.at
+                    for i in range(_AT_SIZE):
+                        at[i]=frame[i]
+                    at[1]&=~_AT_RELATIVE
+                    put_time(at, 8, time.ticks_add(self.swarm_time(), get_time(frame, 8)))
+                    frame=at
+                self.follow_group(frame, get_time(frame, 8))
+            elif length==_SYNC_SIZE and frame[0]==_FRAME_SYNC:
+                self.synced(frame)
+            elif length>=_MISSION_HEADER and frame[0]==_FRAME_MISSION:
+                if frame[3]==self.number:
+                    self.load_mission(frame)
+                else:
+                    self.send_mission(frame[3], frame)
+            elif length>_BULK_HEADER and frame[0]==_FRAME_BULK:
+                self.receive_piece(conn_handle, frame)
+            elif length==_MEMBERSHIP_SIZE and frame[0]==_FRAME_MEMBERSHIP:
+                if frame[1]!=self.number:
+                    self.send_on(frame[1], frame)
+                elif frame[3]:
+                    self.join_group(frame[2])
+                else:
+                    self.leave_group(frame[2])
         
         #Events for scanning for devices to connect
         elif event==_IRQ_SCAN_RESULT:
             # A single scan result.
             #The XRP found a bluetooth device(not confirmed if it is an XRP)
             addr_type, addr, adv_type, rssi, adv_data = data
-            if adv_type in (_ADV_IND, _ADV_DIRECT_IND) and _UUID in decode_services(adv_data):
-                #The XRP connects to the device if it is an XRP
-                self._ble.gap_connect(addr_type, addr)
-                pass
+            if self.connecting:
+                return
+            entry=self.scan_entry(addr_type, addr, adv_type, adv_data)
+            if entry is None:
+                return
+            #The XRP connects to the device if it is an XRP, once it has waited long enough
+            if self.consider(entry[1], rssi, adv_data):
+                entry[0]=_SCAN_CONNECTING
+                self.connecting=True
+                if self.schedule_links:
+                    low, high=(_FAST_MIN_US, _FAST_MAX_US) if self.fast or self.forming() else (_IDLE_MIN_US, _IDLE_MAX_US)
+                    self._ble.gap_connect(addr_type, addr, _CONNECT_SCAN_MS, low, high)
+                else:
+                    self._ble.gap_connect(addr_type, addr)
         elif event == _IRQ_PERIPHERAL_CONNECT:
             # A successful gap_connect().
             # The connection handle is added to the XRP's set and if the XRP has 6 children, it stops scanning for bluetooth devices.
             conn_handle, addr_type, addr = data
+            self.connecting=False
+            entry=self.scan_cache.get(self.cache_key(addr_type, addr))
+            if entry is not None:
+                entry[0]=_SCAN_CONNECTED
             self.connected_children.add(conn_handle)
-            print("A child has connected:" + conn_handle)
-            if len(self.connected_children)==6:
-                self._ble.gap_scan(None)
+            self.grew=time.ticks_ms()
+            self.settled=False
+            self.log("A child has connected:", conn_handle)
+            #Asks the child for a larger MTU so batch frames fit, and tells it its depth
+            self._ble.gattc_exchange_mtu(conn_handle)
+            self._ble.gattc_write(conn_handle, self._command, self.depth_frame())
+            if len(self.connected_children)==_MAX_CHILDREN:
+                self.stop_scan()
+                self.scan_cache.clear()
 
         #Event for when a child disconnects
         elif event == _IRQ_PERIPHERAL_DISCONNECT:
             # Connected peripheral has disconnected.
             # The child is removed from the set of children
             conn_handle, addr_type, addr = data
+            if conn_handle not in self.connected_children:
+                #A gap_connect() that failed, usually because another XRP connected to the device first, so it is left alone for a while
+                self.connecting=False
+                entry=self.scan_cache.get(self.cache_key(addr_type, addr))
+                if entry is not None:
+                    entry[0]=_SCAN_FAILED
+                    entry[1]=time.ticks_ms()
+                    entry[3]+=1
+                return
+            #The child can be connected to again if it comes back
+            self.scan_cache.pop(self.cache_key(addr_type, addr), None)
             self.connected_children.remove(conn_handle)
-            print("A child has disconnected")
+            self.mtus.pop(conn_handle, None)
+            self.intervals.pop(conn_handle, None)
+            self.drop_bulk(conn_handle)
+            #Forgets every XRP that was reached through the child, so commands for them are sent to all children again. A plain loop rather than a
+            #comprehension, which would make conn_handle a closure cell that MicroPython allocates on every call to event().
+            gone=[]
+            for number, connection in self.routes.items():
+                if connection==conn_handle:
+                    gone.append(number)
+            for number in gone:
+                del self.routes[number]
+            self.child_groups.pop(conn_handle, None)
+            self.sync_replies.pop(conn_handle, None)
+            self.sync_waiting.discard(conn_handle)
+            self.announce_groups()
+            self.log("A child has disconnected:", conn_handle)
+            #The free slot can take another XRP, such as one of the child's own children looking for a new parent
+            self.start_scan()
         
         #Event for when a child writes to the parent
         elif event==_IRQ_GATTC_NOTIFY:
             # A server has sent a notify request.
             conn_handle, value_handle, notify_data = data
-            #The XRP notifies its parent, until the notification reaches the central device
-            self._ble.gatts_notify(parent_handle, value_handle, notify_data)
+            if len(notify_data)==1 or (len(notify_data)>1 and notify_data[0]!=_NOTIFY_JOIN and notify_data[0]!=_NOTIFY_GROUPS
+                                       and notify_data[0]!=_NOTIFY_SYNC):
+                self.traffic+=1
+                if not self.fast:
+                    self.speed_up()
+            if len(notify_data)>=2 and notify_data[0]==_NOTIFY_GROUPS:
+                #The child's groups are merged into this XRP's own list, which is only sent on if it changed
+                self.child_groups[conn_handle]=None if notify_data[1]&_GROUPS_ALL else set(notify_data[2:])
+                self.announce_groups()
+                return
+            if len(notify_data)>=2 and notify_data[0]==_NOTIFY_TELEMETRY:
+                self.relay_telemetry(notify_data, conn_handle)
+                return
+            if len(notify_data)==_NOTIFY_SYNC_SIZE and notify_data[0]==_NOTIFY_SYNC:
+                self.reply_sync(conn_handle, notify_data)
+                return
+            #Whoever sent or passed on the notification is below that child, so the routing table is updated
+            length=len(notify_data)
+            if length==1:
+                self.routes[notify_data[0]]=conn_handle
+            elif notify_data[0]==_NOTIFY_JOIN:
+                for i in range(1, length):
+                    self.routes[notify_data[i]]=conn_handle
+            elif (notify_data[0]==_NOTIFY_DROPPED or notify_data[0]==_NOTIFY_DONE or notify_data[0]==_NOTIFY_PROGRESS
+                  or notify_data[0]==_NOTIFY_STOPPED):
+                self.routes[notify_data[1]]=conn_handle
+            #Completions wait for the ack window instead of going straight on
+            if self.ack_window and self.collect(notify_data, conn_handle):
+                return
+            if length>=2 and (notify_data[0]==_NOTIFY_DROPPED or notify_data[0]==_NOTIFY_STOPPED):
+                #The completions held back go first, so the drop or stop does not overtake them
+                self.flush_waiting_acks()
+            #The XRP notifies its parent, until the notification reaches the central device. notify_data is the stack's own buffer, passed on as is.
+            if self.parent_handle is not None:
+                self._ble.gatts_notify(self.parent_handle, value_handle, notify_data)
+
+        #Event for when the MTU of a connection has been agreed on
+        elif event==_IRQ_MTU_EXCHANGED:
+            conn_handle, mtu = data
+            self.mtus[conn_handle]=mtu
+
+        #Events for bulk transfers, see the Bulk transfers region
+        elif event==_IRQ_GATTC_INDICATE:
+            # A child has sent an indication, which the stack acknowledges by itself
+            conn_handle, value_handle, notify_data = data
+            if len(notify_data)>_BULK_HEADER and notify_data[0]==_NOTIFY_BULK:
+                self.receive_piece(conn_handle, notify_data)
+        elif event==_IRQ_GATTC_WRITE_DONE or event==_IRQ_GATTS_INDICATE_DONE:
+            # A write with a response, or an indication, has been acknowledged
+            conn_handle, value_handle, status = data
+            self.piece_acked(conn_handle)
+        elif event==_IRQ_L2CAP_ACCEPT:
+            # Another XRP is opening a channel. Returning nothing accepts it.
+            pass
+        elif event==_IRQ_L2CAP_CONNECT:
+            # A channel is open, either one this XRP asked for or one it accepted
+            conn_handle, cid, psm, our_mtu, peer_mtu = data
+            ours=conn_handle==self.opening
+            self.opening=None
+            self.channel=[conn_handle, cid, min(peer_mtu, _BULK_MTU), False, ours]
+            if ours:
+                self.pump_bulk(conn_handle)
+        elif event==_IRQ_L2CAP_DISCONNECT:
+            conn_handle, cid, psm, status = data
+            channel=self.channel
+            waiting=self.bulk_out.get(conn_handle)
+            if conn_handle==self.opening:
+                #Refused, so the payload goes by GATT
+                self.opening=None
+                if waiting:
+                    waiting[0][2]=True
+            elif channel is not None and channel[1]==cid:
+                self.channel=None
+                if channel[4] and waiting:
+                    entry=waiting[0]
+                    if status==0 and entry[1]>=len(entry[0]):
+                        #The receiver closed it with the whole payload
+                        waiting.pop(0)
+                    else:
+                        #Cut short, so the payload starts again by GATT
+                        entry[1]=0
+                        entry[2]=True
+            for connection in list(self.bulk_out):
+                self.pump_bulk(connection)
+        elif event==_IRQ_L2CAP_SEND_READY:
+            # The channel has credits again
+            conn_handle, cid, status = data
+            if self.channel is not None and self.channel[1]==cid:
+                self.channel[3]=False
+                self.pump_bulk(conn_handle)
+        elif event==_IRQ_L2CAP_RECV:
+            conn_handle, cid = data
+            channel=self.channel
+            if channel is None or channel[1]!=cid:
+                return
+            view=memoryview(self.bulk_rx)
+            while True:
+                count=self._ble.l2cap_recvinto(conn_handle, cid, self.bulk_rx)
+                if count<=_BULK_HEADER:
+                    return
+                if self.receive_piece(conn_handle, view[:count]):
+                    self._ble.l2cap_disconnect(conn_handle, cid)
+                    return
+        elif event==_IRQ_CONNECTION_UPDATE:
+            # The connection parameters have changed, either side having asked
+            conn_handle, conn_interval, conn_latency, supervision_timeout, status = data
+            if status==0:
+                self.intervals[conn_handle]=conn_interval
+                self.log("Connection interval, in 1.25 ms:", conn_interval)
+
+    #Runs every _SCHEDULE_MS with link scheduling on, see the Link scheduling region. Asks for short connection intervals while traffic is coming
+    #through and long ones once it stops, and starts the scan windows.
+    def check_links(self, timer=None):
+        if self.scanning and time.ticks_diff(time.ticks_ms(), self.scan_ends)>=0:
+            #The window has ended on its own
+            self.scanning=False
+        self.checks+=1
+        if self.traffic:
+            self.traffic=0
+            self.quiet=0
+            self.speed_up()
+        elif self.fast:
+            self.quiet+=1
+            if self.quiet>=_IDLE_TICKS:
+                self.fast=False
+                self.update_links()
+        if not self.settled and not self.forming():
+            #Children taken while forming connected at short intervals
+            self.settled=True
+            if not self.fast:
+                self.update_links()
+        if not self.fast or self.checks%_BUSY_SCAN_TICKS==0 or (self.checks%_FORMING_SCAN_TICKS==0 and self.forming()):
+            self.start_scan()
+
+    #Asks for short intervals and stops scanning as soon as traffic starts, rather than at the next check_links()
+    def speed_up(self):
+        if self.schedule_links and not self.fast:
+            self.fast=True
+            self.quiet=0
+            self.stop_scan()
+            self.update_links()
+
+    #Asks for the intervals of the moment on every connection to a child that is not already at one
+    def update_links(self):
+        if not self.can_update:
+            return
+        low, high=(_FAST_MIN_US, _FAST_MAX_US) if self.fast else (_IDLE_MIN_US, _IDLE_MAX_US)
+        #In units of 1.25 ms
+        low=low*4//5000
+        high=high*4//5000
+        request=self.update_request
+        request[2]=low&0xFF
+        request[3]=low>>8
+        request[4]=high&0xFF
+        request[5]=high>>8
+        request[6]=request[7]=0
+        request[8]=_SUPERVISION_TIMEOUT&0xFF
+        request[9]=_SUPERVISION_TIMEOUT>>8
+        for connection in self.connected_children:
+            interval=self.intervals.get(connection)
+            if interval is not None and low<=interval<=high:
+                continue
+            #MicroPython's connection handles are the controller's own
+            request[0]=connection&0xFF
+            request[1]=connection>>8
+            try:
+                self._ble.hci_cmd(_OGF_LE, _OCF_CONNECTION_UPDATE, request, self.update_response)
+            except (AttributeError, OSError):
+                #Not in this build of MicroPython
+                self.can_update=False
+                return
+
+    #The scan cache key for an address
+    def cache_key(self, addr_type, addr):
+        key=self.scan_key
+        key[0]=addr_type
+        for i in range(6):
+            key[1+i]=addr[i]
+        return bytes(key)
+
+    #Looks up an advertiser in the scan cache, adding it if it is new. Returns its entry if it is an XRP that could be connected to now, else None.
+    def scan_entry(self, addr_type, addr, adv_type, adv_data):
+        now=time.ticks_ms()
+        key=self.cache_key(addr_type, addr)
+        entry=self.scan_cache.get(key)
+        if entry is not None:
+            state=entry[0]
+            if state==_SCAN_PENDING:
+                if time.ticks_diff(now, entry[2])>=_SCAN_TTL_MS:
+                    #Not heard for a while, so the wait starts again
+                    entry[1]=now
+                entry[2]=now
+                return entry
+            if state==_SCAN_FAILED:
+                if time.ticks_diff(now, entry[1])<_CONNECT_BACKOFF_MS<<min(entry[3]-1, _MAX_BACKOFF_SHIFT):
+                    return None
+                entry[0]=_SCAN_PENDING
+                entry[1]=entry[2]=now
+                return entry
+            if state!=_SCAN_IGNORED or time.ticks_diff(now, entry[1])<_SCAN_TTL_MS:
+                return None
+            #An ignored device is looked at again once its entry expires
+        if len(self.scan_cache)>=_SCAN_CACHE_SIZE and key not in self.scan_cache:
+            self.prune_scan_cache(now)
+        is_xrp=(adv_type==_ADV_IND or adv_type==_ADV_DIRECT_IND) and advertises_service(adv_data, _UUID_BYTES)
+        if len(self.scan_cache)>=_SCAN_CACHE_SIZE and key not in self.scan_cache:
+            #Still full of XRPs being waited on, so new ones are left until there is room
+            return None
+        entry=[_SCAN_PENDING if is_xrp else _SCAN_IGNORED, now, now, 0]
+        self.scan_cache[key]=entry
+        return entry if is_xrp else None
+
+    #Drops the scan cache entries for devices that are not XRPs, and for XRPs not heard for _SCAN_TTL_MS that are not children
+    def prune_scan_cache(self, now):
+        for key in [k for k, e in self.scan_cache.items() if e[0]==_SCAN_IGNORED or (e[0]!=_SCAN_CONNECTED and time.ticks_diff(now, e[2])>=_SCAN_TTL_MS)]:
+            del self.scan_cache[key]
+
+    #Decides whether to connect to an XRP heard advertising, based on how long ago it was first heard, at time first. See the Tree building region.
+    def consider(self, first, rssi, adv_data) -> bool:
+        if self.connecting or rssi<_RSSI_MIN:
+            return False
+        now=time.ticks_ms()
+        wait=self.depth*_DEPTH_WAIT_MS+len(self.connected_children)*_LOAD_WAIT_MS+self.excess*_TREE_WAIT_MS
+        if rssi<_RSSI_GOOD:
+            wait+=(_RSSI_GOOD-rssi)*_RSSI_WAIT_MS
+        if field_byte(adv_data, _ADV_TYPE_MANUFACTURER)==0 and _MAX_CHILDREN-len(self.connected_children)<=_RESERVED_SLOTS:
+            wait+=_RESERVE_WAIT_MS
+        return time.ticks_diff(now, first)>=wait
+
+    #Records the XRP's depth and its tree's excess, and passes a change in either down to the children. XRPs stop scanning while detached and start
+    #again once back in the tree.
+    def set_depth(self, depth, excess=0):
+        if depth==self.depth and excess==self.excess:
+            return
+        moved=depth!=self.depth
+        self.depth=depth
+        self.excess=excess
+        for connection in self.connected_children:
+            self._ble.gattc_write(connection, self._command, self.depth_frame())
+        if not moved:
+            return
+        if depth==_DEPTH_DETACHED:
+            self.stop_scan()
+        else:
+            self.start_scan()
+        #The root's clock is the swarm clock, and an XRP without a parent has nothing to sync with
+        if depth==0:
+            self.stop_sync()
+            self.sync_offset=0
+            self.sync_drift=0.0
+        elif depth==_DEPTH_DETACHED:
+            self.stop_sync()
+        elif not self.sync_running:
+            self.sync_running=True
+            self.sync()
+
+    #Depth to tell the children
+    def child_depth(self):
+        return _DEPTH_DETACHED if self.depth==_DEPTH_DETACHED else min(_DEPTH_DETACHED-1, self.depth+1)
+
+    #The _FRAME_DEPTH to send the children
+    def depth_frame(self):
+        return bytes((_FRAME_DEPTH, self.child_depth(), self.excess))
+
+    #Sends a payload of 1 to _MAX_BULK bytes to the parent or a child, over L2CAP if it can, else by GATT. See the Bulk transfers region.
+    def send_bulk(self, conn_handle, data):
+        if not 0<len(data)<=_MAX_BULK:
+            raise ValueError("bulk payload must be 1 to 65535 bytes")
+        self.bulk_out.setdefault(conn_handle, []).append([data, 0, not self.l2cap])
+        self.pump_bulk(conn_handle)
+
+    #Sends as much of the first payload waiting for a connection as can go now: the pieces there are credits for on the channel, opening the
+    #channel first if there is none, or one GATT piece if the last has been acknowledged
+    def pump_bulk(self, conn_handle):
+        waiting=self.bulk_out.get(conn_handle)
+        if not waiting:
+            return
+        entry=waiting[0]
+        if entry[2]:
+            if conn_handle not in self.bulk_acking:
+                self.bulk_acking.add(conn_handle)
+                if conn_handle==self.parent_handle:
+                    size=self.fill_piece(_NOTIFY_BULK, entry, self.payload(conn_handle))
+                    self._ble.gatts_indicate(conn_handle, self._command, memoryview(self.bulk_piece)[:size])
+                else:
+                    size=self.fill_piece(_FRAME_BULK, entry, self.payload(conn_handle))
+                    self._ble.gattc_write(conn_handle, self._command, memoryview(self.bulk_piece)[:size], 1)
+            return
+        channel=self.channel
+        if channel is None:
+            if self.opening is None:
+                try:
+                    self._ble.l2cap_connect(conn_handle, _BULK_PSM, _BULK_MTU)
+                    self.opening=conn_handle
+                except OSError:
+                    entry[2]=True
+                    self.pump_bulk(conn_handle)
+            return
+        if channel[0]!=conn_handle or channel[3] or not channel[4]:
+            return
+        while entry[1]<len(entry[0]):
+            size=self.fill_piece(_FRAME_BULK, entry, channel[2])
+            if not self._ble.l2cap_send(conn_handle, channel[1], memoryview(self.bulk_piece)[:size]):
+                channel[3]=True
+                return
+
+    #Puts the next piece of a payload in bulk_piece, as big as limit allows, and returns its length
+    def fill_piece(self, kind, entry, limit):
+        data, sent=entry[0], entry[1]
+        count=min(limit-_BULK_HEADER, len(data)-sent)
+        piece=self.bulk_piece
+        piece[0]=kind
+        piece[1]=sent&0xFF
+        piece[2]=sent>>8
+        piece[3]=len(data)&0xFF
+        piece[4]=len(data)>>8
+        piece[_BULK_HEADER:_BULK_HEADER+count]=memoryview(data)[sent:sent+count]
+        entry[1]=sent+count
+        return _BULK_HEADER+count
+
+    #Sends the next GATT piece once the last one is acknowledged, moving on to the next payload after the last piece
+    def piece_acked(self, conn_handle):
+        if conn_handle not in self.bulk_acking:
+            return
+        self.bulk_acking.discard(conn_handle)
+        waiting=self.bulk_out.get(conn_handle)
+        if waiting and waiting[0][1]>=len(waiting[0][0]):
+            waiting.pop(0)
+        self.pump_bulk(conn_handle)
+
+    #Copies a piece of a payload from a connection into place, and hands the payload to received_bulk() once it is all there. Returns whether it is.
+    def receive_piece(self, conn_handle, piece):
+        offset=piece[1]|piece[2]<<8
+        total=piece[3]|piece[4]<<8
+        entry=self.bulk_in.get(conn_handle)
+        if entry is None or offset==0 or len(entry[0])!=total:
+            entry=self.bulk_in[conn_handle]=[bytearray(total), 0]
+        count=len(piece)-_BULK_HEADER
+        entry[0][offset:offset+count]=piece[_BULK_HEADER:]
+        entry[1]+=count
+        if entry[1]<total:
+            return False
+        del self.bulk_in[conn_handle]
+        self.received_bulk(conn_handle, entry[0])
+        return True
+
+    #Called with every bulk payload that arrives and the connection it came from. Programs that send bulk payloads replace it in a subclass.
+    def received_bulk(self, conn_handle, data):
+        self.log("Bulk payload received:", len(data))
+
+    #Forgets the bulk transfers on a connection that has gone
+    def drop_bulk(self, conn_handle):
+        self.bulk_out.pop(conn_handle, None)
+        self.bulk_in.pop(conn_handle, None)
+        self.bulk_acking.discard(conn_handle)
+        if self.opening==conn_handle:
+            self.opening=None
+
+    #Largest write or notification that fits in a single packet on a connection
+    def payload(self, conn_handle):
+        return self.mtus.get(conn_handle, _DEFAULT_MTU)-3
+
+    #Copies a command meant for this XRP, starting at offset in frame, into the motion queue. Runs in the IRQ handler, so it must not block or allocate.
+    #The first byte is always stored as the XRP's own number, so group frames can pass the byte before their move. seq is the command's sequence
+    #number, or None if it was not sent in a sequenced frame, and start the swarm time to start it at, or None to start it as soon as possible. flags
+    #are added to the slot's option bits. Returns whether the command was queued.
+    def enqueue(self, frame, offset=0, seq=None, start=None, flags=0):
+        if self.queue_in-self.queue_head()>=self.queue_depth:
+            self.dropped+=1
+            if self.overflow==_OVERFLOW_DROP_NEW:
+                self.notify_dropped(seq)
+                return False
+            #Makes room by skipping the oldest waiting command
+            self.drop_waiting(self.queue_head()+1)
+        slot=self.queue[self.queue_in%len(self.queue)]
+        slot[0]=self.number
+        for i in range(1, _COMMAND_SIZE):
+            slot[i]=frame[offset+i]
+        slot[5]=0 if seq is None else seq
+        slot[6]=(0 if seq is None else _SLOT_SEQ)|(0 if start is None else _SLOT_AT)|flags
+        if start is not None:
+            put_time(slot, 7, start)
+        elif flags&_SLOT_ARC:
+            #The effort byte of a 9 byte arc frame
+            slot[7]=frame[_ARC_SIZE-1] if len(frame)==_ARC_SIZE else 0
+        self.queue_in+=1
+        return True
+
+    #Checks the sequence number of a sequenced, arc or mission frame for this XRP against the last _SEQ_WINDOW accepted. A duplicate is acknowledged
+    #again if its command has ended. Returns whether the frame is new. Runs in the IRQ handler.
+    def accept_seq(self, frame):
+        seq=frame[1]
+        if frame[2]&_SEQ_RESTART:
+            self.last_seq=None
+        if self.last_seq is not None and (self.last_seq-seq)&0xFF<_SEQ_WINDOW:
+            outcome=self.outcomes[seq]
+            if outcome==_OUTCOME_DONE and self.parent_handle is not None:
+                self.redone[2]=seq
+                self._ble.gatts_notify(self.parent_handle, self._command, self.redone)
+            elif outcome==_OUTCOME_DROPPED:
+                self.notify_dropped(seq)
+            #Still waiting or being followed, so its acknowledgement is yet to come
+            return False
+        self.last_seq=seq
+        self.outcomes[seq]=_OUTCOME_WAITING
+        return True
+
+    #Checks a sequenced or arc frame for this XRP for duplicates, applies its options, and queues its command, with flags added to the slot's option bits
+    def enqueue_sequenced(self, frame, flags=0):
+        if not self.accept_seq(frame):
+            return
+        seq=frame[1]
+        if len(frame)==_ARC_SIZE and not (frame[8]==0 or _ARC_MIN_EFFORT<=frame[8]<=100):
+            self.dropped+=1
+            self.notify_dropped(seq)
+            return
+        if frame[2]&_SEQ_LATEST_WINS:
+            self.drop_waiting(self.queue_in)
+        self.enqueue(frame, 3, seq, None, flags)
+
+    #Index of the oldest waiting command
+    def queue_head(self):
+        return max(self.queue_out, self.queue_cut)
+
+    #Drops waiting commands from the front of the queue up to end, notifying the parent of each one. Runs in the IRQ handler, so it marks the slots and
+    #moves queue_cut, and the main program skips them.
+    def drop_waiting(self, end):
+        i=self.queue_head()
+        while i<end:
+            slot=self.queue[i%len(self.queue)]
+            slot[6]|=_SLOT_DROPPED
+            i+=1
+            self.queue_cut=i
+            if slot[6]&_SLOT_MISSION:
+                self.mission_seq=None
+            self.notify_dropped(slot[5] if slot[6]&_SLOT_SEQ else None)
+
+    def notify_dropped(self, seq=None):
+        if seq is not None:
+            self.outcomes[seq]=_OUTCOME_DROPPED
+        if self.parent_handle is not None:
+            self.flush_waiting_acks()
+            if seq is None:
+                self._ble.gatts_notify(self.parent_handle, self._command, self.drop_short)
+            else:
+                self.drop[2]=seq
+                self._ble.gatts_notify(self.parent_handle, self._command, self.drop)
+
+    #Follows the oldest queued command, if there is one. Returns whether there was one. Must be called from the main program, not the IRQ handler.
+    def process_motion(self) -> bool:
+        if self.mission_running:
+            #A mission is followed a step at a time, so the rest of the main program still gets to run between its steps
+            self.following=True
+            self.mission_step()
+            self.following=False
+            return True
+        out=self.queue_head()
+        if self.queue_in==out:
+            return False
+        if self.stopped:
+            #This command was sent after the stop, so the drivetrain may move again. A stop arriving from here on drops the command, or cuts it short.
+            self.stopped=False
+            drivetrain.resume() # type: ignore
+        #Takes the slot before copying it. The IRQ handler only marks and reuses slots from queue_out on, so one it threw away before this is marked.
+        self.queue_out=out+1
+        slot=self.queue[out%len(self.queue)]
+        for i in range(_SLOT_SIZE):
+            self.moving[i]=slot[i]
+        if self.moving[6]&_SLOT_DROPPED:
+            #Already thrown away, and the parent told if it needed to be
+            return True
+        self.following=True
+        self.follow(self.moving)
+        self.following=False
+        return True
+
+    #Logs a message from the IRQ handler, with a number to go with it. message should be a string constant, so logging allocates nothing.
+    def log(self, message, value=0):
+        i=self.log_count%_LOG_SIZE
+        self.log_messages[i]=message
+        self.log_values[i]=value
+        self.log_count+=1
+
+    #Prints the logged messages, oldest first. Call this from the main program.
+    def dump_log(self):
+        for n in range(max(0, self.log_count-_LOG_SIZE), self.log_count):
+            print(self.log_messages[n%_LOG_SIZE], self.log_values[n%_LOG_SIZE])
+
+    #Follows queued commands forever. Call this at the end of the main program.
+    def run(self):
+        while True:
+            if not self.process_motion():
+                time.sleep_ms(10) # type: ignore
+
+    #Follows a single command meant for this XRP, then notifies the parent. If the command came from a queue slot, the acknowledgement carries its
+    #sequence number.
+    def follow(self, command):
+        if len(command)==_SLOT_SIZE and command[6]&_SLOT_MISSION:
+            self.mission_done=0
+            self.mission_running=True
+            self.mission_step()
+            return
+        if len(command)==_SLOT_SIZE and command[6]&_SLOT_AT:
+            self.wait_until(get_time(command, 7))
+        if len(command)==_SLOT_SIZE and command[6]&_SLOT_ARC:
+            #Drives to the point in one curve
+            if command[7]:
+                drivetrain.arc_to(get_int16(command, 1), get_int16(command, 3), command[7]/100) # type: ignore
+            else:
+                drivetrain.arc_to(get_int16(command, 1), get_int16(command, 3)) # type: ignore
+        else:
+            if(command[1]==0):
+                #If the value is 0, the XRP turns left
+                drivetrain.turn(command[2]) # type: ignore
+            else:
+                #Else it turns right
+                drivetrain.turn(-command[2]) # type: ignore
+            #The XRP drives straight for command[3] meters and command[4] centimeters
+            drivetrain.straight(command[3]*100+command[4]) # type: ignore
+        if self.stopped:
+            #Cut short by a stop, which the XRP has already notified
+            return
+        self.notify_done(command[5] if len(command)==_SLOT_SIZE and command[6]&_SLOT_SEQ else None)
+
+    #Notifies the parent that the XRP has finished a command, with its sequence number if it had one. Called from the main program.
+    def notify_done(self, seq):
+        if seq is not None:
+            self.outcomes[seq]=_OUTCOME_DONE
+        if self.parent_handle is None:
+            return
+        if self.ack_window and self.connected_children:
+            #Only relays have other completions to send along with their own. The IRQ handler adds to the same buffers, so the completion is
+            #added from a scheduled callback, which never runs alongside it. The number and sequence number are packed into one small int.
+            micropython.schedule(self._own_done, self.number|(0 if seq is None else seq+1)<<8)
+        elif seq is not None:
+            self.done[2]=seq
+            self._ble.gatts_notify(self.parent_handle, self._command, self.done)
+        else:
+            self._ble.gatts_notify(self.parent_handle, self._command, self.completion)
+
+    #Stops the XRP for a _FRAME_STOP: the drivetrain ends the move in progress at its next control tick, and every waiting command, and the mission if
+    #the main program has not started it, is thrown away without a notification of its own. Runs in the IRQ handler.
+    def stop(self):
+        drivetrain.halt() # type: ignore
+        self.stopped=True
+        #The commands thrown away count as dropped, should their senders send them again
+        if self.following and self.moving[6]&_SLOT_SEQ:
+            self.outcomes[self.moving[5]]=_OUTCOME_DROPPED
+        for i in range(self.queue_head(), self.queue_in):
+            slot=self.queue[i%len(self.queue)]
+            slot[6]|=_SLOT_DROPPED
+            if slot[6]&_SLOT_SEQ:
+                self.outcomes[slot[5]]=_OUTCOME_DROPPED
+        self.queue_cut=self.queue_in
+        if not self.mission_running:
+            self.mission_seq=None
+        if self.parent_handle is not None:
+            self.flush_waiting_acks()
+            self._ble.gatts_notify(self.parent_handle, self._command, self.stopped_notify)
+
+    #Takes in a _FRAME_MISSION for this XRP, queueing the mission once all its steps have arrived. Runs in the IRQ handler.
+    def load_mission(self, frame):
+        seq=frame[1]
+        if frame[2]&_MISSION_ABORT:
+            if seq==self.mission_seq:
+                self.mission_aborted=True
+                if self.mission_loaded<self.mission_steps:
+                    #Not queued yet, so it is thrown away here
+                    self.mission_seq=None
+                    self.notify_dropped(seq)
+            return
+        first=frame[5]
+        if first==0:
+            if not self.accept_seq(frame):
+                return
+            if self.mission_seq is not None or not 0<frame[6]<=_MAX_STEPS:
+                self.dropped+=1
+                self.notify_dropped(seq)
+                return
+            self.mission_seq=seq
+            self.mission_steps=frame[6]
+            self.mission_every=frame[4]
+            self.mission_loaded=0
+            self.mission_aborted=False
+        elif seq!=self.mission_seq:
+            return
+        count=min((len(frame)-_MISSION_HEADER)//_STEP_SIZE, self.mission_steps-first)
+        mission=self.mission
+        for i in range(count*_STEP_SIZE):
+            mission[first*_STEP_SIZE+i]=frame[_MISSION_HEADER+i]
+        self.mission_loaded+=count
+        if self.mission_loaded>=self.mission_steps and not self.enqueue(frame, 0, seq, None, _SLOT_MISSION):
+            self.mission_seq=None
+
+    #Follows the next step of the mission, notifying progress every mission_every steps, and notifies the parent once the last step is done or the
+    #mission has been aborted. process_motion() calls this again straight away until the mission ends, so its steps run back to back.
+    def mission_step(self):
+        steps=self.mission_steps
+        if self.stopped:
+            self.mission_running=False
+            self.mission_seq=None
+            return
+        if not self.mission_aborted:
+            mission=self.mission
+            i=self.mission_done*_STEP_SIZE
+            drivetrain.turn(mission[i+1] if mission[i]==0 else -mission[i+1]) # type: ignore
+            drivetrain.straight(mission[i+2]*100+mission[i+3]) # type: ignore
+            self.mission_done+=1
+            done=self.mission_done
+            if self.stopped:
+                return
+            if done<steps:
+                if self.mission_every and done%self.mission_every==0 and self.parent_handle is not None:
+                    self.progress[2]=self.mission_seq
+                    self.progress[3]=done
+                    self._ble.gatts_notify(self.parent_handle, self._command, self.progress)
+                return
+        seq=self.mission_seq
+        aborted=self.mission_aborted and self.mission_done<steps
+        self.mission_running=False
+        self.mission_seq=None
+        if not aborted:
+            self.notify_done(seq)
+        elif self.ack_window and self.connected_children:
+            #Sent from a scheduled callback, after the completions notify_done() scheduled before it, as the ack window buffers are the IRQ handler's
+            micropython.schedule(self._notify_dropped, seq)
+        else:
+            self.outcomes[seq]=_OUTCOME_DROPPED
+            if self.parent_handle is not None:
+                self._ble.gatts_notify(self.parent_handle, self._command, bytes((_NOTIFY_DROPPED, self.number, seq)))
+
+    def own_done(self, packed):
+        self.add_done(packed&0xFF, (packed>>8)-1)
+
+    #Copies the completions in a notification from a child into the waiting ones, learning routes from them. Returns whether the notification held
+    #any completions.
+    def collect(self, data, conn_handle):
+        length=len(data)
+        if length==1:
+            self.add_done(data[0], -1)
+            return True
+        kind=data[0]
+        if kind==_NOTIFY_DONE and length==3:
+            self.add_done(data[1], data[2])
+        elif kind==_NOTIFY_COMPLETED:
+            for i in range(1, length):
+                self.routes[data[i]]=conn_handle
+                self.add_done(data[i], -1)
+        elif kind==_NOTIFY_COMPLETED_MAP:
+            for i in range(2, length):
+                for bit in range(8):
+                    if data[i]>>bit&1:
+                        number=data[1]+8*(i-2)+bit
+                        self.routes[number]=conn_handle
+                        self.add_done(number, -1)
+        elif kind==_NOTIFY_DONE_LIST:
+            for i in range(1, length-1, 2):
+                self.routes[data[i]]=conn_handle
+                self.add_done(data[i], data[i+1])
+        else:
+            return False
+        return True
+
+    #Adds a completion to the waiting ones, with seq -1 for a command sent without a sequence number, and starts the ack window if it is not already
+    #running. If there is no room left, the waiting completions are sent straight away.
+    def add_done(self, number, seq):
+        if seq<0:
+            if self.done_count==_MAX_DONE:
+                self.flush_acks()
+            self.done_numbers[self.done_count]=number
+            self.done_count+=1
+        else:
+            if self.done_seq_count==_MAX_DONE:
+                self.flush_acks()
+            self.done_seqs[2*self.done_seq_count]=number
+            self.done_seqs[2*self.done_seq_count+1]=seq
+            self.done_seq_count+=1
+        if not self.ack_timer_running:
+            self.ack_timer_running=True
+            self.ack_timer.init(mode=machine.Timer.ONE_SHOT, period=self.ack_window, callback=self._flush_acks)
+
+    #Sends the completions waiting in the ack window ahead of a drop or stop notification, so the central hears of each XRP's commands ending in the
+    #order they ended. Runs in the IRQ handler, or a scheduled callback.
+    def flush_waiting_acks(self):
+        if self.done_count or self.done_seq_count:
+            self.flush_acks()
+
+    #Sends every waiting completion to the parent in as few notifications as fit in a packet. Runs when the ack window ends. This makes one
+    #memoryview per notification, which is shared by every completion in it.
+    def flush_acks(self, timer=None):
+        self.ack_timer_running=False
+        count, seq_count=self.done_count, self.done_seq_count
+        self.done_count=self.done_seq_count=0
+        if self.parent_handle is None or count+seq_count==0:
+            return
+        parent=self.parent_handle
+        acks=self.acks
+        view=memoryview(acks)
+        size=self.payload(parent)-1
+        if count+seq_count==1:
+            #A lone completion is sent the same way as without the ack window
+            if count:
+                acks[0]=self.done_numbers[0]
+                self._ble.gatts_notify(parent, self._command, view[:1])
+            else:
+                acks[0]=_NOTIFY_DONE
+                acks[1]=self.done_seqs[0]
+                acks[2]=self.done_seqs[1]
+                self._ble.gatts_notify(parent, self._command, view[:3])
+            return
+        if count and not self.send_done_map(count, size, view):
+            for start in range(0, count, size):
+                end=min(count, start+size)
+                acks[0]=_NOTIFY_COMPLETED
+                for i in range(start, end):
+                    acks[1+i-start]=self.done_numbers[i]
+                self._ble.gatts_notify(parent, self._command, view[:1+end-start])
+        pairs=size//2
+        for start in range(0, seq_count, pairs):
+            end=min(seq_count, start+pairs)
+            acks[0]=_NOTIFY_DONE_LIST
+            for i in range(2*start, 2*end):
+                acks[1+i-2*start]=self.done_seqs[i]
+            self._ble.gatts_notify(parent, self._command, view[:1+2*(end-start)])
+
+    #Sends the waiting unsequenced completions as one bitmap, if that is shorter than a list and fits. Returns whether it did.
+    def send_done_map(self, count, size, view):
+        first=last=self.done_numbers[0]
+        for i in range(1, count):
+            number=self.done_numbers[i]
+            first=min(first, number)
+            last=max(last, number)
+        span=(last-first)//8+1
+        if span+1>=count or span+1>size:
+            return False
+        acks=self.acks
+        for i in range(span+2):
+            acks[i]=0
+        for i in range(count):
+            offset=self.done_numbers[i]-first
+            if acks[2+offset//8]>>(offset%8)&1:
+                #A bitmap cannot hold the same XRP twice
+                return False
+            acks[2+offset//8]|=1<<(offset%8)
+        acks[0]=_NOTIFY_COMPLETED_MAP
+        acks[1]=first
+        self._ble.gatts_notify(self.parent_handle, self._command, view[:span+2])
+        return True
+
+    #Samples the drivetrain, IMU and board, and sends the parent a record of what changed. The callback of sample_timer.
+    def sample_telemetry(self, timer=None):
+        sample=self.telemetry_sample
+        sample[0]=int(drivetrain.get_left_encoder_position()*10) # type: ignore
+        sample[1]=int(drivetrain.get_right_encoder_position()*10) # type: ignore
+        sample[2]=int(imu.get_yaw()*10) # type: ignore
+        sample[3]=board.on_switch.read_u16()>>8 # type: ignore
+        sample[4]=(_STATE_MOVING if self.following else 0)|(_STATE_BUTTON if board.is_button_pressed() else 0) # type: ignore
+        record=self.record
+        key=self.since_key==0
+        mask=_TELEMETRY_KEY if key else 0
+        length=3
+        for i in range(_TELEMETRY_VALUES):
+            change=sample[i] if key else sample[i]-self.telemetry_sent[i]
+            if key or change:
+                mask|=1<<i
+                length=put_varint(record, length, change)
+        record[0]=self.number
+        record[1]=self.record_count&0xFF
+        record[2]=mask
+        if not self.hold_record(record, 0, length):
+            #The next record is against the last one that went out
+            return
+        self.record_count+=1
+        self.since_key=(self.since_key+1)%_TELEMETRY_KEY_EVERY
+        for i in range(_TELEMETRY_VALUES):
+            self.telemetry_sent[i]=sample[i]
+        if not self.connected_children:
+            #Nothing else will join it, so a leaf sends its record straight away
+            self.flush_telemetry()
+
+    #The swarm clock, in microseconds. See the Clock sync region.
+    def swarm_time(self):
+        now=time.ticks_us()
+        return time.ticks_add(now, self.sync_offset+int(self.sync_drift*time.ticks_diff(now, self.sync_at)))
+
+    #Sends the parent a sync request, and sets the next one going. The callback of sync_timer.
+    def sync(self, timer=None):
+        if not self.sync_running or self.parent_handle is None:
+            return
+        put_time(self.sync_request, 1, time.ticks_us())
+        self._ble.gatts_notify(self.parent_handle, self._command, self.sync_request)
+        period=_SYNC_FAST_MS if self.sync_count<_SYNC_SAMPLES else _SYNC_MS
+        self.sync_timer.init(mode=machine.Timer.ONE_SHOT, period=period+random.getrandbits(6), callback=self._sync)
+
+    #Stops syncing and forgets the samples, which were against the old parent. The swarm clock keeps going from the last estimate.
+    def stop_sync(self):
+        self.sync_running=False
+        self.sync_timer.deinit()
+        self.sync_count=0
+        self.window_offset=None
+
+    #Takes a sample from the parent's reply to a sync request, and works out the swarm clock from the last _SYNC_SAMPLES
+    def synced(self, frame):
+        arrived=time.ticks_us()
+        i=self.sync_count%_SYNC_SAMPLES
+        self.sync_lows[i]=time.ticks_diff(get_time(frame, 9), arrived)
+        self.sync_highs[i]=time.ticks_diff(get_time(frame, 5), get_time(frame, 1))
+        self.sync_times[i]=arrived
+        self.sync_count+=1
+        low=high=None
+        for j in range(min(self.sync_count, _SYNC_SAMPLES)):
+            moved=int(self.sync_drift*time.ticks_diff(arrived, self.sync_times[j]))
+            if low is None or self.sync_lows[j]+moved>low:
+                low=self.sync_lows[j]+moved
+            if high is None or self.sync_highs[j]+moved<high:
+                high=self.sync_highs[j]+moved
+        if low>high+_SYNC_JUMP_US:
+            #The parent's swarm clock has jumped, as it does when the parent first syncs or joins another part of the tree, so only this sample
+            #is still good
+            self.sync_lows[0]=self.sync_lows[i]
+            self.sync_highs[0]=self.sync_highs[i]
+            self.sync_times[0]=arrived
+            self.sync_count=1
+            self.window_offset=None
+            low, high=self.sync_lows[0], self.sync_highs[0]
+        self.sync_offset=(low+high)//2
+        self.sync_at=arrived
+        if self.sync_count%_SYNC_SAMPLES==0:
+            if self.window_offset is None:
+                self.window_offset=self.sync_offset
+                self.window_at=arrived
+                return
+            elapsed=time.ticks_diff(arrived, self.window_at)
+            if elapsed>=_DRIFT_MIN_MS*1000:
+                self.sync_drift=max(-_MAX_DRIFT, min(_MAX_DRIFT, (self.sync_offset-self.window_offset)/elapsed))
+            if elapsed>=_DRIFT_SPAN_MS*1000:
+                self.window_offset=self.sync_offset
+                self.window_at=arrived
+
+    #Notes the swarm time a child's sync request arrived at, and sets the reply timer going if it is not already
+    def reply_sync(self, conn_handle, data):
+        arrived=self.swarm_time()
+        reply=self.sync_replies.get(conn_handle)
+        if reply is None:
+            reply=self.sync_replies[conn_handle]=bytearray(_SYNC_SIZE)
+            reply[0]=_FRAME_SYNC
+        for i in range(1, 5):
+            reply[i]=data[i]
+        put_time(reply, 5, arrived)
+        self.sync_waiting.add(conn_handle)
+        if not self.reply_timer_running:
+            self.reply_timer_running=True
+            self.reply_timer.init(mode=machine.Timer.ONE_SHOT, period=1+random.getrandbits(6), callback=self._send_sync_replies)
+
+    #Sends every waiting sync reply, each stamped with the swarm time it is sent at. The callback of reply_timer.
+    def send_sync_replies(self, timer=None):
+        self.reply_timer_running=False
+        for connection in self.sync_waiting:
+            reply=self.sync_replies.get(connection)
+            if reply is not None:
+                put_time(reply, 9, self.swarm_time())
+                self._ble.gattc_write(connection, self._command, reply)
+        self.sync_waiting.clear()
+
+    #Sleeps until the swarm clock reaches start, the last part in microseconds. Returns straight away if it already has.
+    def wait_until(self, start):
+        while True:
+            left=time.ticks_diff(start, self.swarm_time())
+            if left<=0:
+                return
+            if left>_START_SLACK_US:
+                time.sleep_ms(left//1000-1) # type: ignore
+            else:
+                time.sleep_us(left) # type: ignore
+
+    #Holds the records in a _NOTIFY_TELEMETRY notification from a child to go on to the parent, learning routes from them
+    def relay_telemetry(self, data, conn_handle):
+        i=1
+        while i<len(data):
+            length=record_length(data, i)
+            if not length:
+                return
+            number=data[i]
+            self.routes[number]=conn_handle
+            if data[i+2]&_TELEMETRY_KEY:
+                self.telemetry_gaps[number]=0
+            if self.telemetry_gaps[number]:
+                self.telemetry_dropped+=1
+            elif not self.hold_record(data, i, length):
+                self.telemetry_gaps[number]=1
+            i+=length
+
+    #Copies a record into telemetry_out if the budget allows, starting the hold if it is not already running and the XRP has children to wait for.
+    #Returns whether the record was kept.
+    def hold_record(self, data, offset, length):
+        if self.parent_handle is None:
+            return False
+        now=time.ticks_ms()
+        self.telemetry_tokens=min(1000*_TELEMETRY_BURST, self.telemetry_tokens+time.ticks_diff(now, self.telemetry_topped_up)*self.telemetry_budget)
+        self.telemetry_topped_up=now
+        cost=1000*length
+        if self.telemetry_tokens<cost and not (data[offset+2]&_TELEMETRY_KEY and self.telemetry_tokens+1000*_TELEMETRY_BURST>=cost):
+            self.telemetry_dropped+=1
+            return False
+        self.telemetry_tokens-=cost
+        if self.telemetry_length+length>self.payload(self.parent_handle):
+            self.flush_telemetry()
+        out=self.telemetry_out
+        start=self.telemetry_length
+        for i in range(length):
+            out[start+i]=data[offset+i]
+        self.telemetry_length=start+length
+        if not self.hold_timer_running and self.connected_children:
+            self.hold_timer_running=True
+            self.hold_timer.init(mode=machine.Timer.ONE_SHOT, period=_TELEMETRY_HOLD_MS, callback=self._flush_telemetry)
+        return True
+
+    #Sends the held records to the parent in one notification. Runs when the hold ends.
+    def flush_telemetry(self, timer=None):
+        if timer is not None:
+            self.hold_timer_running=False
+        if self.telemetry_length>1 and self.parent_handle is not None:
+            self._ble.gatts_notify(self.parent_handle, self._command, memoryview(self.telemetry_out)[:self.telemetry_length])
+        self.telemetry_length=1
+
+    #Sends a whole frame meant for another XRP on to the child that leads to it, or to every child if that is not known
+    def send_on(self, number, frame):
+        child=self.routes.get(number)
+        if child in self.connected_children:
+            self._ble.gattc_write(child, self._command, frame)
+        else:
+            for connection in self.connected_children:
+                self._ble.gattc_write(connection, self._command, frame)
+
+    #Sends a mission frame on towards the XRP numbered number, as send_on() does. The root takes frames as big as its own MTU allows, so a child
+    #with a smaller MTU gets the steps split over as many frames as it takes, each with the index of its own first step.
+    def send_mission(self, number, frame):
+        child=self.routes.get(number)
+        if child in self.connected_children:
+            self.write_mission(child, frame)
+        else:
+            for connection in self.connected_children:
+                self.write_mission(connection, frame)
+
+    #Writes a mission frame to a child, split to fit its MTU and built in tx if need be
+    def write_mission(self, connection, frame):
+        length=len(frame)
+        if length<=self.payload(connection):
+            self._ble.gattc_write(connection, self._command, frame)
+            return
+        size=(self.payload(connection)-_MISSION_HEADER)//_STEP_SIZE*_STEP_SIZE
+        tx=self.tx
+        for i in range(_MISSION_HEADER):
+            tx[i]=frame[i]
+        for start in range(_MISSION_HEADER, length, size):
+            end=min(length, start+size)
+            tx[5]=frame[5]+(start-_MISSION_HEADER)//_STEP_SIZE
+            for i in range(start, end):
+                tx[_MISSION_HEADER+i-start]=frame[i]
+            #Only missions sent through a child with a smaller MTU get here, so the view this allocates is rare
+            self._ble.gattc_write(connection, self._command, self.tx_view[:_MISSION_HEADER+end-start])
+
+    #Sends the commands in a batch frame that are meant for other XRPs on to the children. Commands for XRPs known to be below one child only go to
+    #that child; the rest go to all of them. Each child gets its commands packed into as few frames as fit its MTU, built in tx.
+    def forward(self, frame):
+        for connection in self.connected_children:
+            per_frame=min(_MAX_BATCH, max(1, (self.payload(connection)-1)//_COMMAND_SIZE))
+            count=0
+            for i in range(1, len(frame)-_COMMAND_SIZE+1, _COMMAND_SIZE):
+                number=frame[i]
+                child=self.routes.get(number)
+                if number==self.number or (child!=connection and child in self.connected_children):
+                    continue
+                start=1+count*_COMMAND_SIZE
+                for j in range(_COMMAND_SIZE):
+                    self.tx[start+j]=frame[i+j]
+                count+=1
+                if count==per_frame:
+                    self.send_batch(connection, count)
+                    count=0
+            if count:
+                self.send_batch(connection, count)
+
+    #Writes the first count commands in tx to a child, as a plain 5 byte frame if there is only one
+    def send_batch(self, connection, count):
+        if count==1:
+            self._ble.gattc_write(connection, self._command, self.tx_single)
+        else:
+            self.tx[0]=_FRAME_BATCH
+            self._ble.gattc_write(connection, self._command, self.tx_views[count])
+
+    #Follows a group frame if this XRP is in the group, and passes it on to the children with members of the group below them. For a _FRAME_AT, start
+    #is the swarm time to start the move at.
+    def follow_group(self, frame, start=None):
+        if frame[1]==_GROUP_ID:
+            group=frame[2]
+            if group in self.groups:
+                self.enqueue(frame, 3, None, start)
+            for connection in self.connected_children:
+                groups=self.child_groups.get(connection, ())
+                if groups is None or group in groups:
+                    self._ble.gattc_write(connection, self._command, frame)
+        elif frame[1]==_GROUP_MASK:
+            mask, value=frame[2], frame[3]
+            if self.number&mask==value:
+                self.enqueue(frame, 3, None, start)
+            #A child is sent the frame if any XRP reached through it matches
+            for connection in self.connected_children:
+                for number in self.routes:
+                    if number&mask==value and self.routes[number]==connection:
+                        self._ble.gattc_write(connection, self._command, frame)
+                        break
+
+    #Adds the XRP to a group, or takes it out of one, and lets the parent know if that changes the groups below it
+    def join_group(self, group):
+        self.groups.add(group)
+        self.announce_groups()
+
+    def leave_group(self, group):
+        self.groups.discard(group)
+        self.announce_groups()
+
+    #Every group with members in this XRP's subtree, or None if a child has too many to list
+    def subtree_groups(self):
+        groups=set(self.groups)
+        for child in self.child_groups.values():
+            if child is None:
+                return None
+            groups|=child
+        return groups
+
+    #Sends the parent a groups notification if the groups in the subtree have changed since the last one
+    def announce_groups(self):
+        if self.parent_handle is None:
+            return
+        groups=self.subtree_groups()
+        if groups==self.announced_groups:
+            return
+        self.announced_groups=groups
+        if groups is None or len(groups)>self.payload(self.parent_handle)-2:
+            frame=bytes((_NOTIFY_GROUPS, _GROUPS_ALL))
+        else:
+            frame=bytes((_NOTIFY_GROUPS, 0))+bytes(sorted(groups))
+        self._ble.gatts_notify(self.parent_handle, self._command, frame)
+
+    #Sends join notifications to the parent for the given XRP numbers, split so each one fits in a single packet
+    def announce(self, numbers):
+        if self.parent_handle is None:
+            return
+        size=self.payload(self.parent_handle)-1
+        for i in range(0, len(numbers), size):
+            self._ble.gatts_notify(self.parent_handle, self._command, bytes((_NOTIFY_JOIN,))+bytes(numbers[i:i+size]))
             
     #checks if device is connected to parent   
     def connected_to_central(self) -> bool:
-        return len(self.parent_handle)>0
\ No newline at end of file
+        return self.parent_handle is not None
\ No newline at end of file